@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -6,11 +8,59 @@ from sqlalchemy.future import select
 
 from app.db.session import get_db
 from app.config import settings
+from app.core.cache_usuarios import cache_usuarios, anexar_usuario, versao_usuario
+from app.core.metricas import metricas
 from app.schemas.auth import TokenData
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"/api/v1/auth/login")
 
+def _decodificar_token(token: str) -> Optional[TokenData]:
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+    return TokenData(email=email, user_id=payload.get("uid"))
+
+async def resolver_usuario(token: str, db: AsyncSession) -> Optional[User]:
+    """
+    Usuário dono do token, ou None se o token for inválido. Compartilhado pelas rotas REST e pelo WebSocket.
+    Tokens com "uid" buscam pela PK e passam pelo cache_usuarios: um acerto custa um GET da versão
+    do usuário no Redis em vez do SELECT. Tokens antigos (só "sub") continuam valendo pela busca
+    por email, sempre no banco.
+    """
+    token_data = _decodificar_token(token)
+    if token_data is None:
+        return None
+
+    if token_data.user_id is None:
+        result = await db.execute(select(User).filter(User.email == token_data.email))
+        user = result.scalars().first()
+    else:
+        # Versão lida antes do SELECT: uma invalidação no meio do caminho deixa o item já velho
+        versao = await versao_usuario(token_data.user_id)
+        item = cache_usuarios.obter(token_data.user_id)
+        if item is not None and versao is not None and item[0] == versao:
+            metricas.incrementar("auth.cache.hit")
+            user = await anexar_usuario(db, item[1])
+        else:
+            metricas.incrementar("auth.cache.miss")
+            user = await db.get(User, token_data.user_id)
+            if user is not None and versao is not None:
+                cache_usuarios.guardar(user, versao)
+    if user is None:
+        return None
+
+    # Token emitido para outro email (ex.: email alterado depois do login) não vale mais
+    if user.email != token_data.email:
+        return None
+    return user
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -19,20 +69,7 @@ async def get_current_user(
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-        
-    result = await db.execute(select(User).filter(User.email == token_data.email))
-    user = result.scalars().first()
-    
+    user = await resolver_usuario(token, db)
     if user is None:
         raise credentials_exception
     return user
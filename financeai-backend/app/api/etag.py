@@ -0,0 +1,89 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import versao_cache_usuario
+from app.core.metricas import metricas
+from app.models.lancamento import Lancamento
+from app.models.categoria import Categoria
+from app.models.conversa import Conversa, Mensagem
+from app.models.resumo_mensal import ResumoMensal
+
+# ==== MARCADORES DE MUDANÇA ====
+# Cada marcador é uma única consulta indexada por user_id (max(updated_at) + contagem).
+# A contagem cobre exclusões, que não deixam rastro em updated_at. A de lançamentos vem
+# do resumo mensal (soma de `quantidade`), que tem poucas linhas por usuário: contar direto
+# em lancamentos percorre o histórico inteiro a cada requisição.
+# Lançamentos e categorias levam também a versão do cache (cache:versao:{uid}), incrementada
+# após o commit de toda escrita. updated_at é o início da transação: um UPDATE que começou antes
+# de outra escrita e fez commit depois não move max(updated_at), e a contagem não muda em edições.
+# Sem a versão (Redis fora), o marcador é None e a rota responde sem ETag, nunca com um 304 velho.
+
+async def marcador_financeiro(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Muda sempre que um Lancamento ou Categoria do usuário é criado, alterado ou removido."""
+    versao = await versao_cache_usuario(user_id)
+    if versao is None:
+        return None
+    stmt = select(
+        select(func.max(Lancamento.updated_at)).where(Lancamento.user_id == user_id).scalar_subquery(),
+        select(func.sum(ResumoMensal.quantidade)).where(ResumoMensal.user_id == user_id).scalar_subquery(),
+        select(func.max(Categoria.updated_at)).where(Categoria.user_id == user_id).scalar_subquery(),
+        select(func.count(Categoria.id)).where(Categoria.user_id == user_id).scalar_subquery(),
+    )
+    row = (await db.execute(stmt)).one()
+    return "|".join(str(v) for v in (versao, *row))
+
+async def marcador_categorias(db: AsyncSession, user_id: int) -> Optional[str]:
+    versao = await versao_cache_usuario(user_id)
+    if versao is None:
+        return None
+    row = (await db.execute(
+        select(func.max(Categoria.updated_at), func.count(Categoria.id)).where(Categoria.user_id == user_id)
+    )).one()
+    return "|".join(str(v) for v in (versao, *row))
+
+async def marcador_conversas(db: AsyncSession, user_id: int) -> str:
+    """Conversas do usuário + mensagens novas (mensagens nunca são editadas, então max(id) basta)."""
+    row = (await db.execute(
+        select(
+            func.max(Conversa.updated_at),
+            func.count(func.distinct(Conversa.id)),
+            func.max(Mensagem.id),
+            func.count(Mensagem.id),
+        ).select_from(Conversa).outerjoin(
+            Mensagem, Mensagem.conversa_id == Conversa.id
+        ).where(Conversa.user_id == user_id)
+    )).one()
+    return "|".join(str(v) for v in row)
+
+# ==== GET CONDICIONAL ====
+
+def gerar_etag(rota: str, params: dict, marcador: Optional[str]) -> Optional[str]:
+    if marcador is None:
+        return None
+    parametros = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    digest = hashlib.sha1(f"{rota}|{parametros}|{marcador}".encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def verificar_etag(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Devolve um 304 pronto se o cliente já tem esta versão (If-None-Match),
+    senão anota o ETag na resposta que a rota vai gerar e devolve None.
+    Sem ETag (marcador indisponível), a resposta sai completa e sem o header.
+    """
+    if etag is None:
+        metricas.incrementar("etag.sem_versao")
+        return None
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    enviados = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in enviados or "*" in enviados:
+        metricas.incrementar("etag.304")
+        return Response(status_code=304, headers=headers)
+
+    metricas.incrementar("etag.200")
+    response.headers.update(headers)
+    return None
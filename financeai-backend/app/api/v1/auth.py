@@ -6,8 +6,9 @@ from sqlalchemy.future import select
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.auth import UserCreate, UserResponse, Token
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import gerar_hash_senha, verificar_senha, create_access_token
 from app.api.deps import get_current_user
+from app.core.cache_usuarios import invalidar_usuario
 
 router = APIRouter()
 
@@ -18,7 +19,7 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     if user:
         raise HTTPException(status_code=400, detail="O email já está cadastrado")
     
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await gerar_hash_senha(user_in.password)
     db_user = User(
         email=user_in.email,
         nome=user_in.nome,
@@ -33,13 +34,13 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).filter(User.email == form_data.username))
     user = result.scalars().first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verificar_senha(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(subject=user.email)
+    access_token = create_access_token(subject=user.email, user_id=user.id)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
@@ -55,12 +56,14 @@ async def change_password(
     senha_atual = body.get("senha_atual", "")
     nova_senha  = body.get("nova_senha",  "")
 
-    if not verify_password(senha_atual, current_user.hashed_password):
+    if not await verificar_senha(senha_atual, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Senha atual incorreta")
 
     if len(nova_senha) < 6:
         raise HTTPException(status_code=400, detail="A nova senha deve ter pelo menos 6 caracteres")
 
-    current_user.hashed_password = get_password_hash(nova_senha)
+    current_user.hashed_password = await gerar_hash_senha(nova_senha)
     await db.commit()
+    # Os outros workers deixam de aceitar o usuário em cache na próxima requisição
+    await invalidar_usuario(current_user.id)
     return {"detail": "Senha alterada com sucesso"}
@@ -1,22 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
 from app.db.session import get_db
 from app.api.deps import get_current_user
+from app.api.etag import marcador_categorias, gerar_etag, verificar_etag
 from app.models.user import User
 from app.models.categoria import Categoria
 from app.models.lancamento import Lancamento
+from app.core.cache import invalidar_cache_usuario
 from app.schemas.categoria import CategoriaCreate, CategoriaUpdate, CategoriaResponse
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategoriaResponse])
 async def listar_categorias(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    etag = gerar_etag("categorias", {}, await marcador_categorias(db, current_user.id))
+    resposta_304 = verificar_etag(request, response, etag)
+    if resposta_304:
+        return resposta_304
+
     result = await db.execute(
         select(Categoria)
         .filter(Categoria.user_id == current_user.id)
@@ -49,6 +58,7 @@ async def criar_categoria(
     )
     db.add(nova_categoria)
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
     await db.refresh(nova_categoria)
     return nova_categoria
 
@@ -80,6 +90,7 @@ async def atualizar_categoria(
         setattr(categoria, field, value)
 
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
     await db.refresh(categoria)
     return categoria
 
@@ -104,4 +115,5 @@ async def excluir_categoria(
 
     await db.delete(categoria)
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
     return None
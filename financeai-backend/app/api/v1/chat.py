@@ -1,18 +1,18 @@
 import json
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List
 
 from app.db.session import get_db, AsyncSessionLocal
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, resolver_usuario
+from app.api.etag import marcador_conversas, gerar_etag, verificar_etag
 from app.core.websocket import manager
 from app.models.conversa import Conversa, Mensagem
 from app.schemas.chat import ConversaResponse, ConversaCreate
 from app.services.rag.pipeline import interagir_com_chat_ws
-from jose import jwt, JWTError
-from app.config import settings
+from app.services.rag.retriever import MODOS_BUSCA
 from app.models.user import User
 
 router = APIRouter()
@@ -20,15 +20,8 @@ router = APIRouter()
 # --- WS Dependencies Mock Helper ---
 # WebSocket Auth: The token should be passed by query_params for WS: ws://...?token=xyz
 async def get_ws_current_user(token: str, db: AsyncSession) -> User:
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        result = await db.execute(select(User).filter(User.email == email))
-        return result.scalars().first()
-    except JWTError:
-        return None
+    # Mesma resolução (e cache) das rotas REST
+    return await resolver_usuario(token, db)
 
 # ==== ROTAS REST P/ HISTORICO ====
 @router.post("/conversas", response_model=ConversaResponse)
@@ -52,9 +45,16 @@ async def criar_conversa(
 
 @router.get("/conversas", response_model=List[ConversaResponse])
 async def listar_conversas(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user), 
     db: AsyncSession = Depends(get_db)
 ):
+    etag = gerar_etag("conversas", {}, await marcador_conversas(db, current_user.id))
+    resposta_304 = verificar_etag(request, response, etag)
+    if resposta_304:
+        return resposta_304
+
     result = await db.execute(
         select(Conversa)
         .options(selectinload(Conversa.mensagens))
@@ -132,7 +132,9 @@ async def chat_websocket(websocket: WebSocket, conversa_id: int, token: str):
                     user_id=user.id,
                     conversa_id=conversa_id,
                     websocket=websocket,
-                    db=db
+                    db=db,
+                    # Opcional por mensagem: "vetorial" ou "hibrida" (padrão em RAG_MODO_BUSCA)
+                    modo_busca=payload.get("modo_busca") if payload.get("modo_busca") in MODOS_BUSCA else None
                 )
                 
                 # 3. Salvar resposta final do assistente no DB
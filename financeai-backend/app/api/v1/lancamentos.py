@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, asc
+from sqlalchemy import select, asc, tuple_, and_, case, delete, func, literal, update, String
 from sqlalchemy.orm import joinedload
-from typing import List
+from typing import List, Optional
+from datetime import date
+import base64
+import binascii
 import re
 
-from app.db.session import get_db
+from app.db.session import get_db, AsyncSessionLocal
 from app.api.deps import get_current_active_user
+from app.api.etag import marcador_financeiro, gerar_etag, verificar_etag
 from app.models.user import User
 from app.models.lancamento import Lancamento
-from app.schemas.lancamento import LancamentoCreate, LancamentoResponse, LancamentoUpdate
-from app.services.tasks.indexing import indexar_lancamento
+from app.models.embedding import FinanceEmbedding
+from app.schemas.lancamento import (
+    LancamentoCreate, LancamentoResponse, LancamentoUpdate, ImportacaoResponse,
+    LoteRequest, LoteResponse,
+)
+from app.services.tasks.indexing import enfileirar_indexacao
+from app.services.finance.indexer import formatar_para_embedding
+from app.services.finance.resumos import ajustar_resumos
+from app.services.finance.exportacao import FORMATOS_EXPORTACAO, exportar_lancamentos, pyarrow_disponivel
+from app.services.finance.importacao import ErroImportacao, importar_extrato
+from app.services.finance.lote import aplicar_operacoes
+from app.core.cache import invalidar_cache_usuario
 
 router = APIRouter()
 
@@ -22,7 +37,10 @@ async def criar_lancamento(
 ):
     db_obj = Lancamento(**lancamento_in.model_dump(), user_id=current_user.id)
     db.add(db_obj)
+    await db.flush()
+    await ajustar_resumos(db, current_user.id, Lancamento.id == db_obj.id)
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
     await db.refresh(db_obj)
 
     # Buscar com a Categoria populada para o ResponseModel do FastAPI (Pydantic) não quebrar
@@ -33,28 +51,166 @@ async def criar_lancamento(
     )
     db_obj_loaded = result.scalars().first()
 
-    # Dispara a indexacao de embeddings no Celery de forma assíncrona
-    indexar_lancamento.delay(db_obj.id, current_user.id)
+    # Marca para indexação; o worker gera os embeddings em lote (services/tasks/indexing.py)
+    await enfileirar_indexacao([db_obj.id], current_user.id)
 
     return db_obj_loaded
 
 
+def _codificar_cursor(lancamento: Lancamento) -> str:
+    bruto = f"{lancamento.data_vencimento.isoformat()}:{lancamento.id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str) -> tuple:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data_str, id_str = bruto.split(":")
+        return date.fromisoformat(data_str), int(id_str)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
 @router.get("/", response_model=List[LancamentoResponse])
 async def listar_lancamentos(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 1000,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(
+    """
+    Lista os lançamentos do mais recente para o mais antigo.
+    Paginação por cursor (keyset em data_vencimento, id): passe em `cursor` o valor do header
+    `X-Proximo-Cursor` da página anterior. Sem cursor, mantém o comportamento de `skip/limit`.
+    """
+    # GET condicional: se nada mudou desde o último ETag, evita carregar/serializar até 1000 linhas
+    etag = gerar_etag(
+        "lancamentos", {"skip": skip, "limit": limit, "cursor": cursor}, await marcador_financeiro(db, current_user.id)
+    )
+    resposta_304 = verificar_etag(request, response, etag)
+    if resposta_304:
+        return resposta_304
+
+    stmt = (
         select(Lancamento)
         .options(joinedload(Lancamento.categoria))
         .filter(Lancamento.user_id == current_user.id)
-        .order_by(Lancamento.data_vencimento.desc())
-        .offset(skip)
+        .order_by(Lancamento.data_vencimento.desc(), Lancamento.id.desc())
         .limit(limit)
     )
-    return result.scalars().all()
+    if cursor:
+        # Keyset: continua exatamente após a última linha entregue, sem custo de OFFSET
+        stmt = stmt.filter(tuple_(Lancamento.data_vencimento, Lancamento.id) < _decodificar_cursor(cursor))
+    else:
+        stmt = stmt.offset(skip)
+
+    result = await db.execute(stmt)
+    lancamentos = result.scalars().all()
+    if limit and len(lancamentos) == limit:
+        response.headers["X-Proximo-Cursor"] = _codificar_cursor(lancamentos[-1])
+    return lancamentos
+
+@router.get("/stream")
+async def stream_lancamentos(
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Histórico completo em NDJSON (um LancamentoResponse por linha), lido de um cursor
+    no servidor em lotes, para a memória ficar constante independente do tamanho do histórico.
+    """
+    user_id = current_user.id
+
+    async def gerar_linhas():
+        # Sessão própria: a do Depends(get_db) é fechada antes do corpo terminar de ser enviado
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(Lancamento)
+                .options(joinedload(Lancamento.categoria))
+                .filter(Lancamento.user_id == user_id)
+                .order_by(Lancamento.data_vencimento.desc(), Lancamento.id.desc())
+                .execution_options(yield_per=500)
+            )
+            async for lote in result.scalars().partitions():
+                yield "".join(
+                    LancamentoResponse.model_validate(lanc).model_dump_json() + "\n" for lanc in lote
+                )
+
+    return StreamingResponse(gerar_linhas(), media_type="application/x-ndjson")
+
+@router.get("/exportar")
+async def exportar_lancamentos_usuario(
+    formato: str = "csv",
+    current_user: User = Depends(get_current_active_user),
+):
+    """Exporta o histórico completo com o nome da categoria em CSV, Parquet ou Arrow IPC (stream)."""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(FORMATOS_EXPORTACAO)}")
+    if formato != "csv" and not pyarrow_disponivel():
+        raise HTTPException(status_code=501, detail="Exportação colunar indisponível: pyarrow não instalado")
+
+    media_type, extensao = FORMATOS_EXPORTACAO[formato]
+    return StreamingResponse(
+        exportar_lancamentos(current_user.id, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="lancamentos.{extensao}"'},
+    )
+
+@router.post("/importar", response_model=ImportacaoResponse)
+async def importar_lancamentos(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    categoria_receita_id: Optional[int] = Form(None),
+    categoria_despesa_id: Optional[int] = Form(None),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importa um extrato bancário (CSV ou OFX) via COPY.
+    Sem `formato`, a extensão do arquivo decide. Linhas inválidas são ignoradas e listadas em `erros`.
+    """
+    formato = (formato or (arquivo.filename or "").rsplit(".", 1)[-1]).lower()
+    if formato not in ("csv", "ofx"):
+        raise HTTPException(status_code=400, detail="Formato inválido. Use: csv, ofx")
+
+    try:
+        resultado = await importar_extrato(
+            db, current_user.id, arquivo, formato, categoria_receita_id, categoria_despesa_id
+        )
+    except ErroImportacao as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    ids = resultado.pop("ids")
+    if ids:
+        await db.commit()
+        await invalidar_cache_usuario(current_user.id)
+        # O extrato inteiro entra de uma vez na fila de indexação
+        await enfileirar_indexacao(ids, current_user.id)
+
+    return resultado
+
+@router.post("/lote", response_model=LoteResponse)
+async def aplicar_lote(
+    lote_in: LoteRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Aplica várias operações de criar/atualizar/remover numa única transação.
+    Cada item recebe seu próprio resultado; itens inválidos não impedem os demais.
+    """
+    resultados, ids_indexar = await aplicar_operacoes(db, current_user.id, lote_in.operacoes)
+    aplicadas = sum(1 for r in resultados if r.status == "ok")
+
+    if aplicadas:
+        await db.commit()
+        await invalidar_cache_usuario(current_user.id)
+        # Reindexação coalescida de todos os ids criados/alterados
+        if ids_indexar:
+            await enfileirar_indexacao(ids_indexar, current_user.id)
+
+    return LoteResponse(aplicadas=aplicadas, rejeitadas=len(resultados) - aplicadas, resultados=resultados)
 
 @router.put("/{lancamento_id}", response_model=LancamentoResponse)
 async def atualizar_lancamento(
@@ -77,62 +233,77 @@ async def atualizar_lancamento(
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
 
     update_data = lancamento_in.model_dump(exclude_unset=True)
-    
+    ids_indexar: List[int] = []
+
     if update_all and db_obj.parcela_group_id:
-        group_result = await db.execute(
-            select(Lancamento)
-            .filter(
-                Lancamento.parcela_group_id == db_obj.parcela_group_id,
-                Lancamento.user_id == current_user.id
-            )
-            .order_by(asc(Lancamento.id))  # Garante ordem de criação
+        # Retira o grupo do rollup com os valores antigos; é somado de volta após o UPDATE
+        condicao_grupo = and_(
+            Lancamento.parcela_group_id == db_obj.parcela_group_id,
+            Lancamento.user_id == current_user.id,
         )
-        group_objs = group_result.scalars().all()
-        total = len(group_objs)
+        await ajustar_resumos(db, current_user.id, condicao_grupo, sinal=-1)
 
         # Ignora datas para não encavalar todos os meses das parcelas no mesmo dia
         update_data.pop("data_vencimento", None)
         update_data.pop("data_pagamento", None)
 
-        # Extrai nome base removendo sufixo "(N/T)" se presente
-        base_descricao = None
+        # Numeração das parcelas em ordem de criação, calculada no próprio banco
+        numerado = (
+            select(
+                Lancamento.id,
+                func.row_number().over(order_by=asc(Lancamento.id)).label("n"),
+                func.count().over().label("total"),
+            )
+            .where(condicao_grupo)
+            .subquery()
+        )
+        valores = dict(update_data)
+
+        # Extrai nome base removendo sufixo "(N/T)" se presente e reconstrói "(n/total)" por parcela
         if "descricao" in update_data:
-            raw_desc = update_data.pop("descricao") or ""
+            raw_desc = valores.pop("descricao") or ""
             base_descricao = re.sub(r'\s*\(\d+/\d+\)$', '', raw_desc).strip()
+            valores["descricao"] = func.concat(
+                base_descricao, " (", numerado.c.n, "/", numerado.c.total, ")"
+            )
 
-        # Extrai observação base removendo "- Última Parcela" ou "Última Parcela" se presente
-        base_obs = None
-        update_obs = False
+        # Extrai observação base removendo "- Última Parcela" e mantém o sufixo apenas no último item
         if "observacoes" in update_data:
-            update_obs = True
-            raw_obs = update_data.pop("observacoes") or ""
+            raw_obs = valores.pop("observacoes") or ""
             base_obs = re.sub(r'\s*-?\s*Última Parcela$', '', raw_obs).strip() or None
+            valores["observacoes"] = case(
+                (
+                    numerado.c.n == numerado.c.total,
+                    f"{base_obs} - Última Parcela" if base_obs else "Última Parcela",
+                ),
+                else_=literal(base_obs, String),  # Pode ser None (limpa o campo)
+            )
 
-        for i, obj in enumerate(group_objs):
-            is_last = (i == total - 1)
-
-            for field, value in update_data.items():
-                setattr(obj, field, value)
-
-            # Reconstrói descrição com numeração correta para cada parcela
-            if base_descricao is not None:
-                obj.descricao = f"{base_descricao} ({i + 1}/{total})"
-
-            # Reconstrói observações preservando "Última Parcela" apenas no último item
-            if update_obs:
-                if is_last:
-                    obj.observacoes = f"{base_obs} - Última Parcela" if base_obs else "Última Parcela"
-                else:
-                    obj.observacoes = base_obs  # Pode ser None (limpa o campo)
-
-            # Agenda re-indexação de tudo do grupo
-            indexar_lancamento.delay(obj.id, current_user.id)
+        result_ids = await db.execute(
+            update(Lancamento)
+            .where(Lancamento.id == numerado.c.id)
+            .values(**valores)
+            .returning(Lancamento.id)
+            .execution_options(synchronize_session=False)
+        )
+        # Re-indexação do grupo inteiro de uma vez, após o commit
+        ids_indexar = list(result_ids.scalars().all())
+        await ajustar_resumos(db, current_user.id, condicao_grupo)
     else:
+        await ajustar_resumos(db, current_user.id, Lancamento.id == db_obj.id, sinal=-1)
+        texto_anterior = formatar_para_embedding(db_obj)
         for field, value in update_data.items():
             setattr(db_obj, field, value)
-        indexar_lancamento.delay(db_obj.id, current_user.id)
+        await db.flush()
+        await ajustar_resumos(db, current_user.id, Lancamento.id == db_obj.id)
+        # Só reindexa se o texto do embedding mudou (ex.: trocar a categoria não altera o texto)
+        if formatar_para_embedding(db_obj) != texto_anterior:
+            ids_indexar = [db_obj.id]
 
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
+    # Só após o commit: um descarregamento imediato leria o texto antigo e gravaria o hash dele
+    await enfileirar_indexacao(ids_indexar, current_user.id)
     await db.refresh(db_obj)
 
     # Recarrega categoria pós-refresh
@@ -143,9 +314,6 @@ async def atualizar_lancamento(
     )
     db_obj_loaded = result.scalars().first()
 
-    # A re-indexação já foi chamada no loop acima
-
-    
     return db_obj_loaded
 
 @router.delete("/{lancamento_id}")
@@ -166,20 +334,26 @@ async def remover_lancamento(
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
 
     if delete_all and db_obj.parcela_group_id:
-        group_result = await db.execute(
-            select(Lancamento)
-            .filter(
-                Lancamento.parcela_group_id == db_obj.parcela_group_id,
-                Lancamento.user_id == current_user.id
+        condicao_grupo = and_(
+            Lancamento.parcela_group_id == db_obj.parcela_group_id,
+            Lancamento.user_id == current_user.id,
+        )
+        await ajustar_resumos(db, current_user.id, condicao_grupo, sinal=-1)
+        # Embeddings do grupo saem antes (a subconsulta precisa das linhas ainda presentes), num único DELETE cada
+        await db.execute(
+            delete(FinanceEmbedding).where(
+                FinanceEmbedding.lancamento_id.in_(select(Lancamento.id).where(condicao_grupo))
             )
         )
-        group_objs = group_result.scalars().all()
-        for obj in group_objs:
-            await db.delete(obj)
+        await db.execute(
+            delete(Lancamento).where(condicao_grupo).execution_options(synchronize_session=False)
+        )
     else:
+        await ajustar_resumos(db, current_user.id, Lancamento.id == db_obj.id, sinal=-1)
+        # Sem isto o ORM só zeraria lancamento_id e o RAG continuaria citando o lançamento removido
+        await db.execute(delete(FinanceEmbedding).where(FinanceEmbedding.lancamento_id == db_obj.id))
         await db.delete(db_obj)
 
-    # Obs: a relationship cascade "deveria/poderia" excluir o FinanceEmbedding, 
-    # porém vamos gerenciar com Celery caso seja necessário depois.
     await db.commit()
+    await invalidar_cache_usuario(current_user.id)
     return {"status": "ok", "detail": "Lançamento(s) removido(s)"}
@@ -5,10 +5,52 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Custo do bcrypt (hashes existentes continuam válidos ao mudar) e threads dedicadas a ele
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_THREADS: int = 4
+    # Usuários autenticados em cache no processo (por id do token); invalidado ao trocar senha/desativar
+    CACHE_USUARIOS_TTL_SEGUNDOS: int = 60
+    CACHE_USUARIOS_MAX: int = 10000
     # LLMs Providers
     GROQ_API_KEY: str = ""
     GEMINI_API_KEY: str = ""
+    # Cliente HTTP da Groq: um por processo (aberto no lifespan), conexões reaproveitadas; HTTP/2 requer o pacote h2
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    GROQ_HTTP2: bool = False
+    GROQ_MAX_CONEXOES: int = 20
+    GROQ_MAX_CONEXOES_OCIOSAS: int = 10
+    GROQ_KEEPALIVE_SEGUNDOS: float = 60.0
+    GROQ_TIMEOUT_SEGUNDOS: float = 60.0
     REDIS_URL: str = "redis://redis:6379"
+    # Relatórios: consultas independentes em paralelo (sessões separadas do pool)
+    RELATORIOS_CONSULTAS_CONCORRENTES: bool = True
+    # Cache de respostas (Dashboard/Relatórios) no Redis, invalidado por versão de dados do usuário
+    CACHE_RESPOSTAS_ATIVO: bool = True
+    CACHE_TTL_SEGUNDOS: int = 3600
+    # Importação de extratos: linhas validadas e gravadas via COPY por lote
+    IMPORTACAO_TAMANHO_LOTE: int = 1000
+    # Indexação coalescida: ids pendentes acumulam por até N segundos (ou N itens) e viram um lote de embeddings
+    INDEXACAO_JANELA_SEGUNDOS: float = 2.0
+    INDEXACAO_LOTE_MAX: int = 100
+    # Provedor de embeddings: "gemini" (API) ou "local" (CPU, sem rede). Trocar exige reindexar (reindexar_embeddings.py)
+    EMBEDDING_BACKEND: str = "gemini"
+    # Chamadas à API de embeddings: simultâneas por processo, timeout por tentativa e tentativas (backoff com jitter)
+    EMBEDDING_CONCORRENCIA_MAX: int = 4
+    EMBEDDING_TIMEOUT_SEGUNDOS: float = 10.0
+    EMBEDDING_TENTATIVAS: int = 3
+    # Embeddings de perguntas do chat: LRU em memória (nº de vetores, ~3 KB cada) + Redis com TTL
+    EMBEDDING_CONSULTA_CACHE_MAX: int = 2048
+    EMBEDDING_CONSULTA_TTL_SEGUNDOS: int = 7 * 24 * 3600
+    # Busca vetorial pelo índice HNSW: candidatos examinados por consulta (mais = mais recall, mais latência)
+    RAG_HNSW_EF_SEARCH: int = 100
+    # Modo padrão da busca do chat: "vetorial" ou "hibrida" (vetorial + textual com RRF); o cliente pode trocar por mensagem
+    RAG_MODO_BUSCA: str = "vetorial"
+    # Chat: embedding, busca e resumo do mês começam junto com a extração de intenção (cancelados se for criar lançamento)
+    CHAT_PIPELINE_ESPECULATIVO: bool = True
+    # Chat: intenção e valor/data/parcelas por regras quando a frase é inequívoca; só o resto vai à LLM
+    CHAT_INTENCAO_LOCAL: bool = True
+    # Partições de lancamentos mantidas à frente do mês atual (só se a tabela foi particionada)
+    PARTICOES_MESES_A_FRENTE: int = 12
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
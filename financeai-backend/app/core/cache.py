@@ -0,0 +1,77 @@
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.core.metricas import metricas
+
+M = TypeVar("M", bound=BaseModel)
+
+# Mesmo Redis usado como broker do Celery. Timeouts curtos: se o Redis cair,
+# as rotas seguem calculando direto no banco em vez de travar.
+redis_client = aioredis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+)
+
+def _chave_versao(user_id: int) -> str:
+    return f"cache:versao:{user_id}"
+
+async def invalidar_cache_usuario(user_id: int):
+    """
+    Incrementa a versão dos dados do usuário. As entradas antigas deixam de ser
+    lidas (a versão faz parte da chave) e expiram sozinhas pelo TTL.
+    Deve ser chamado após o commit de qualquer escrita em Lancamento/Categoria.
+    """
+    try:
+        await redis_client.incr(_chave_versao(user_id))
+    except RedisError as e:
+        metricas.incrementar("cache.erro")
+        print(f"Erro ao invalidar cache do usuário {user_id}: {e}")
+
+async def versao_cache_usuario(user_id: int) -> Optional[str]:
+    """Versão atual dos dados do usuário ("0" se nunca mudou); None se o Redis não respondeu."""
+    try:
+        return await redis_client.get(_chave_versao(user_id)) or "0"
+    except RedisError as e:
+        metricas.incrementar("cache.erro")
+        print(f"Erro ao ler versão do cache do usuário {user_id}: {e}")
+        return None
+
+async def obter_ou_calcular(
+    endpoint: str,
+    user_id: int,
+    params: dict,
+    modelo: Type[M],
+    calcular: Callable[[], Awaitable[M]],
+) -> M:
+    """Cache de respostas por usuário/endpoint/parâmetros, versionado pelos dados do usuário."""
+    if not settings.CACHE_RESPOSTAS_ATIVO:
+        return await calcular()
+
+    try:
+        versao = await redis_client.get(_chave_versao(user_id)) or "0"
+        parametros = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        chave = f"cache:{endpoint}:{user_id}:v{versao}:{parametros}"
+        bruto = await redis_client.get(chave)
+    except RedisError as e:
+        metricas.incrementar("cache.erro")
+        print(f"Erro ao ler cache ({endpoint}): {e}")
+        return await calcular()
+
+    if bruto is not None:
+        metricas.incrementar(f"cache.{endpoint}.hit")
+        return modelo.model_validate_json(bruto)
+
+    metricas.incrementar(f"cache.{endpoint}.miss")
+    resultado = await calcular()
+    try:
+        await redis_client.set(chave, resultado.model_dump_json(), ex=settings.CACHE_TTL_SEGUNDOS)
+    except RedisError as e:
+        metricas.incrementar("cache.erro")
+        print(f"Erro ao gravar cache ({endpoint}): {e}")
+    return resultado
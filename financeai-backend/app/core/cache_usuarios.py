@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.config import settings
+from app.core.cache import redis_client
+from app.core.metricas import metricas
+from app.models.user import User
+
+# Alterações nestes campos mudam o resultado da autenticação
+CAMPOS_AUTENTICACAO = ("email", "hashed_password", "is_active")
+
+
+class CacheUsuarios:
+    """
+    Cache TTL + LRU, em memória do processo, dos usuários resolvidos a partir do token (chave: id).
+    Guarda só os valores das colunas (não a instância do ORM): cada requisição recebe
+    uma instância própria, anexada à sua sessão sem consultar o banco.
+    Cada item guarda também a versão do usuário no Redis (versao_usuario) lida antes do SELECT;
+    quem usa o cache compara com a versão atual, que muda quando qualquer worker invalida o usuário.
+    """
+
+    def __init__(self, ttl_segundos: float, max_itens: int):
+        self.ttl = ttl_segundos
+        self.max_itens = max_itens
+        self._itens: OrderedDict = OrderedDict()
+
+    def obter(self, user_id: int) -> Optional[Tuple[str, Dict]]:
+        """(versão, campos) do usuário, ou None se não estiver no cache ou tiver expirado."""
+        item = self._itens.get(user_id)
+        if item is None:
+            return None
+        expira_em, versao, campos = item
+        if expira_em < time.monotonic():
+            del self._itens[user_id]
+            return None
+        self._itens.move_to_end(user_id)
+        return versao, campos
+
+    def guardar(self, user: User, versao: str) -> None:
+        campos = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self._itens[user.id] = (time.monotonic() + self.ttl, versao, campos)
+        self._itens.move_to_end(user.id)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def invalidar(self, user_id: int) -> None:
+        self._itens.pop(user_id, None)
+
+    def limpar(self) -> None:
+        self._itens.clear()
+
+
+async def anexar_usuario(db: AsyncSession, campos: Dict) -> User:
+    """Reconstrói o User a partir do cache e o anexa à sessão sem SELECT (merge com load=False)."""
+    user = User(**campos)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+cache_usuarios = CacheUsuarios(settings.CACHE_USUARIOS_TTL_SEGUNDOS, settings.CACHE_USUARIOS_MAX)
+
+
+def _chave_versao(user_id: int) -> str:
+    return f"auth:versao:{user_id}"
+
+
+async def versao_usuario(user_id: int) -> Optional[str]:
+    """
+    Versão do usuário compartilhada entre os workers, ou None se o Redis não respondeu.
+    Sem versão não dá para saber se outro worker invalidou o usuário, então o cache não é usado.
+    """
+    try:
+        return await redis_client.get(_chave_versao(user_id)) or "0"
+    except RedisError as e:
+        metricas.incrementar("auth.cache.erro")
+        print(f"Erro ao ler versão do usuário {user_id}: {e}")
+        return None
+
+
+async def invalidar_usuario(user_id: int) -> None:
+    """
+    Tira o usuário do cache deste processo e incrementa a versão no Redis, o que invalida a cópia
+    dos outros workers na próxima requisição. Chamar após o commit que altera email, senha ou
+    is_active (ou remove o usuário).
+    """
+    cache_usuarios.invalidar(user_id)
+    try:
+        await redis_client.incr(_chave_versao(user_id))
+    except RedisError as e:
+        metricas.incrementar("auth.cache.erro")
+        print(f"Erro ao invalidar usuário {user_id} nos outros workers: {e}")
+
+
+# Invalidação local: troca de senha, desativação ou troca de email, por qualquer caminho que passe pelo ORM.
+# O id é marcado no flush e só sai do cache após o commit; antes disso uma requisição concorrente
+# ainda leria (e recolocaria no cache) a linha antiga. Os outros workers só ficam sabendo por
+# invalidar_usuario (o evento é síncrono e não fala com o Redis).
+@event.listens_for(User, "after_update")
+def _marcar_usuario_alterado(mapper, connection, target):
+    estado = inspect(target)
+    if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_AUTENTICACAO):
+        object_session(target).info.setdefault("usuarios_alterados", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_usuarios_alterados(session):
+    for user_id in session.info.pop("usuarios_alterados", ()):
+        cache_usuarios.invalidar(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_usuarios_alterados(session):
+    session.info.pop("usuarios_alterados", None)
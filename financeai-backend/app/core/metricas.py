@@ -0,0 +1,62 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict
+
+# Limites superiores (ms) dos buckets dos histogramas de latência; o último bucket é "+inf"
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Histograma:
+    """Contagem por bucket de latência; percentis estimados pelo limite superior do bucket."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LIMITES_MS) + 1)
+        self.contagem = 0
+        self.soma_ms = 0.0
+
+    def observar(self, ms: float):
+        self.buckets[bisect_left(LIMITES_MS, ms)] += 1
+        self.contagem += 1
+        self.soma_ms += ms
+
+    def percentil(self, q: float):
+        alvo = q * self.contagem
+        acumulado = 0
+        for limite, n in zip(LIMITES_MS + (None,), self.buckets):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "contagem": self.contagem,
+            "media_ms": round(self.soma_ms / self.contagem, 1) if self.contagem else None,
+            "p50_ms": self.percentil(0.5),
+            "p95_ms": self.percentil(0.95),
+            "p99_ms": self.percentil(0.99),
+            "buckets": {
+                (f"<={limite}" if limite is not None else "+inf"): n
+                for limite, n in zip(LIMITES_MS + (None,), self.buckets)
+            },
+        }
+
+class Metricas:
+    """Contadores e histogramas de latência simples em memória do processo, expostos em GET /metricas."""
+
+    def __init__(self):
+        self._contadores: Dict[str, int] = defaultdict(int)
+        self._histogramas: Dict[str, Histograma] = defaultdict(Histograma)
+
+    def incrementar(self, nome: str, valor: int = 1):
+        self._contadores[nome] += valor
+
+    def observar(self, nome: str, ms: float):
+        self._histogramas[nome].observar(ms)
+
+    def snapshot(self) -> dict:
+        return {
+            "contadores": dict(sorted(self._contadores.items())),
+            "histogramas": {nome: h.snapshot() for nome, h in sorted(self._histogramas.items())},
+        }
+
+metricas = Metricas()
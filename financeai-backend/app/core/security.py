@@ -1,8 +1,15 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Any, Union
 from jose import jwt
 import bcrypt
 from app.config import settings
+from app.core.metricas import metricas
+
+# bcrypt libera o GIL durante o hash: um pool pequeno de threads basta para tirá-lo do event loop.
+# O tamanho limita quantos hashes rodam ao mesmo tempo; o excedente espera na fila do executor.
+_executor_hash = ThreadPoolExecutor(max_workers=settings.BCRYPT_THREADS, thread_name_prefix="bcrypt")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
@@ -13,11 +20,28 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(
         password.encode('utf-8'), 
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     ).decode('utf-8')
 
+async def _no_executor_hash(funcao, *args):
+    # auth.bcrypt.fila funciona como gauge: hashes aguardando ou em execução neste instante
+    metricas.incrementar("auth.bcrypt.fila")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor_hash, funcao, *args)
+    finally:
+        metricas.incrementar("auth.bcrypt.fila", -1)
+        metricas.incrementar("auth.bcrypt.executados")
+
+async def verificar_senha(plain_password: str, hashed_password: str) -> bool:
+    """verify_password para rotas async: roda no pool de bcrypt sem travar o event loop."""
+    return await _no_executor_hash(verify_password, plain_password, hashed_password)
+
+async def gerar_hash_senha(password: str) -> str:
+    """get_password_hash para rotas async: roda no pool de bcrypt sem travar o event loop."""
+    return await _no_executor_hash(get_password_hash, password)
+
 def create_access_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any], expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -26,5 +50,8 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode = {"exp": expire, "sub": str(subject)}
+    if user_id is not None:
+        # Permite resolver o usuário pela PK (e pelo cache) em vez de buscar por email
+        to_encode["uid"] = user_id
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
@@ -0,0 +1,45 @@
+"""Add resumos_mensais
+
+Revision ID: 3f1a9c2d7b10
+Revises: cc4034f496ee
+Create Date: 2026-10-18 09:12:41.507318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b10'
+down_revision: Union[str, None] = 'cc4034f496ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('resumos_mensais',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('competencia', sa.Date(), nullable=False),
+    sa.Column('tipo', sa.String(), nullable=False),
+    sa.Column('categoria_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['categoria_id'], ['categorias.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'competencia', 'tipo', 'categoria_id', name='uq_resumos_mensais_chave')
+    )
+    # Carga inicial do rollup com o histórico existente
+    op.execute("""
+        INSERT INTO resumos_mensais (user_id, competencia, tipo, categoria_id, total, quantidade)
+        SELECT user_id, date_trunc('month', data_vencimento)::date, tipo, categoria_id, sum(valor), count(id)
+        FROM lancamentos
+        GROUP BY user_id, date_trunc('month', data_vencimento)::date, tipo, categoria_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('resumos_mensais')
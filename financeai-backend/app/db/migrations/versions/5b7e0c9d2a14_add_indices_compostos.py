@@ -0,0 +1,56 @@
+"""Índices compostos e parciais para os padrões de acesso por usuário
+
+Revision ID: 5b7e0c9d2a14
+Revises: 8d2e4b6a1c57
+Create Date: 2026-10-18 14:20:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c9d2a14'
+down_revision: Union[str, None] = '8d2e4b6a1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY não bloqueia escrita em lancamentos, mas não roda dentro de transação
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_lancamentos_user_id_data_vencimento_id', 'lancamentos',
+            ['user_id', 'data_vencimento', 'id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_lancamentos_despesas_pendentes', 'lancamentos',
+            ['user_id', 'data_vencimento'], unique=False,
+            postgresql_where=sa.text("tipo = 'despesa' AND is_pago = false"),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_conversas_user_id_updated_at', 'conversas',
+            ['user_id', 'updated_at'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        # Coberto pelos índices compostos que começam por user_id
+        op.drop_index(
+            'ix_lancamentos_user_id', table_name='lancamentos',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.execute("ANALYZE lancamentos")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_lancamentos_user_id', 'lancamentos', ['user_id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index('ix_conversas_user_id_updated_at', table_name='conversas', postgresql_concurrently=True)
+        op.drop_index('ix_lancamentos_despesas_pendentes', table_name='lancamentos', postgresql_concurrently=True)
+        op.drop_index('ix_lancamentos_user_id_data_vencimento_id', table_name='lancamentos', postgresql_concurrently=True)
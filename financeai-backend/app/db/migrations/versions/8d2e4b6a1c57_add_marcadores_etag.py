@@ -0,0 +1,30 @@
+"""Add categorias.updated_at e índice de marcador de lancamentos
+
+Revision ID: 8d2e4b6a1c57
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-18 11:03:19.220615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6a1c57'
+down_revision: Union[str, None] = '3f1a9c2d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('categorias', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.create_index('ix_lancamentos_user_id_updated_at', 'lancamentos', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_categorias_user_id_updated_at', 'categorias', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categorias_user_id_updated_at', table_name='categorias')
+    op.drop_index('ix_lancamentos_user_id_updated_at', table_name='lancamentos')
+    op.drop_column('categorias', 'updated_at')
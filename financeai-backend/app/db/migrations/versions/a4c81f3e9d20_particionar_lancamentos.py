@@ -0,0 +1,57 @@
+"""Particiona lancamentos por faixa de data_vencimento (opcional)
+
+Por padrão não altera nada: a tabela plana com os índices compostos de 5b7e0c9d2a14 é mais rápida
+nas consultas do dashboard e da listagem (ver docs/DATABASE.md). O particionamento é para bases em
+que arquivar por DETACH compensa esse custo, e é pedido explicitamente:
+
+    alembic -x particionar=1 upgrade head
+    alembic -x particionar=1 -x meses_por_particao=1 upgrade head    # mensal (padrão: anual)
+    alembic -x particionar=1 -x subparticoes_hash=8 upgrade head
+
+A cópia dos dados acontece dentro da migration (INSERT ... SELECT), então em bases grandes ela deve
+rodar numa janela de manutenção. Uma base que já passou desta revisão sem particionar usa
+`python manter_particoes.py --particionar`, com o mesmo SQL (app.services.finance.particionamento).
+
+Revision ID: a4c81f3e9d20
+Revises: 5b7e0c9d2a14
+Create Date: 2026-10-18 16:02:11.734905
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.finance.particionamento import (
+    SQL_FAIXA_VENCIMENTOS, comandos_desparticionar, comandos_particionar,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c81f3e9d20'
+down_revision: Union[str, None] = '5b7e0c9d2a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _particionada() -> bool:
+    relkind = op.get_bind().execute(sa.text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('lancamentos')")).scalar()
+    return relkind == 'p'
+
+
+def upgrade() -> None:
+    argumentos = context.get_x_argument(as_dictionary=True)
+    if argumentos.get('particionar') != '1':
+        return
+    subparticoes = int(argumentos.get('subparticoes_hash', 0))
+    meses = int(argumentos.get('meses_por_particao', 12))
+    menor, maior = op.get_bind().execute(sa.text(SQL_FAIXA_VENCIMENTOS)).one()
+    for comando in comandos_particionar(menor, maior, subparticoes, meses):
+        op.execute(comando)
+
+
+def downgrade() -> None:
+    if not _particionada():
+        return
+    for comando in comandos_desparticionar():
+        op.execute(comando)
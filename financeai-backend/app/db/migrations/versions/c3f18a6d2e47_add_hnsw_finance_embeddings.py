@@ -0,0 +1,37 @@
+"""Índice HNSW (cosseno) em finance_embeddings
+
+Revision ID: c3f18a6d2e47
+Revises: 8b631f873645
+Create Date: 2026-10-18 19:05:12.631904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f18a6d2e47'
+down_revision: Union[str, None] = '8b631f873645'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Construção cara (CPU e maintenance_work_mem), mas CONCURRENTLY não bloqueia a indexação em andamento
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_finance_embeddings_embedding_hnsw', 'finance_embeddings', ['embedding'], unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_finance_embeddings_embedding_hnsw', table_name='finance_embeddings',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,42 @@
+"""Coluna tsvector (português) e índice GIN em finance_embeddings
+
+Revision ID: e5a9c1b7d304
+Revises: c3f18a6d2e47
+Create Date: 2026-10-18 20:12:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c1b7d304'
+down_revision: Union[str, None] = 'c3f18a6d2e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Coluna gerada STORED reescreve a tabela (lock exclusivo durante a reescrita); o índice vem depois, sem bloquear
+    op.add_column('finance_embeddings', sa.Column(
+        'conteudo_tsv', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('portuguese'::regconfig, conteudo)", persisted=True),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_finance_embeddings_conteudo_tsv', 'finance_embeddings', ['conteudo_tsv'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_finance_embeddings_conteudo_tsv', table_name='finance_embeddings',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('finance_embeddings', 'conteudo_tsv')
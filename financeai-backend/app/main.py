@@ -1,11 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.router import api_router
+from app.core.metricas import metricas
+from app.services.llm.embeddings_cache import taxa_acerto
+from app.services.llm.groq_client import groq_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Conexões da Groq vivem com o processo: abertas uma vez, fechadas no desligamento
+    await groq_client.iniciar()
+    yield
+    await groq_client.fechar()
 
 app = FastAPI(
     title="Meu Norte API",
     description="Backend para plataforma de organização financeira com assistente IA.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configuração CORS
@@ -19,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Proximo-Cursor"],
 )
 
 app.include_router(api_router, prefix="/api/v1")
@@ -26,3 +40,7 @@ app.include_router(api_router, prefix="/api/v1")
 @app.get("/health", tags=["System"])
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/metricas", tags=["System"])
+async def obter_metricas():
+    return {**metricas.snapshot(), "embeddings_cache": await taxa_acerto()}
@@ -5,4 +5,6 @@ from app.models.user import User
 from app.models.categoria import Categoria
 from app.models.lancamento import Lancamento
 from app.models.embedding import FinanceEmbedding
+from app.models.embedding_cache import EmbeddingCache
 from app.models.conversa import Conversa, Mensagem
+from app.models.resumo_mensal import ResumoMensal
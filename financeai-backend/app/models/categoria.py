@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 class Categoria(Base):
     __tablename__ = "categorias"
+    __table_args__ = (
+        Index("ix_categorias_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, index=True, nullable=False)
@@ -13,5 +16,6 @@ class Categoria(Base):
     icone = Column(String, nullable=True) # opcional emoji
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     lancamentos = relationship("Lancamento", back_populates="categoria")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -6,6 +6,10 @@ from app.db.base import Base
 
 class Conversa(Base):
     __tablename__ = "conversas"
+    __table_args__ = (
+        # Lista de conversas ordenada pela mais recente e marcador de ETag
+        Index("ix_conversas_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -1,18 +1,33 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from pgvector.sqlalchemy import Vector
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 class FinanceEmbedding(Base):
     __tablename__ = "finance_embeddings"
+    __table_args__ = (
+        # Busca aproximada por cosseno (ver migration c3f18a6d2e47 e services/rag/retriever.py)
+        Index(
+            "ix_finance_embeddings_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # Busca textual em português da busca híbrida (migration e5a9c1b7d304)
+        Index("ix_finance_embeddings_conteudo_tsv", "conteudo_tsv", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Com lancamentos particionada, services/finance/particionamento.py remove esta FK e a integridade fica com a aplicação
     lancamento_id = Column(Integer, ForeignKey("lancamentos.id"), nullable=True, unique=True)
     
     conteudo = Column(Text, nullable=False)
+    # Gerada pelo banco a partir de conteudo; deferred para não vir junto nas consultas do ORM
+    conteudo_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('portuguese'::regconfig, conteudo)", persisted=True)))
+    conteudo_hash = Column(String(64), nullable=True) # Mesmo hash de embeddings_cache: texto igual → não reindexa
     embedding = Column(Vector(768), nullable=False) # pgvector com nomic-embed-text
     metadata_ = Column("metadata", JSONB, nullable=True)
     
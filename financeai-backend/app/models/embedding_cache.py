@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class EmbeddingCache(Base):
+    """
+    Cache endereçado por conteúdo: hash (modelo + texto) → vetor.
+    Textos idênticos, de qualquer usuário ou atualização, chamam a API de embeddings uma única vez
+    (ver embeddings_com_cache e hash_conteudo em services/llm/embeddings_cache.py).
+    Sem user_id de propósito: o vetor depende só do texto.
+    """
+    __tablename__ = "embeddings_cache"
+
+    hash = Column(String(64), primary_key=True) # sha256 hex
+    modelo = Column(String, nullable=False)
+    embedding = Column(Vector(768), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
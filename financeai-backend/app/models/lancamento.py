@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -10,14 +10,26 @@ class TipoLancamento(str, enum.Enum):
 
 class Lancamento(Base):
     __tablename__ = "lancamentos"
+    __table_args__ = (
+        Index("ix_lancamentos_user_id_updated_at", "user_id", "updated_at"),
+        # Listagem, exportação e períodos do dashboard/relatórios: usuário + faixa de vencimento (+ id do keyset)
+        Index("ix_lancamentos_user_id_data_vencimento_id", "user_id", "data_vencimento", "id"),
+        # Contas a vencer: só despesas em aberto
+        Index(
+            "ix_lancamentos_despesas_pendentes", "user_id", "data_vencimento",
+            postgresql_where=text("tipo = 'despesa' AND is_pago = false"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False) # indexado pelos compostos acima
     categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=False, index=True)
     
     tipo = Column(String, nullable=False) # "receita" ou "despesa" (idealmente usar Enum)
     descricao = Column(String, nullable=False)
     valor = Column(Numeric(10, 2), nullable=False)
+    # Chave de partição quando o particionamento está ligado; a PK (id, data_vencimento) da tabela
+    # particionada é criada por services/finance/particionamento.py, o modelo descreve a tabela plana
     data_vencimento = Column(Date, nullable=False, index=True)
     data_pagamento = Column(Date, nullable=True)
     is_pago = Column(Boolean, default=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, UniqueConstraint
+from app.db.base import Base
+
+class ResumoMensal(Base):
+    """
+    Rollup por usuário/mês/tipo/categoria dos lançamentos.
+    Mantido de forma incremental pelas rotas de escrita (ver services/finance/resumos.py)
+    para que Dashboard e Relatórios não precisem reagregar a tabela `lancamentos` inteira.
+    """
+    __tablename__ = "resumos_mensais"
+    __table_args__ = (
+        UniqueConstraint("user_id", "competencia", "tipo", "categoria_id", name="uq_resumos_mensais_chave"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    competencia = Column(Date, nullable=False) # Sempre o 1º dia do mês de vencimento
+    tipo = Column(String, nullable=False)
+    categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=False)
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -49,3 +49,44 @@ class LancamentoResponse(LancamentoBase):
 
     class Config:
         from_attributes = True
+
+# ==== IMPORTAÇÃO DE EXTRATO ====
+class ImportacaoErro(BaseModel):
+    linha: int
+    erro: str
+
+class ImportacaoResponse(BaseModel):
+    importados: int
+    ignorados: int
+    erros: List[ImportacaoErro] = []
+
+# ==== OPERAÇÕES EM LOTE ====
+class OperacaoCriar(BaseModel):
+    op: Literal["criar"]
+    dados: LancamentoCreate
+
+class OperacaoAtualizar(BaseModel):
+    op: Literal["atualizar"]
+    id: int
+    dados: LancamentoUpdate
+
+class OperacaoRemover(BaseModel):
+    op: Literal["remover"]
+    id: int
+
+OperacaoLote = Annotated[Union[OperacaoCriar, OperacaoAtualizar, OperacaoRemover], Field(discriminator="op")]
+
+class LoteRequest(BaseModel):
+    operacoes: List[OperacaoLote] = Field(..., min_length=1, max_length=1000)
+
+class ResultadoOperacao(BaseModel):
+    indice: int
+    op: str
+    id: Optional[int] = None
+    status: Literal["ok", "erro"]
+    erro: Optional[str] = None
+
+class LoteResponse(BaseModel):
+    aplicadas: int
+    rejeitadas: int
+    resultados: List[ResultadoOperacao]
@@ -0,0 +1,315 @@
+import json
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select, func, extract, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.lancamento import Lancamento
+from app.schemas.dashboard import DashboardResumoStats, DashboardKPIs, CategoriaGasto, FluxoCaixaDia, ContaVencimento
+from app.services.finance.resumos import totais_por_tipo, despesas_por_categoria
+
+# Quantos dias à frente entram em "Contas a Vencer"
+DIAS_VENCIMENTO = 7
+
+
+def _periodos(target_mes: int, target_ano: int, hoje: date) -> dict:
+    _, last_day_atual = monthrange(target_ano, target_mes)
+
+    # Lógica de Mês Anterior
+    if target_mes == 1:
+        prev_mes = 12
+        prev_ano = target_ano - 1
+    else:
+        prev_mes = target_mes - 1
+        prev_ano = target_ano
+    _, last_day_prev = monthrange(prev_ano, prev_mes)
+
+    return {
+        "inicio_atual": date(target_ano, target_mes, 1),
+        "fim_atual": date(target_ano, target_mes, last_day_atual),
+        "inicio_prev": date(prev_ano, prev_mes, 1),
+        "fim_prev": date(prev_ano, prev_mes, last_day_prev),
+        "ultimo_dia": last_day_atual,
+        "hoje": hoje,
+        "limite": hoje + timedelta(days=DIAS_VENCIMENTO),
+    }
+
+
+def _crescimento(atual: float, anterior: float) -> float:
+    if anterior > 0:
+        return (atual - anterior) / anterior * 100
+    return 100.0 if atual > 0 else 0.0
+
+
+def _montar_resumo(
+    periodos: dict,
+    agrupado_atual: Dict[str, float],
+    agrupado_prev: Dict[str, float],
+    contas_a_vencer_valor: float,
+    contas_a_vencer_qnt: int,
+    vencimentos: List[dict],
+    cat_totais: Dict[str, float],
+    fluxo_rows: List[dict],
+) -> DashboardResumoStats:
+    """Monta o DashboardResumoStats a partir dos dados brutos, independente de como foram consultados."""
+    hoje = periodos["hoje"]
+
+    receita_mes = agrupado_atual.get("receita", 0.0)
+    despesa_mes = agrupado_atual.get("despesa", 0.0)
+    renegociacao_mes = agrupado_atual.get("renegociacao", 0.0)
+    saldo_disponivel = receita_mes - despesa_mes
+    taxa_poupanca = (saldo_disponivel / receita_mes * 100) if receita_mes > 0 else 0.0
+
+    receita_prev = agrupado_prev.get("receita", 0.0)
+    despesa_prev = agrupado_prev.get("despesa", 0.0)
+    renegociacao_prev = agrupado_prev.get("renegociacao", 0.0)
+
+    proximos_vencimentos: list[ContaVencimento] = []
+    for c in vencimentos[:5]:
+        dias = (c["data_vencimento"] - hoje).days
+        if dias < 0:
+            status = "VENCIDO"
+            dias_para_vencer = abs(dias)
+        elif dias == 0:
+            status = "HOJE"
+            dias_para_vencer = 0
+        else:
+            status = "PENDENTE"
+            dias_para_vencer = dias
+
+        proximos_vencimentos.append(ContaVencimento(
+            descricao=c["descricao"],
+            valor=float(c["valor"]),
+            dias_para_vencer=dias_para_vencer,
+            status=status
+        ))
+
+    despesas_categoria = []
+    for nome, total in cat_totais.items():
+        pct = (total / despesa_mes * 100) if despesa_mes > 0 else 0.0
+        despesas_categoria.append(CategoriaGasto(
+            categoria=nome,
+            valor=total,
+            percentual=round(pct, 1)
+        ))
+
+    fluxo_dict = {}
+    for d in range(1, periodos["ultimo_dia"] + 1):
+        fluxo_dict[d] = {"receita": 0.0, "despesa": 0.0, "renegociacao": 0.0}
+    for row in fluxo_rows:
+        d = int(row["dia"])
+        if d in fluxo_dict:
+            fluxo_dict[d][row["tipo"]] = float(row["total"])
+
+    fluxo_caixa = []
+    for d in sorted(fluxo_dict.keys()):
+        fluxo_caixa.append(FluxoCaixaDia(
+            dia=d,
+            receita=fluxo_dict[d]["receita"],
+            despesa=fluxo_dict[d]["despesa"],
+            renegociacao=fluxo_dict[d]["renegociacao"]
+        ))
+
+    kpis = DashboardKPIs(
+        receita_mes=receita_mes,
+        crescimento_receita_perc=round(_crescimento(receita_mes, receita_prev), 1),
+        despesa_mes=despesa_mes,
+        crescimento_despesa_perc=round(_crescimento(despesa_mes, despesa_prev), 1),
+        renegociacao_mes=renegociacao_mes,
+        crescimento_renegociacao_perc=round(_crescimento(renegociacao_mes, renegociacao_prev), 1),
+        saldo_disponivel=saldo_disponivel,
+        taxa_poupanca_perc=round(taxa_poupanca, 1),
+        contas_a_vencer_valor=contas_a_vencer_valor,
+        contas_a_vencer_qnt=contas_a_vencer_qnt
+    )
+
+    return DashboardResumoStats(
+        kpis=kpis,
+        despesas_categoria=despesas_categoria,
+        fluxo_caixa=fluxo_caixa,
+        proximos_vencimentos=proximos_vencimentos
+    )
+
+
+# ==== CONSULTA CONSOLIDADA (1 round-trip) ====
+
+# `base` varre `lancamentos` uma única vez: o mês atual (fluxo de caixa) mais as despesas
+# em aberto até o limite de vencimento (KPI e lista lateral). Os totais mensais e por
+# categoria vêm do rollup `resumos_mensais`. Tudo volta numa única linha.
+SQL_RESUMO_CONSOLIDADO = text("""
+WITH base AS MATERIALIZED (
+    SELECT l.id, l.tipo, l.valor, l.data_vencimento, l.is_pago, l.descricao
+    FROM lancamentos l
+    WHERE l.user_id = :user_id
+      AND (
+        l.data_vencimento BETWEEN :inicio_atual AND :fim_atual
+        OR (l.tipo = 'despesa' AND l.is_pago = false AND l.data_vencimento <= :limite)
+      )
+),
+totais AS (
+    SELECT
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_atual AND r.tipo = 'receita'), 0) AS receita_atual,
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_atual AND r.tipo = 'despesa'), 0) AS despesa_atual,
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_atual AND r.tipo = 'renegociacao'), 0) AS renegociacao_atual,
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_prev AND r.tipo = 'receita'), 0) AS receita_prev,
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_prev AND r.tipo = 'despesa'), 0) AS despesa_prev,
+        coalesce(sum(r.total) FILTER (WHERE r.competencia = :inicio_prev AND r.tipo = 'renegociacao'), 0) AS renegociacao_prev
+    FROM resumos_mensais r
+    WHERE r.user_id = :user_id
+      AND r.competencia IN (:inicio_atual, :inicio_prev)
+),
+vencer AS (
+    SELECT
+        coalesce(sum(b.valor), 0) AS valor,
+        count(*) AS qnt
+    FROM base b
+    WHERE b.tipo = 'despesa' AND b.is_pago = false
+      AND b.data_vencimento BETWEEN :hoje AND :limite
+),
+categorias AS (
+    SELECT c.nome, sum(r.total) AS total
+    FROM resumos_mensais r
+    JOIN categorias c ON c.id = r.categoria_id
+    WHERE r.user_id = :user_id
+      AND r.competencia = :inicio_atual
+      AND r.tipo = 'despesa'
+    GROUP BY c.nome
+),
+fluxo AS (
+    SELECT extract(day FROM b.data_vencimento)::int AS dia, b.tipo, sum(b.valor) AS total
+    FROM base b
+    WHERE b.data_vencimento BETWEEN :inicio_atual AND :fim_atual
+    GROUP BY 1, 2
+),
+proximos AS (
+    SELECT b.id, b.descricao, b.valor, b.data_vencimento
+    FROM base b
+    WHERE b.tipo = 'despesa' AND b.is_pago = false
+      AND b.data_vencimento <= :limite
+    ORDER BY b.data_vencimento, b.id
+    LIMIT 5
+)
+SELECT
+    t.*,
+    v.valor AS vencer_valor,
+    v.qnt AS vencer_qnt,
+    (SELECT coalesce(json_agg(json_build_object('nome', nome, 'total', total) ORDER BY total DESC), '[]') FROM categorias) AS categorias,
+    (SELECT coalesce(json_agg(json_build_object('dia', dia, 'tipo', tipo, 'total', total)), '[]') FROM fluxo) AS fluxo,
+    (SELECT coalesce(json_agg(json_build_object('descricao', descricao, 'valor', valor, 'data_vencimento', data_vencimento) ORDER BY data_vencimento, id), '[]') FROM proximos) AS proximos
+FROM totais t, vencer v
+""")
+
+
+def _json(valor):
+    return json.loads(valor) if isinstance(valor, str) else valor
+
+
+async def obter_resumo_consolidado(
+    db: AsyncSession, user_id: int, target_mes: int, target_ano: int, hoje: date
+) -> DashboardResumoStats:
+    """Resumo do Dashboard em uma única consulta (CTEs + agregados FILTER)."""
+    periodos = _periodos(target_mes, target_ano, hoje)
+    result = await db.execute(SQL_RESUMO_CONSOLIDADO, {
+        "user_id": user_id,
+        "inicio_atual": periodos["inicio_atual"],
+        "fim_atual": periodos["fim_atual"],
+        "inicio_prev": periodos["inicio_prev"],
+        "hoje": periodos["hoje"],
+        "limite": periodos["limite"],
+    })
+    row = result.mappings().one()
+
+    vencimentos = [
+        {**c, "data_vencimento": date.fromisoformat(c["data_vencimento"])}
+        for c in _json(row["proximos"])
+    ]
+    return _montar_resumo(
+        periodos,
+        agrupado_atual={
+            "receita": float(row["receita_atual"]),
+            "despesa": float(row["despesa_atual"]),
+            "renegociacao": float(row["renegociacao_atual"]),
+        },
+        agrupado_prev={
+            "receita": float(row["receita_prev"]),
+            "despesa": float(row["despesa_prev"]),
+            "renegociacao": float(row["renegociacao_prev"]),
+        },
+        contas_a_vencer_valor=float(row["vencer_valor"]),
+        contas_a_vencer_qnt=int(row["vencer_qnt"]),
+        vencimentos=vencimentos,
+        cat_totais={c["nome"]: float(c["total"]) for c in _json(row["categorias"])},
+        fluxo_rows=_json(row["fluxo"]),
+    )
+
+
+# ==== CONSULTAS SEQUENCIAIS (implementação anterior) ====
+
+async def obter_resumo_sequencial(
+    db: AsyncSession, user_id: int, target_mes: int, target_ano: int, hoje: date
+) -> DashboardResumoStats:
+    """
+    Implementação anterior com 6 consultas em sequência na mesma sessão.
+    Mantida como referência para o benchmark (bench_dashboard.py) e conferência de resultados.
+    """
+    periodos = _periodos(target_mes, target_ano, hoje)
+    inicio_mes_atual = periodos["inicio_atual"]
+    fim_mes_atual = periodos["fim_atual"]
+    limite_vencimento = periodos["limite"]
+
+    # 1. e 2. Totais do Mês Atual e do Mês Passado
+    agrupado_atual = await totais_por_tipo(db, user_id, inicio_mes_atual, fim_mes_atual)
+    agrupado_prev = await totais_por_tipo(db, user_id, periodos["inicio_prev"], periodos["fim_prev"])
+
+    # 3. Contas a Vencer nos próx. 7 dias (KPI) e lista lateral
+    result_kpi = await db.execute(select(
+        func.sum(Lancamento.valor).label("total_valor"),
+        func.count(Lancamento.id).label("total_qnt")
+    ).where(
+        Lancamento.user_id == user_id,
+        Lancamento.tipo == "despesa",
+        Lancamento.is_pago == False,
+        Lancamento.data_vencimento >= hoje,
+        Lancamento.data_vencimento <= limite_vencimento
+    ))
+    kpi_row = result_kpi.first()
+
+    result_vencer_ui = await db.execute(select(Lancamento).where(
+        Lancamento.user_id == user_id,
+        Lancamento.tipo == "despesa",
+        Lancamento.is_pago == False,
+        Lancamento.data_vencimento <= limite_vencimento
+    ).order_by(Lancamento.data_vencimento.asc(), Lancamento.id.asc()).limit(10))
+    vencimentos = [
+        {"descricao": c.descricao, "valor": c.valor, "data_vencimento": c.data_vencimento}
+        for c in result_vencer_ui.scalars().all()
+    ]
+
+    # 4. Despesas por Categoria (Mes Atual)
+    cat_totais = await despesas_por_categoria(db, user_id, inicio_mes_atual, fim_mes_atual)
+
+    # 5. Fluxo de Caixa (Dias do Mes Atual)
+    result_fluxo = await db.execute(select(
+        extract('day', Lancamento.data_vencimento).label('dia'),
+        Lancamento.tipo,
+        func.sum(Lancamento.valor).label("total")
+    ).where(
+        Lancamento.user_id == user_id,
+        Lancamento.data_vencimento >= inicio_mes_atual,
+        Lancamento.data_vencimento <= fim_mes_atual
+    ).group_by(
+        extract('day', Lancamento.data_vencimento), Lancamento.tipo
+    ).order_by('dia'))
+
+    return _montar_resumo(
+        periodos,
+        agrupado_atual=agrupado_atual,
+        agrupado_prev=agrupado_prev,
+        contas_a_vencer_valor=float(kpi_row.total_valor) if kpi_row and kpi_row.total_valor else 0.0,
+        contas_a_vencer_qnt=int(kpi_row.total_qnt) if kpi_row and kpi_row.total_qnt else 0,
+        vencimentos=vencimentos,
+        cat_totais=cat_totais,
+        fluxo_rows=[dict(row._mapping) for row in result_fluxo.all()],
+    )
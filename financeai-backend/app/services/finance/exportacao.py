@@ -0,0 +1,151 @@
+import csv
+import io
+from typing import AsyncIterator, List
+
+from app.db.session import engine
+
+FORMATOS_EXPORTACAO = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+COLUNAS = [
+    "id", "data_vencimento", "data_pagamento", "tipo", "descricao", "valor",
+    "is_pago", "categoria", "observacoes", "parcela_group_id",
+]
+
+# SQL direto no asyncpg (placeholders $n): sem ORM e sem o limite de 1000 linhas da listagem
+SQL_EXPORTACAO = """
+    SELECT l.id, l.data_vencimento, l.data_pagamento, l.tipo, l.descricao, l.valor,
+           l.is_pago, c.nome AS categoria, l.observacoes, l.parcela_group_id
+    FROM lancamentos l
+    LEFT JOIN categorias c ON c.id = l.categoria_id
+    WHERE l.user_id = $1
+    ORDER BY l.data_vencimento, l.id
+"""
+
+
+def pyarrow_disponivel() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _lotes_lancamentos(user_id: int, tamanho_lote: int) -> AsyncIterator[List[tuple]]:
+    """Lê o histórico de um cursor no servidor (asyncpg), `tamanho_lote` linhas por vez."""
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        asyncpg_conn = raw.driver_connection
+        # Cursores do asyncpg exigem transação; read-only + repeatable read garante um snapshot único
+        async with asyncpg_conn.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await asyncpg_conn.cursor(SQL_EXPORTACAO, user_id)
+            while True:
+                lote = await cursor.fetch(tamanho_lote)
+                if not lote:
+                    break
+                yield [tuple(registro) for registro in lote]
+
+
+async def exportar_csv(user_id: int, tamanho_lote: int = 5000) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS)
+    async for lote in _lotes_lancamentos(user_id, tamanho_lote):
+        writer.writerows(lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Histórico vazio: ainda entrega o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _SaidaDrenavel(io.RawIOBase):
+    """
+    Destino de escrita que acumula bytes até serem drenados para o StreamingResponse.
+    `tell()` continua crescendo após drenar, pois o rodapé do Parquet grava offsets absolutos.
+    """
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _schema_arrow():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("data_vencimento", pa.date32()),
+        ("data_pagamento", pa.date32()),
+        ("tipo", pa.string()),
+        ("descricao", pa.string()),
+        ("valor", pa.decimal128(12, 2)),
+        ("is_pago", pa.bool_()),
+        ("categoria", pa.string()),
+        ("observacoes", pa.string()),
+        ("parcela_group_id", pa.string()),
+    ])
+
+
+def _record_batch(lote: List[tuple], schema):
+    import pyarrow as pa
+    colunas = list(zip(*lote))
+    return pa.record_batch(
+        [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, schema)],
+        schema=schema,
+    )
+
+
+async def exportar_colunar(user_id: int, formato: str, tamanho_lote: int = 50_000) -> AsyncIterator[bytes]:
+    """
+    Parquet (um row group por lote) ou Arrow IPC stream (um record batch por lote).
+    Cada lote é convertido, escrito e drenado antes do próximo ser lido do cursor.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema_arrow()
+    saida = _SaidaDrenavel()
+    destino = pa.PythonFile(saida, mode="w")
+    if formato == "parquet":
+        writer = pq.ParquetWriter(destino, schema, compression="zstd")
+        escrever = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(destino, schema)
+        escrever = writer.write_batch
+
+    try:
+        async for lote in _lotes_lancamentos(user_id, tamanho_lote):
+            escrever(_record_batch(lote, schema))
+            dados = saida.drenar()
+            if dados:
+                yield dados
+    finally:
+        writer.close()
+    yield saida.drenar()
+
+
+def exportar_lancamentos(user_id: int, formato: str) -> AsyncIterator[bytes]:
+    if formato == "csv":
+        return exportar_csv(user_id)
+    return exportar_colunar(user_id, formato)
@@ -0,0 +1,328 @@
+import codecs
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.categoria import Categoria
+from app.models.lancamento import Lancamento
+from app.services.finance.resumos import ajustar_resumos
+
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+MAX_ERROS_REPORTADOS = 50
+
+# Ordem das colunas no COPY (o id vem reservado da sequence para o resumo e a indexação)
+COLUNAS_COPY = [
+    "id", "user_id", "categoria_id", "tipo", "descricao", "valor",
+    "data_vencimento", "data_pagamento", "is_pago", "observacoes",
+]
+
+# Cabeçalhos aceitos no CSV (já normalizados: minúsculas, sem acento)
+ALIASES_CSV = {
+    "data": {"data", "data_vencimento", "data lancamento", "data_lancamento", "date"},
+    "descricao": {"descricao", "historico", "memo", "lancamento", "description"},
+    "valor": {"valor", "valor (r$)", "amount", "montante"},
+    "tipo": {"tipo", "type"},
+    "categoria": {"categoria", "category"},
+}
+
+
+class ErroImportacao(ValueError):
+    pass
+
+
+def _normalizar(cabecalho: str) -> str:
+    return (
+        cabecalho.strip().lower()
+        .replace("ç", "c").replace("ã", "a").replace("á", "a").replace("ó", "o").replace("é", "e").replace("í", "i")
+    )
+
+
+def _converter_valor(bruto: str) -> Decimal:
+    """
+    Aceita '1.234,56', '1,234.56', '-50,00', '1234.56', '1.234.567' e 'R$ 10,00'.
+    O separador decimal é o último entre ',' e '.', e o outro só pode agrupar milhares.
+    Um único separador seguido de três dígitos ('1.234', '1,234') é ambíguo e a linha é recusada.
+    """
+    limpo = bruto.strip().replace("R$", "").replace(" ", "")
+    sinal = ""
+    if limpo.startswith(("-", "+")):
+        sinal, limpo = limpo[0], limpo[1:]
+
+    virgulas, pontos = limpo.count(","), limpo.count(".")
+    if virgulas and pontos:
+        decimal = "," if limpo.rfind(",") > limpo.rfind(".") else "."
+    elif virgulas + pontos == 1:
+        decimal = "," if virgulas else "."
+    else:
+        # Nenhum separador, ou o mesmo repetido: só pode ser agrupamento de milhar ("1.234.567")
+        decimal = None
+    if decimal:
+        inteiro, _, fracao = limpo.rpartition(decimal)
+        milhar = "." if decimal == "," else ","
+    else:
+        inteiro, fracao = limpo, ""
+        milhar = "," if virgulas else "."
+
+    if not (inteiro or fracao):
+        raise ErroImportacao(f"valor inválido: {bruto!r}")
+    if virgulas + pontos == 1 and len(fracao) == 3 and len(inteiro) <= 3 and inteiro.lstrip("0"):
+        raise ErroImportacao(f"valor ambíguo (milhar ou decimal?): {bruto!r}")
+    if milhar in inteiro and not re.fullmatch(rf"\d{{1,3}}(\{milhar}\d{{3}})+", inteiro):
+        raise ErroImportacao(f"valor inválido: {bruto!r}")
+    try:
+        return Decimal(f"{sinal}{inteiro.replace(milhar, '')}.{fracao or '0'}")
+    except InvalidOperation:
+        raise ErroImportacao(f"valor inválido: {bruto!r}")
+
+
+def _converter_data(bruto: str) -> date:
+    bruto = bruto.strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%Y%m%d"):
+        try:
+            return datetime.strptime(bruto, formato).date()
+        except ValueError:
+            continue
+    raise ErroImportacao(f"data inválida: {bruto!r}")
+
+
+async def _linhas_texto(arquivo: UploadFile) -> AsyncIterator[str]:
+    """Lê o upload em blocos e devolve linhas completas, sem carregar o arquivo inteiro."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    resto = ""
+    while True:
+        bloco = await arquivo.read(TAMANHO_BLOCO_LEITURA)
+        if not bloco:
+            break
+        resto += decoder.decode(bloco)
+        *linhas, resto = resto.split("\n")
+        for linha in linhas:
+            yield linha.rstrip("\r")
+    resto += decoder.decode(b"", final=True)
+    if resto.strip():
+        yield resto.rstrip("\r")
+
+
+async def _registros_csv(arquivo: UploadFile) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Junta as linhas em registros CSV completos: um campo entre aspas pode conter quebras de linha
+    (comum no histórico de extratos). Enquanto o número de aspas for ímpar, o registro continua
+    na linha seguinte (aspas escapadas vêm dobradas e não mudam a paridade).
+    Gera (número da primeira linha, registro).
+    """
+    partes: List[str] = []
+    inicio = numero = aspas = 0
+    async for linha in _linhas_texto(arquivo):
+        numero += 1
+        if not partes:
+            inicio = numero
+        partes.append(linha)
+        aspas += linha.count('"')
+        if aspas % 2 == 0:
+            yield inicio, "\n".join(partes)
+            partes, aspas = [], 0
+    if partes:
+        # Aspas sem fechamento até o fim do arquivo: o csv.reader lê o que houver
+        yield inicio, "\n".join(partes)
+
+
+async def ler_csv(arquivo: UploadFile) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """Gera (número da linha, campos) com o cabeçalho mapeado para data/descricao/valor/tipo/categoria."""
+    mapa: Optional[Dict[int, str]] = None
+    delimitador = ","
+    async for numero, registro in _registros_csv(arquivo):
+        if not registro.strip():
+            continue
+        if mapa is None:
+            # Extratos brasileiros costumam vir com ';' (a vírgula é o separador decimal)
+            delimitador = ";" if registro.count(";") > registro.count(",") else ","
+            cabecalho = next(csv.reader([registro], delimiter=delimitador))
+            mapa = {}
+            for indice, nome in enumerate(cabecalho):
+                for campo, aliases in ALIASES_CSV.items():
+                    if _normalizar(nome) in aliases:
+                        mapa[indice] = campo
+            faltando = {"data", "descricao", "valor"} - set(mapa.values())
+            if faltando:
+                raise ErroImportacao(f"Cabeçalho do CSV sem as colunas: {', '.join(sorted(faltando))}")
+            continue
+        valores = next(csv.reader([registro], delimiter=delimitador))
+        yield numero, {campo: valores[i] for i, campo in mapa.items() if i < len(valores)}
+
+
+REGEX_TRANSACAO_OFX = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+REGEX_CAMPO_OFX = re.compile(r"<(\w+)>([^<\r\n]*)")
+REGEX_ENCODING_XML = re.compile(rb"<\?xml[^>]*encoding=[\"']([\w.:-]+)", re.I)
+REGEX_CABECALHO_OFX = re.compile(rb"^(ENCODING|CHARSET):\s*([\w-]+)", re.I | re.M)
+
+
+def _codec_ofx(inicio: bytes) -> str:
+    """
+    Codec do arquivo pelo cabeçalho: OFX 2.x declara no <?xml encoding=...?> (UTF-8 se omitido),
+    OFX 1.x traz ENCODING (USASCII/UTF-8) e CHARSET (1252, ISO-8859-1, NONE).
+    Sem declaração reconhecível, cp1252, o padrão dos bancos brasileiros.
+    """
+    if inicio.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if inicio.lstrip().startswith(b"<?xml"):
+        declarado = REGEX_ENCODING_XML.search(inicio)
+        codec = declarado.group(1).decode() if declarado else "utf-8"
+    else:
+        cabecalho = {chave.upper().decode(): valor.upper().decode() for chave, valor in REGEX_CABECALHO_OFX.findall(inicio)}
+        if cabecalho.get("ENCODING") in ("UTF-8", "UTF8"):
+            codec = "utf-8"
+        else:
+            charset = cabecalho.get("CHARSET", "1252")
+            codec = {"NONE": "cp1252", "1252": "cp1252", "8859-1": "latin-1", "ISO-8859-1": "latin-1"}.get(charset, charset)
+    try:
+        return codecs.lookup(codec).name
+    except LookupError:
+        return "cp1252"
+
+
+async def ler_ofx(arquivo: UploadFile) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """
+    Extrai cada <STMTTRN> do OFX (SGML 1.x ou XML 2.x) conforme os blocos chegam,
+    decodificados com o codec declarado no cabeçalho (primeiro bloco).
+    O "número da linha" reportado é a posição da transação no arquivo.
+    """
+    bloco = await arquivo.read(TAMANHO_BLOCO_LEITURA)
+    decoder = codecs.getincrementaldecoder(_codec_ofx(bloco))(errors="replace")
+    pendente = ""
+    numero = 0
+    while True:
+        pendente += decoder.decode(bloco, final=not bloco)
+        fim_consumido = 0
+        for match in REGEX_TRANSACAO_OFX.finditer(pendente):
+            numero += 1
+            campos = {tag.upper(): valor.strip() for tag, valor in REGEX_CAMPO_OFX.findall(match.group(1))}
+            yield numero, {
+                "data": campos.get("DTPOSTED", "")[:8],
+                "descricao": campos.get("MEMO") or campos.get("NAME", ""),
+                "valor": campos.get("TRNAMT", ""),
+            }
+            fim_consumido = match.end()
+        pendente = pendente[fim_consumido:]
+        if not bloco:
+            break
+        bloco = await arquivo.read(TAMANHO_BLOCO_LEITURA)
+
+
+async def _categorias_padrao(
+    db: AsyncSession, user_id: int, categoria_receita_id: Optional[int], categoria_despesa_id: Optional[int]
+) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+    """Categoria padrão por tipo (informada ou a primeira do usuário) e índice (nome, tipo) -> id."""
+    result = await db.execute(
+        select(Categoria.id, Categoria.nome, Categoria.tipo)
+        .filter(Categoria.user_id == user_id)
+        .order_by(Categoria.id)
+    )
+    categorias = result.all()
+    ids_validos = {c.id for c in categorias}
+    # Pelo par (nome, tipo): uma linha de receita não cai numa categoria de despesa de mesmo nome
+    por_nome = {(_normalizar(c.nome), c.tipo): c.id for c in categorias}
+
+    padrao: Dict[str, int] = {}
+    for tipo, informada in (("receita", categoria_receita_id), ("despesa", categoria_despesa_id)):
+        if informada is not None:
+            if informada not in ids_validos:
+                raise ErroImportacao(f"Categoria {informada} não pertence ao usuário")
+            padrao[tipo] = informada
+        else:
+            primeira = next((c.id for c in categorias if c.tipo == tipo), None)
+            if primeira is not None:
+                padrao[tipo] = primeira
+    return padrao, por_nome
+
+
+def _validar_linha(
+    campos: Dict[str, str], user_id: int, padrao: Dict[str, int], por_nome: Dict[Tuple[str, str], int]
+) -> tuple:
+    valor = _converter_valor(campos.get("valor", ""))
+    data_lanc = _converter_data(campos.get("data", ""))
+    descricao = (campos.get("descricao") or "").strip()
+    if not descricao:
+        raise ErroImportacao("descrição vazia")
+    if valor == 0:
+        raise ErroImportacao("valor zerado")
+    if abs(valor) >= Decimal("100000000"):
+        # Coluna valor é NUMERIC(10, 2)
+        raise ErroImportacao(f"valor fora do limite: {campos['valor']!r}")
+
+    # Sem coluna de tipo, o sinal do extrato decide (débito negativo = despesa)
+    tipo = _normalizar(campos.get("tipo") or "") or ("despesa" if valor < 0 else "receita")
+    if tipo not in ("receita", "despesa"):
+        raise ErroImportacao(f"tipo inválido: {tipo!r}")
+
+    categoria_id = por_nome.get((_normalizar(campos.get("categoria") or ""), tipo)) or padrao.get(tipo)
+    if categoria_id is None:
+        raise ErroImportacao(f"nenhuma categoria de {tipo} cadastrada")
+
+    # Extrato bancário registra movimentações já liquidadas
+    return (
+        user_id, categoria_id, tipo, descricao, abs(valor).quantize(Decimal("0.01")),
+        data_lanc, data_lanc, True, "Importado de extrato",
+    )
+
+
+async def _copiar_lote(db: AsyncSession, user_id: int, lote: List[tuple]) -> List[int]:
+    """Reserva ids na sequence, grava o lote via COPY e atualiza o resumo mensal na mesma transação."""
+    result = await db.execute(
+        text("SELECT nextval('lancamentos_id_seq') FROM generate_series(1, :n)"), {"n": len(lote)}
+    )
+    ids = result.scalars().all()
+
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "lancamentos",
+        records=[(id_,) + registro for id_, registro in zip(ids, lote)],
+        columns=COLUNAS_COPY,
+    )
+    await ajustar_resumos(db, user_id, Lancamento.id.in_(ids))
+    return ids
+
+
+async def importar_extrato(
+    db: AsyncSession,
+    user_id: int,
+    arquivo: UploadFile,
+    formato: str,
+    categoria_receita_id: Optional[int] = None,
+    categoria_despesa_id: Optional[int] = None,
+) -> dict:
+    """
+    Importa um extrato CSV/OFX em lotes de IMPORTACAO_TAMANHO_LOTE linhas.
+    Linhas inválidas são ignoradas e reportadas; as válidas entram numa única transação.
+    O commit fica a cargo de quem chama.
+    """
+    padrao, por_nome = await _categorias_padrao(db, user_id, categoria_receita_id, categoria_despesa_id)
+    leitor = ler_ofx(arquivo) if formato == "ofx" else ler_csv(arquivo)
+
+    ids: List[int] = []
+    erros: List[dict] = []
+    total_erros = 0
+    lote: List[tuple] = []
+
+    async for numero, campos in leitor:
+        try:
+            lote.append(_validar_linha(campos, user_id, padrao, por_nome))
+        except ErroImportacao as e:
+            total_erros += 1
+            if len(erros) < MAX_ERROS_REPORTADOS:
+                erros.append({"linha": numero, "erro": str(e)})
+            continue
+        if len(lote) >= settings.IMPORTACAO_TAMANHO_LOTE:
+            ids.extend(await _copiar_lote(db, user_id, lote))
+            lote = []
+
+    if lote:
+        ids.extend(await _copiar_lote(db, user_id, lote))
+
+    return {"importados": len(ids), "ignorados": total_erros, "erros": erros, "ids": ids}
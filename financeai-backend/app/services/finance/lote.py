@@ -0,0 +1,135 @@
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, insert, update, delete, or_, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.categoria import Categoria
+from app.models.embedding import FinanceEmbedding
+from app.models.lancamento import Lancamento
+from app.schemas.lancamento import OperacaoLote, ResultadoOperacao
+from app.services.finance.resumos import ajustar_resumos
+
+# Colunas NOT NULL: um null aqui abortaria a transação do lote inteiro
+CAMPOS_OBRIGATORIOS = ("descricao", "valor", "data_vencimento", "categoria_id")
+
+
+async def _categorias_validas(db: AsyncSession, user_id: int, operacoes: List[OperacaoLote]) -> set:
+    """Categorias referenciadas no lote que existem e são do usuário (ou globais), numa única consulta."""
+    ids = {op.dados.categoria_id for op in operacoes if op.op != "remover" and op.dados.categoria_id is not None}
+    if not ids:
+        return set()
+    result = await db.execute(
+        select(Categoria.id).filter(
+            Categoria.id.in_(ids),
+            or_(Categoria.user_id == user_id, Categoria.user_id.is_(None)),
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def aplicar_operacoes(
+    db: AsyncSession, user_id: int, operacoes: List[OperacaoLote]
+) -> Tuple[List[ResultadoOperacao], List[int]]:
+    """
+    Valida o lote com duas consultas (lançamentos e categorias) e aplica as operações válidas
+    com um INSERT ... RETURNING, UPDATEs em executemany por id e um DELETE.
+    Operações inválidas são rejeitadas individualmente sem afetar as demais.
+    Devolve os resultados na ordem recebida e os ids a reindexar. O commit fica a cargo de quem chama.
+    """
+    resultados: Dict[int, ResultadoOperacao] = {}
+
+    def rejeitar(indice: int, op, erro: str):
+        resultados[indice] = ResultadoOperacao(
+            indice=indice, op=op.op, id=getattr(op, "id", None), status="erro", erro=erro
+        )
+
+    ids_referenciados = {op.id for op in operacoes if op.op != "criar"}
+    existentes = set()
+    if ids_referenciados:
+        result = await db.execute(
+            select(Lancamento.id).filter(Lancamento.id.in_(ids_referenciados), Lancamento.user_id == user_id)
+        )
+        existentes = set(result.scalars().all())
+    categorias = await _categorias_validas(db, user_id, operacoes)
+
+    criar: List[Tuple[int, dict]] = []
+    atualizar: Dict[int, Tuple[int, dict]] = {}
+    remover: Dict[int, int] = {}
+    vistos = set()
+
+    for indice, op in enumerate(operacoes):
+        if op.op != "criar":
+            if op.id not in existentes:
+                rejeitar(indice, op, "Lançamento não encontrado")
+                continue
+            if op.id in vistos:
+                rejeitar(indice, op, "Lançamento repetido no lote")
+                continue
+            vistos.add(op.id)
+        if op.op == "remover":
+            remover[op.id] = indice
+            continue
+
+        dados = op.dados.model_dump(exclude_unset=op.op == "atualizar")
+        nulos = [campo for campo in CAMPOS_OBRIGATORIOS if campo in dados and dados[campo] is None]
+        if nulos:
+            rejeitar(indice, op, f"Campos obrigatórios nulos: {', '.join(nulos)}")
+            continue
+        if dados.get("categoria_id") is not None and dados["categoria_id"] not in categorias:
+            rejeitar(indice, op, "Categoria não encontrada")
+            continue
+        if op.op == "criar":
+            criar.append((indice, dados))
+        elif dados:
+            atualizar[op.id] = (indice, dados)
+        else:
+            # Atualização sem campos: nada a gravar, mas a operação é válida
+            resultados[indice] = ResultadoOperacao(indice=indice, op=op.op, id=op.id, status="ok")
+
+    # Retira do rollup o estado anterior de tudo que será alterado ou removido
+    alterados = list(atualizar) + list(remover)
+    if alterados:
+        await ajustar_resumos(db, user_id, Lancamento.id.in_(alterados), sinal=-1)
+
+    if remover:
+        # Embeddings referenciam o lançamento (sem FK se a tabela for particionada); saem junto para não virarem órfãos no RAG
+        await db.execute(delete(FinanceEmbedding).where(FinanceEmbedding.lancamento_id.in_(list(remover))))
+        await db.execute(
+            delete(Lancamento).where(Lancamento.id.in_(list(remover)), Lancamento.user_id == user_id)
+        )
+
+    if atualizar:
+        # Um UPDATE executemany por conjunto de campos alterados (a PK da tabela particionada
+        # inclui data_vencimento, então o bulk update por PK do ORM não se aplica)
+        por_campos: Dict[tuple, List[dict]] = {}
+        for id_, (_, dados) in atualizar.items():
+            por_campos.setdefault(tuple(sorted(dados)), []).append({"_id": id_, **dados})
+        tabela = Lancamento.__table__
+        for campos, linhas in por_campos.items():
+            await db.execute(
+                update(tabela)
+                .where(tabela.c.id == bindparam("_id"), tabela.c.user_id == user_id)
+                .values({campo: bindparam(campo) for campo in campos}),
+                linhas,
+            )
+
+    ids_criados: List[int] = []
+    if criar:
+        result = await db.scalars(
+            insert(Lancamento).returning(Lancamento.id, sort_by_parameter_order=True),
+            [{**dados, "user_id": user_id} for _, dados in criar],
+        )
+        ids_criados = list(result.all())
+
+    ids_indexar = ids_criados + list(atualizar)
+    if ids_indexar:
+        await ajustar_resumos(db, user_id, Lancamento.id.in_(ids_indexar))
+
+    for (indice, _), id_ in zip(criar, ids_criados):
+        resultados[indice] = ResultadoOperacao(indice=indice, op="criar", id=id_, status="ok")
+    for id_, (indice, _) in atualizar.items():
+        resultados[indice] = ResultadoOperacao(indice=indice, op="atualizar", id=id_, status="ok")
+    for id_, indice in remover.items():
+        resultados[indice] = ResultadoOperacao(indice=indice, op="remover", id=id_, status="ok")
+
+    return [resultados[i] for i in range(len(operacoes))], ids_indexar
@@ -0,0 +1,258 @@
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import column, delete, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.embedding import FinanceEmbedding
+from app.models.resumo_mensal import ResumoMensal
+
+TABELA = "lancamentos"
+PARTICAO_DEFAULT = "lancamentos_default"
+REGEX_LIMITES = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+MESES_A_FRENTE = 12
+# Datas muito distantes (erros de digitação, parcelas longas) ficam na DEFAULT em vez de gerar centenas de partições
+MESES_HISTORICO_MAX = 120
+
+SQL_FAIXA_VENCIMENTOS = (
+    "SELECT date_trunc('month', min(data_vencimento))::date, date_trunc('month', max(data_vencimento))::date "
+    f"FROM {TABELA}"
+)
+
+INDICES = [
+    ("ix_lancamentos_id", "id", None),
+    ("ix_lancamentos_categoria_id", "categoria_id", None),
+    ("ix_lancamentos_data_vencimento", "data_vencimento", None),
+    ("ix_lancamentos_parcela_group_id", "parcela_group_id", None),
+    ("ix_lancamentos_user_id_updated_at", "user_id, updated_at", None),
+    ("ix_lancamentos_user_id_data_vencimento_id", "user_id, data_vencimento, id", None),
+    ("ix_lancamentos_despesas_pendentes", "user_id, data_vencimento", "tipo = 'despesa' AND is_pago = false"),
+]
+
+
+class Particao(NamedTuple):
+    nome: str
+    inicio: date
+    fim: date  # exclusivo
+
+    @property
+    def meses(self) -> int:
+        delta = relativedelta(self.fim, self.inicio)
+        return delta.years * 12 + delta.months
+
+
+def nome_particao(competencia: date) -> str:
+    return f"{TABELA}_p{competencia:%Y_%m}"
+
+
+def inicio_faixa(competencia: date, meses: int = 1) -> date:
+    """Início da faixa de `meses` meses que contém a data (faixas alinhadas ao ano: jan, abr, jul...)."""
+    return date(competencia.year, (competencia.month - 1) // meses * meses + 1, 1)
+
+
+def _comandos_indices_e_chaves(chave: List[str]) -> List[str]:
+    # Restrições e índices depois da carga (mais rápido que mantê-los durante o INSERT)
+    comandos = [
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT lancamentos_pkey PRIMARY KEY ({', '.join(chave)})",
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT lancamentos_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)",
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT lancamentos_categoria_id_fkey FOREIGN KEY (categoria_id) REFERENCES categorias (id)",
+    ]
+    # Índices criados no pai são replicados em todas as partições (inclusive as futuras)
+    for nome, colunas, where in INDICES:
+        comandos.append(f"CREATE INDEX {nome} ON {TABELA} ({colunas})" + (f" WHERE {where}" if where else ""))
+    return comandos + [f"ANALYZE {TABELA}"]
+
+
+def comandos_particionar(menor: Optional[date], maior: Optional[date], subparticoes: int = 0, meses: int = 12) -> List[str]:
+    """
+    SQL que converte a tabela plana em particionada por RANGE (data_vencimento), com faixas de `meses`
+    meses (alinhadas ao ano) do primeiro vencimento até MESES_A_FRENTE meses adiante e uma DEFAULT.
+    `menor`/`maior` são o primeiro e o último mês de vencimento existentes (SQL_FAIXA_VENCIMENTOS).
+    Usado pela migration a4c81f3e9d20 (com -x particionar=1) e por manter_particoes.py --particionar.
+    """
+    if 12 % meses:
+        raise ValueError("meses_por_particao precisa dividir 12 (1, 2, 3, 4, 6 ou 12)")
+    hoje = date.today().replace(day=1)
+    inicio = inicio_faixa(max(menor or hoje, hoje - relativedelta(months=MESES_HISTORICO_MAX)), meses)
+    fim = min(max(maior or hoje, hoje + relativedelta(months=MESES_A_FRENTE)),
+              hoje + relativedelta(months=MESES_HISTORICO_MAX))
+
+    comandos = [
+        # FKs para tabela particionada exigem unicidade que inclua a chave de partição;
+        # a integridade de finance_embeddings.lancamento_id passa a ser mantida pela aplicação
+        "ALTER TABLE finance_embeddings DROP CONSTRAINT IF EXISTS finance_embeddings_lancamento_id_fkey",
+        f"ALTER TABLE {TABELA} RENAME TO lancamentos_legado",
+        f"CREATE TABLE {TABELA} (LIKE lancamentos_legado INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (data_vencimento)",
+        # A sequence do id pertencia à tabela antiga e seria removida junto com ela
+        f"ALTER SEQUENCE lancamentos_id_seq OWNED BY {TABELA}.id",
+    ]
+    sufixo = " PARTITION BY HASH (user_id)" if subparticoes else ""
+    while inicio <= fim:
+        proximo = inicio + relativedelta(months=meses)
+        nome = nome_particao(inicio)
+        comandos.append(
+            f"CREATE TABLE {nome} PARTITION OF {TABELA} "
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{proximo.isoformat()}'){sufixo}"
+        )
+        for resto in range(subparticoes):
+            comandos.append(
+                f"CREATE TABLE {nome}_h{resto} PARTITION OF {nome} "
+                f"FOR VALUES WITH (MODULUS {subparticoes}, REMAINDER {resto})"
+            )
+        inicio = proximo
+    comandos += [
+        f"CREATE TABLE {PARTICAO_DEFAULT} PARTITION OF {TABELA} DEFAULT",
+        f"INSERT INTO {TABELA} SELECT * FROM lancamentos_legado",
+        "DROP TABLE lancamentos_legado",
+    ]
+    # A PK precisa conter as chaves de partição; a unicidade do id vem da sequence
+    return comandos + _comandos_indices_e_chaves(["id", "data_vencimento"] + (["user_id"] if subparticoes else []))
+
+
+def comandos_desparticionar() -> List[str]:
+    """SQL que volta lancamentos a tabela plana (partições desanexadas ficam de fora) e restaura a FK dos embeddings."""
+    return [
+        f"ALTER TABLE {TABELA} RENAME TO lancamentos_particionada",
+        f"CREATE TABLE {TABELA} (LIKE lancamentos_particionada INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"ALTER SEQUENCE lancamentos_id_seq OWNED BY {TABELA}.id",
+        f"INSERT INTO {TABELA} SELECT * FROM lancamentos_particionada",
+        # Remove pai e todas as partições (inclusive as criadas pela manutenção)
+        "DROP TABLE lancamentos_particionada",
+    ] + _comandos_indices_e_chaves(["id"]) + [
+        "UPDATE finance_embeddings SET lancamento_id = NULL "
+        f"WHERE lancamento_id IS NOT NULL AND lancamento_id NOT IN (SELECT id FROM {TABELA})",
+        "ALTER TABLE finance_embeddings ADD CONSTRAINT finance_embeddings_lancamento_id_fkey "
+        f"FOREIGN KEY (lancamento_id) REFERENCES {TABELA} (id)",
+    ]
+
+
+async def tabela_particionada(db: AsyncSession) -> bool:
+    result = await db.execute(text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:tabela)"), {"tabela": TABELA})
+    return result.scalar() == "p"
+
+
+async def listar_particoes(db: AsyncSession) -> List[Particao]:
+    """Partições de faixa ligadas à tabela, em ordem cronológica (a DEFAULT fica de fora)."""
+    result = await db.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS limites
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:tabela)
+    """), {"tabela": TABELA})
+    particoes = []
+    for nome, limites in result.all():
+        match = REGEX_LIMITES.search(limites)
+        if match:
+            particoes.append(Particao(nome, date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))))
+    return sorted(particoes, key=lambda p: p.inicio)
+
+
+async def particionar_tabela(db: AsyncSession, subparticoes: int = 0, meses: int = 12) -> int:
+    """Converte a tabela plana em particionada (ver comandos_particionar). Devolve quantas linhas foram copiadas."""
+    menor, maior = (await db.execute(text(SQL_FAIXA_VENCIMENTOS))).one()
+    for comando in comandos_particionar(menor, maior, subparticoes, meses):
+        await db.execute(text(comando))
+    return (await db.execute(text(f"SELECT count(*) FROM {TABELA}"))).scalar()
+
+
+async def desparticionar_tabela(db: AsyncSession) -> None:
+    for comando in comandos_desparticionar():
+        await db.execute(text(comando))
+
+
+async def _subparticoes_hash(db: AsyncSession, particoes: List[Particao]) -> int:
+    """Reproduz o MODULUS das partições existentes (0 = sem subpartição por user_id)."""
+    if not particoes:
+        return 0
+    result = await db.execute(
+        text("SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(:nome)"),
+        {"nome": particoes[-1].nome},
+    )
+    return result.scalar()
+
+
+async def criar_particao(db: AsyncSession, competencia: date, subparticoes: int = 0, meses: int = 1) -> str:
+    """
+    Cria a partição da faixa que contém `competencia`. Linhas dessa faixa que já caíram na DEFAULT
+    são movidas para ela antes do ATTACH (o Postgres recusa anexar uma faixa que a DEFAULT ainda contém).
+    """
+    inicio = inicio_faixa(competencia, meses)
+    fim = inicio + relativedelta(months=meses)
+    nome = nome_particao(inicio)
+    faixa = {"inicio": inicio, "fim": fim}
+    sufixo = " PARTITION BY HASH (user_id)" if subparticoes else ""
+
+    await db.execute(text(f"CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){sufixo}"))
+    for resto in range(subparticoes):
+        await db.execute(text(
+            f"CREATE TABLE {nome}_h{resto} PARTITION OF {nome} "
+            f"FOR VALUES WITH (MODULUS {subparticoes}, REMAINDER {resto})"
+        ))
+    await db.execute(text(f"""
+        WITH movidas AS (
+            DELETE FROM {PARTICAO_DEFAULT}
+            WHERE data_vencimento >= :inicio AND data_vencimento < :fim
+            RETURNING *
+        )
+        INSERT INTO {nome} SELECT * FROM movidas
+    """), faixa)
+    await db.execute(text(
+        f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')"
+    ))
+    return nome
+
+
+async def garantir_particoes(db: AsyncSession, meses_a_frente: Optional[int] = None) -> List[str]:
+    """
+    Cria as partições que faltam do mês atual até `meses_a_frente` meses adiante, na mesma largura
+    das existentes (definida na migration). Devolve as criadas.
+    """
+    if not await tabela_particionada(db):
+        return []
+    meses_a_frente = settings.PARTICOES_MESES_A_FRENTE if meses_a_frente is None else meses_a_frente
+    particoes = await listar_particoes(db)
+    existentes = {p.inicio for p in particoes}
+    subparticoes = await _subparticoes_hash(db, particoes)
+    meses = particoes[-1].meses if particoes else 1
+
+    hoje = date.today()
+    limite = hoje.replace(day=1) + relativedelta(months=meses_a_frente)
+    inicio = inicio_faixa(hoje, meses)
+    criadas = []
+    while inicio <= limite:
+        if inicio not in existentes:
+            criadas.append(await criar_particao(db, inicio, subparticoes, meses))
+        inicio += relativedelta(months=meses)
+    return criadas
+
+
+async def desanexar_particoes(db: AsyncSession, anteriores_a: date) -> Tuple[List[str], Set[int]]:
+    """
+    Arquiva as partições inteiramente anteriores a `anteriores_a`: DETACH (só catálogo; a tabela continua
+    existindo para pg_dump ou DROP) e, na mesma transação, remove os embeddings dos lançamentos arquivados
+    e as linhas de resumos_mensais das faixas. Arquivado é o mesmo que excluído para a aplicação: dashboard,
+    relatórios, RAG e rebuild_resumos.py continuam consistentes com o que está em lancamentos.
+    Devolve as partições desanexadas e os usuários afetados (para invalidar o cache depois do commit).
+    """
+    desanexadas, usuarios = [], set()
+    for particao in await listar_particoes(db):
+        if particao.fim > anteriores_a:
+            continue
+        await db.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {particao.nome}"))
+        await db.execute(delete(FinanceEmbedding).where(
+            FinanceEmbedding.lancamento_id.in_(select(column("id")).select_from(table(particao.nome)))
+        ))
+        result = await db.execute(
+            delete(ResumoMensal).where(
+                ResumoMensal.competencia >= particao.inicio,
+                ResumoMensal.competencia < particao.fim,
+            ).returning(ResumoMensal.user_id)
+        )
+        usuarios.update(result.scalars().all())
+        desanexadas.append(particao.nome)
+    return desanexadas, usuarios
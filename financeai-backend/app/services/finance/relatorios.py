@@ -0,0 +1,212 @@
+import asyncio
+import calendar
+from datetime import date
+from typing import Dict, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.schemas.relatorios import RelatorioEstatistico, EvolucaoMensal, CategoriaRanking, Indicadores, ProjecaoMes
+from app.services.finance.resumos import (
+    totais_por_tipo, despesas_por_categoria, totais_mensais, despesas_por_categoria_comparativo,
+)
+
+MESES_ABREV = {
+    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 5: 'Mai', 6: 'Jun',
+    7: 'Jul', 8: 'Ago', 9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
+}
+
+
+def _periodos(periodo: str, target_mes: int, target_ano: int) -> dict:
+    """Determina as datas de Início (Current e Prev) baseadas no período escolhido."""
+    if periodo == "anual":
+        inicio_current = date(target_ano, 1, 1)
+        fim_current = date(target_ano, 12, 31)
+        inicio_prev = date(target_ano - 1, 1, 1)
+        fim_prev = date(target_ano - 1, 12, 31)
+    elif periodo == "trimestral":
+        # Retroceder 3 meses a partir do 1o dia deste mes
+        inicio_current = date(target_ano, target_mes, 1) - relativedelta(months=2) # 2 meses cheios + o mes atual
+        _, last_day_atual = calendar.monthrange(target_ano, target_mes)
+        fim_current = date(target_ano, target_mes, last_day_atual)
+
+        fim_prev = inicio_current - relativedelta(days=1)
+        inicio_prev = inicio_current - relativedelta(months=3)
+    else: # "mensal"
+        inicio_current = date(target_ano, target_mes, 1)
+        _, last_day_atual = calendar.monthrange(target_ano, target_mes)
+        fim_current = date(target_ano, target_mes, last_day_atual)
+
+        fim_prev_mes = fim_current - relativedelta(months=1)
+        inicio_prev = date(fim_prev_mes.year, fim_prev_mes.month, 1)
+        _, last_day_prev = calendar.monthrange(fim_prev_mes.year, fim_prev_mes.month)
+        fim_prev = date(fim_prev_mes.year, fim_prev_mes.month, last_day_prev)
+
+    mes_base = date(target_ano, target_mes, 1)
+    return {
+        "mes_base": mes_base,
+        "inicio_current": inicio_current,
+        "fim_current": fim_current,
+        "inicio_prev": inicio_prev,
+        "fim_prev": fim_prev,
+        # A evolução de 1 ano serve ao gráfico de área e saldo histórico, independente do filtro pontual.
+        "inicio_evolucao": mes_base - relativedelta(months=11),
+        # Projeção usa os últimos 3 meses reais (subconjunto da janela de evolução)
+        "inicio_proj_real": mes_base - relativedelta(months=2),
+    }
+
+
+def _montar_relatorio(
+    periodos: dict,
+    mapa_evo: Dict[Tuple[int, int], Dict[str, float]],
+    cat_current: Dict[str, float],
+    cat_prev: Dict[str, float],
+    ind_map: Dict[str, float],
+    mapa_proj: Dict[Tuple[int, int], Dict[str, float]],
+) -> RelatorioEstatistico:
+    mes_base = periodos["mes_base"]
+
+    # 1. Evolução Patrimonial (Últimos 12 Meses Fixos)
+    evolucao_list = []
+    saldo_acumulado = 0.0
+
+    # Gerar preenchimento ordenado dos ultimos 12 meses
+    for i in range(11, -1, -1):
+        d_cursor = mes_base - relativedelta(months=i)
+        meskey = (d_cursor.year, d_cursor.month)
+        rec = mapa_evo.get(meskey, {}).get("receita", 0.0)
+        desp = mapa_evo.get(meskey, {}).get("despesa", 0.0)
+        reneg = mapa_evo.get(meskey, {}).get("renegociacao", 0.0)
+
+        saldo_acumulado += (rec - desp)
+
+        evolucao_list.append(EvolucaoMensal(
+            month=f"{MESES_ABREV[d_cursor.month]}",
+            receita=rec,
+            despesa=desp,
+            renegociacao=reneg,
+            saldo=saldo_acumulado
+        ))
+
+    # 2. Ranking de Categorias (Atual vs Prev) no período escolhido
+    # Todas as categorias do historico e unificar
+    todas_categorias = set(list(cat_current.keys()) + list(cat_prev.keys()))
+    ranking_categorias = []
+
+    for c_nome in todas_categorias:
+        val_curr = cat_current.get(c_nome, 0.0)
+        val_prev = cat_prev.get(c_nome, 0.0)
+
+        if val_prev > 0:
+            change_perc = ((val_curr - val_prev) / val_prev) * 100
+        else:
+            change_perc = 100.0 if val_curr > 0 else 0.0
+
+        ranking_categorias.append(CategoriaRanking(
+            name=c_nome,
+            current=val_curr,
+            prev=val_prev,
+            change=round(change_perc, 1)
+        ))
+
+    # Ordenar ranking pelo maior gasto atual
+    ranking_categorias.sort(key=lambda x: x.current, reverse=True)
+
+    # 3. Indicadores (Baseados no período full escolhido)
+    rec_total = ind_map.get("receita", 0.0)
+    desp_total = ind_map.get("despesa", 0.0)
+
+    taxa_poupanca = ((rec_total - desp_total) / rec_total * 100) if rec_total > 0 else 0.0
+    # Comprometimento usa apenas as despesas divididas pela receita. Se a despesa for maior ela passara de 100%.
+    comp_renda = (desp_total / rec_total * 100) if rec_total > 0 else 0.0
+    if comp_renda > 100.0: comp_renda = 100.0
+
+    indicadores = Indicadores(
+        taxa_poupanca_perc=round(taxa_poupanca, 1),
+        comprometimento_renda_perc=round(comp_renda, 1),
+        total_receitas=round(rec_total, 2),
+        total_despesas=round(desp_total, 2),
+    )
+
+    # 4. Projeção de Saldo (3 meses reais + 3 projetados)
+    saldos_reais = []
+    projecao_saldo = []
+    for i in range(2, -1, -1):
+        d = mes_base - relativedelta(months=i)
+        key = (d.year, d.month)
+        rec = mapa_proj.get(key, {}).get("receita", 0.0)
+        desp = mapa_proj.get(key, {}).get("despesa", 0.0)
+        saldo = round(rec - desp, 2)
+        saldos_reais.append(saldo)
+        projecao_saldo.append(ProjecaoMes(
+            month=f"{MESES_ABREV[d.month]}/{str(d.year)[2:]}",
+            saldo=saldo,
+            tipo="real"
+        ))
+
+    media_saldo = sum(saldos_reais) / len(saldos_reais) if saldos_reais else 0.0
+    for i in range(1, 4):
+        d = mes_base + relativedelta(months=i)
+        projecao_saldo.append(ProjecaoMes(
+            month=f"{MESES_ABREV[d.month]}/{str(d.year)[2:]}",
+            saldo=round(media_saldo, 2),
+            tipo="proj"
+        ))
+
+    return RelatorioEstatistico(
+        evolucao=evolucao_list,
+        ranking_categorias=ranking_categorias,
+        indicadores=indicadores,
+        projecao_saldo=projecao_saldo,
+    )
+
+
+async def obter_relatorio_sequencial(
+    db: AsyncSession, user_id: int, periodo: str, target_mes: int, target_ano: int
+) -> RelatorioEstatistico:
+    """Cinco agregações em sequência na sessão da requisição."""
+    p = _periodos(periodo, target_mes, target_ano)
+
+    mapa_evo = await totais_mensais(db, user_id, p["inicio_evolucao"], p["fim_current"])
+    cat_current = await despesas_por_categoria(db, user_id, p["inicio_current"], p["fim_current"])
+    cat_prev = await despesas_por_categoria(db, user_id, p["inicio_prev"], p["fim_prev"])
+    ind_map = await totais_por_tipo(db, user_id, p["inicio_current"], p["fim_current"])
+    mapa_proj = await totais_mensais(db, user_id, p["inicio_proj_real"], p["fim_current"])
+
+    return _montar_relatorio(p, mapa_evo, cat_current, cat_prev, ind_map, mapa_proj)
+
+
+async def obter_relatorio_concorrente(
+    user_id: int, periodo: str, target_mes: int, target_ano: int
+) -> RelatorioEstatistico:
+    """
+    Duas consultas independentes em paralelo, cada uma em sua própria sessão do pool:
+    - totais mensais da janela de evolução, dos quais derivam evolução, indicadores e projeção
+      (o período atual e os 3 meses da projeção estão sempre dentro dessa janela);
+    - ranking de categorias do período atual e anterior num único GROUP BY com FILTER.
+    O tempo total fica limitado pela consulta mais lenta em vez da soma de todas.
+    """
+    p = _periodos(periodo, target_mes, target_ano)
+
+    async def _totais_mensais():
+        async with AsyncSessionLocal() as db:
+            return await totais_mensais(db, user_id, p["inicio_evolucao"], p["fim_current"])
+
+    async def _ranking():
+        async with AsyncSessionLocal() as db:
+            return await despesas_por_categoria_comparativo(
+                db, user_id, p["inicio_current"], p["fim_current"], p["inicio_prev"], p["fim_prev"]
+            )
+
+    mapa_mensal, (cat_current, cat_prev) = await asyncio.gather(_totais_mensais(), _ranking())
+
+    inicio_ind = (p["inicio_current"].year, p["inicio_current"].month)
+    fim_ind = (p["fim_current"].year, p["fim_current"].month)
+    ind_map: Dict[str, float] = {}
+    for chave, tipos in mapa_mensal.items():
+        if inicio_ind <= chave <= fim_ind:
+            for tipo, total in tipos.items():
+                ind_map[tipo] = ind_map.get(tipo, 0.0) + total
+
+    return _montar_relatorio(p, mapa_mensal, cat_current, cat_prev, ind_map, mapa_mensal)
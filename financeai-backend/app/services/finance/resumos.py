@@ -0,0 +1,186 @@
+from datetime import date
+from typing import Dict, Tuple
+
+from sqlalchemy import select, func, delete, Date, literal, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.lancamento import Lancamento
+from app.models.categoria import Categoria
+from app.models.resumo_mensal import ResumoMensal
+
+COLUNAS_RESUMO = ["user_id", "competencia", "tipo", "categoria_id", "total", "quantidade"]
+
+
+def _competencia(coluna):
+    # 'month' literal (sem bind) para o Postgres reconhecer a mesma expressão no GROUP BY
+    return func.date_trunc(literal_column("'month'"), coluna).cast(Date)
+
+
+def _agregado_lancamentos(condicao, sinal: int = 1):
+    """SELECT que agrega os lançamentos filtrados no formato da tabela de resumos."""
+    competencia = _competencia(Lancamento.data_vencimento)
+    return select(
+        Lancamento.user_id,
+        competencia.label("competencia"),
+        Lancamento.tipo,
+        Lancamento.categoria_id,
+        (func.sum(Lancamento.valor) * sinal).label("total"),
+        (func.count(Lancamento.id) * sinal).label("quantidade"),
+    ).where(condicao).group_by(
+        Lancamento.user_id, competencia, Lancamento.tipo, Lancamento.categoria_id
+    )
+
+
+async def ajustar_resumos(db: AsyncSession, user_id: int, condicao, sinal: int = 1) -> None:
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) do rollup os lançamentos que casam com `condicao`.
+
+    Deve ser chamado na mesma transação da escrita: com sinal=-1 ANTES de alterar/remover
+    as linhas e com sinal=1 DEPOIS do flush das linhas novas/alteradas.
+    """
+    origem = _agregado_lancamentos((Lancamento.user_id == user_id) & condicao, sinal)
+    stmt = pg_insert(ResumoMensal).from_select(COLUNAS_RESUMO, origem)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_resumos_mensais_chave",
+        set_={
+            "total": ResumoMensal.total + stmt.excluded.total,
+            "quantidade": ResumoMensal.quantidade + stmt.excluded.quantidade,
+        },
+    )
+    await db.execute(stmt)
+
+    # Remove chaves que ficaram vazias (ex: último lançamento da categoria no mês excluído)
+    await db.execute(
+        delete(ResumoMensal).where(
+            ResumoMensal.user_id == user_id,
+            ResumoMensal.quantidade <= 0,
+        )
+    )
+
+
+async def reconstruir_resumos(db: AsyncSession, user_id: int | None = None) -> None:
+    """Recalcula o rollup do zero a partir de `lancamentos` (todos os usuários ou apenas um)."""
+    condicao = literal(True) if user_id is None else (Lancamento.user_id == user_id)
+    stmt_delete = delete(ResumoMensal)
+    if user_id is not None:
+        stmt_delete = stmt_delete.where(ResumoMensal.user_id == user_id)
+    await db.execute(stmt_delete)
+    await db.execute(
+        pg_insert(ResumoMensal).from_select(COLUNAS_RESUMO, _agregado_lancamentos(condicao))
+    )
+
+
+async def verificar_resumos(db: AsyncSession, user_id: int | None = None) -> list:
+    """
+    Compara o rollup com uma agregação fresca de `lancamentos`.
+    Retorna as chaves divergentes (lista vazia = rollup consistente).
+    """
+    condicao = literal(True) if user_id is None else (Lancamento.user_id == user_id)
+    fresco = _agregado_lancamentos(condicao).subquery("fresco")
+    atual = select(ResumoMensal)
+    if user_id is not None:
+        atual = atual.where(ResumoMensal.user_id == user_id)
+    atual = atual.subquery("atual")
+
+    chave = (
+        (fresco.c.user_id == atual.c.user_id)
+        & (fresco.c.competencia == atual.c.competencia)
+        & (fresco.c.tipo == atual.c.tipo)
+        & (fresco.c.categoria_id == atual.c.categoria_id)
+    )
+    stmt = select(
+        func.coalesce(fresco.c.user_id, atual.c.user_id).label("user_id"),
+        func.coalesce(fresco.c.competencia, atual.c.competencia).label("competencia"),
+        func.coalesce(fresco.c.tipo, atual.c.tipo).label("tipo"),
+        func.coalesce(fresco.c.categoria_id, atual.c.categoria_id).label("categoria_id"),
+        fresco.c.total.label("total_esperado"),
+        atual.c.total.label("total_rollup"),
+        fresco.c.quantidade.label("quantidade_esperada"),
+        atual.c.quantidade.label("quantidade_rollup"),
+    ).select_from(
+        fresco.join(atual, chave, full=True)
+    ).where(
+        or_(
+            func.coalesce(fresco.c.total, 0) != func.coalesce(atual.c.total, 0),
+            func.coalesce(fresco.c.quantidade, 0) != func.coalesce(atual.c.quantidade, 0),
+        )
+    )
+    result = await db.execute(stmt)
+    return result.all()
+
+
+# ==== LEITURAS ====
+
+async def totais_por_tipo(db: AsyncSession, user_id: int, inicio: date, fim: date) -> Dict[str, float]:
+    """Total por tipo (receita/despesa/renegociacao) entre os meses de `inicio` e `fim`."""
+    result = await db.execute(
+        select(ResumoMensal.tipo, func.sum(ResumoMensal.total).label("total")).where(
+            ResumoMensal.user_id == user_id,
+            ResumoMensal.competencia >= inicio.replace(day=1),
+            ResumoMensal.competencia <= fim,
+        ).group_by(ResumoMensal.tipo)
+    )
+    return {row.tipo: float(row.total) for row in result.all()}
+
+
+async def despesas_por_categoria(db: AsyncSession, user_id: int, inicio: date, fim: date) -> Dict[str, float]:
+    """Despesas por nome de categoria entre os meses de `inicio` e `fim`, da maior para a menor."""
+    result = await db.execute(
+        select(Categoria.nome, func.sum(ResumoMensal.total).label("total")).join(
+            Categoria, ResumoMensal.categoria_id == Categoria.id
+        ).where(
+            ResumoMensal.user_id == user_id,
+            ResumoMensal.tipo == "despesa",
+            ResumoMensal.competencia >= inicio.replace(day=1),
+            ResumoMensal.competencia <= fim,
+        ).group_by(Categoria.nome).order_by(func.sum(ResumoMensal.total).desc())
+    )
+    return {row.nome: float(row.total) for row in result.all()}
+
+
+async def despesas_por_categoria_comparativo(
+    db: AsyncSession, user_id: int, inicio: date, fim: date, inicio_prev: date, fim_prev: date
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Despesas por categoria de dois períodos (atual e anterior) num único GROUP BY com FILTER."""
+    no_atual = (ResumoMensal.competencia >= inicio.replace(day=1)) & (ResumoMensal.competencia <= fim)
+    no_prev = (ResumoMensal.competencia >= inicio_prev.replace(day=1)) & (ResumoMensal.competencia <= fim_prev)
+    result = await db.execute(
+        select(
+            Categoria.nome,
+            func.sum(ResumoMensal.total).filter(no_atual).label("atual"),
+            func.sum(ResumoMensal.total).filter(no_prev).label("prev"),
+        ).join(
+            Categoria, ResumoMensal.categoria_id == Categoria.id
+        ).where(
+            ResumoMensal.user_id == user_id,
+            ResumoMensal.tipo == "despesa",
+            or_(no_atual, no_prev),
+        ).group_by(Categoria.nome)
+    )
+    atual: Dict[str, float] = {}
+    prev: Dict[str, float] = {}
+    for row in result.all():
+        if row.atual is not None:
+            atual[row.nome] = float(row.atual)
+        if row.prev is not None:
+            prev[row.nome] = float(row.prev)
+    return atual, prev
+
+
+async def totais_mensais(db: AsyncSession, user_id: int, inicio: date, fim: date) -> Dict[Tuple[int, int], Dict[str, float]]:
+    """Totais por (ano, mes) e tipo entre os meses de `inicio` e `fim`."""
+    result = await db.execute(
+        select(
+            ResumoMensal.competencia, ResumoMensal.tipo, func.sum(ResumoMensal.total).label("total")
+        ).where(
+            ResumoMensal.user_id == user_id,
+            ResumoMensal.competencia >= inicio.replace(day=1),
+            ResumoMensal.competencia <= fim,
+        ).group_by(ResumoMensal.competencia, ResumoMensal.tipo)
+    )
+    mapa: Dict[Tuple[int, int], Dict[str, float]] = {}
+    for row in result.all():
+        chave = (row.competencia.year, row.competencia.month)
+        mapa.setdefault(chave, {})[row.tipo] = float(row.total)
+    return mapa
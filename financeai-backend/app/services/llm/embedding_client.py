@@ -0,0 +1,32 @@
+from typing import List, Protocol
+
+from app.config import settings
+
+BACKENDS_EMBEDDING = ("gemini", "local")
+
+
+class ClienteEmbeddings(Protocol):
+    """
+    O que a indexação e o chat usam do provedor de embeddings. MODELO entra na chave dos caches
+    e no conteudo_hash, então trocar de backend regera os vetores em vez de misturar espaços.
+    """
+
+    MODELO: str
+
+    async def embed(self, text: str) -> List[float]: ...
+
+    async def embed_lote(self, textos: List[str]) -> List[List[float]]: ...
+
+
+def criar_cliente_embeddings(backend: str) -> ClienteEmbeddings:
+    if backend == "local":
+        from app.services.llm.local_embedding import LocalEmbeddingClient
+        return LocalEmbeddingClient()
+    if backend == "gemini":
+        # Import tardio: com o backend local não há cliente do Gemini nem aviso de API key
+        from app.services.llm.gemini_client import gemini_client
+        return gemini_client
+    raise ValueError(f"EMBEDDING_BACKEND inválido: {backend!r} (use {', '.join(BACKENDS_EMBEDDING)})")
+
+
+embedding_client = criar_cliente_embeddings(settings.EMBEDDING_BACKEND)
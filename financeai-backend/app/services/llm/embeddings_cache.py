@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import redis_client
+from app.core.metricas import metricas
+from app.models.embedding_cache import EmbeddingCache
+from app.services.llm.embedding_client import embedding_client
+
+# Contadores no Redis: a indexação roda no worker, mas a taxa de acerto é lida pelo /metricas da API
+CHAVE_ACERTOS = "metricas:embeddings_cache:hit"
+CHAVE_FALTAS = "metricas:embeddings_cache:miss"
+
+
+def hash_conteudo(texto: str, modelo: str = embedding_client.MODELO) -> str:
+    """Chave do cache: o mesmo texto em outro modelo gera outro vetor, então o modelo entra no hash."""
+    return hashlib.sha256(f"{modelo}\n{texto}".encode("utf-8")).hexdigest()
+
+
+async def embeddings_com_cache(session: AsyncSession, textos: List[str]) -> List[List[float]]:
+    """
+    Vetores dos textos, na mesma ordem. Consulta embeddings_cache por hash numa única query e só
+    manda à API os textos ausentes (deduplicados: o mesmo texto repetido no lote é gerado uma vez).
+    Os novos vetores entram no cache na transação de quem chama; o commit fica com ele.
+    """
+    modelo = embedding_client.MODELO
+    hashes = [hash_conteudo(texto, modelo) for texto in textos]
+    unicos = list(dict.fromkeys(hashes))
+
+    result = await session.execute(
+        select(EmbeddingCache.hash, EmbeddingCache.embedding).where(EmbeddingCache.hash.in_(unicos))
+    )
+    vetores: Dict[str, List[float]] = {h: list(v) for h, v in result.all()}
+
+    faltantes = [h for h in unicos if h not in vetores]
+    if faltantes:
+        texto_por_hash = dict(zip(hashes, textos))
+        gerados = await embedding_client.embed_lote([texto_por_hash[h] for h in faltantes])
+        # Vetor zerado é o fallback de erro/sem API key: usa neste lote, mas não vai para o cache
+        novos = [
+            {"hash": h, "modelo": modelo, "embedding": vetor}
+            for h, vetor in zip(faltantes, gerados) if any(vetor)
+        ]
+        vetores.update(zip(faltantes, gerados))
+        if novos:
+            await session.execute(
+                pg_insert(EmbeddingCache).values(novos).on_conflict_do_nothing(index_elements=["hash"])
+            )
+
+    await _contabilizar(len(unicos) - len(faltantes), len(faltantes))
+    return [vetores[h] for h in hashes]
+
+
+async def _contabilizar(acertos: int, faltas: int):
+    metricas.incrementar("embeddings_cache.hit", acertos)
+    metricas.incrementar("embeddings_cache.miss", faltas)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incrby(CHAVE_ACERTOS, acertos)
+        pipe.incrby(CHAVE_FALTAS, faltas)
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Erro ao registrar métricas do cache de embeddings: {e}")
+
+
+async def taxa_acerto() -> dict:
+    """Acertos/faltas acumulados por todos os processos e a taxa de acerto (None sem dados)."""
+    try:
+        acertos, faltas = await redis_client.mget(CHAVE_ACERTOS, CHAVE_FALTAS)
+    except RedisError:
+        return {"acertos": None, "faltas": None, "taxa_acerto": None}
+    acertos, faltas = int(acertos or 0), int(faltas or 0)
+    total = acertos + faltas
+    return {"acertos": acertos, "faltas": faltas, "taxa_acerto": round(acertos / total, 4) if total else None}
+
+
+def normalizar_pergunta(pergunta: str) -> str:
+    """Forma canônica da pergunta: "Quanto gastei este mês?" e "quanto  gastei este mês" viram a mesma chave."""
+    texto = unicodedata.normalize("NFC", pergunta).lower()
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return texto.rstrip(" ?!.")
+
+
+class CacheEmbeddingsConsulta:
+    """
+    Embeddings de perguntas do chat: LRU em memória (float32, no máximo `max_itens` vetores)
+    com o Redis como segundo nível, compartilhado entre processos e reinícios.
+    A chave é o hash (modelo + pergunta normalizada); o vetor é gerado a partir do texto normalizado,
+    então o mesmo texto sempre corresponde ao mesmo vetor.
+    """
+
+    def __init__(self, max_itens: int, ttl_segundos: int):
+        self.max_itens = max_itens
+        self.ttl = ttl_segundos
+        self._itens: OrderedDict = OrderedDict()
+
+    def _guardar_local(self, chave: str, vetor: array):
+        self._itens[chave] = vetor
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    async def _ler_redis(self, chave: str) -> Optional[array]:
+        try:
+            bruto = await redis_client.get(f"embq:{chave}")
+        except RedisError as e:
+            print(f"Erro ao ler embedding de consulta no Redis: {e}")
+            return None
+        if bruto is None:
+            return None
+        vetor = array("f")
+        vetor.frombytes(base64.b64decode(bruto))
+        return vetor
+
+    async def _gravar_redis(self, chave: str, vetor: array):
+        try:
+            # decode_responses=True no cliente compartilhado: o float32 bruto vai em base64 (~4 KB)
+            await redis_client.set(f"embq:{chave}", base64.b64encode(vetor.tobytes()).decode("ascii"), ex=self.ttl)
+        except RedisError as e:
+            print(f"Erro ao gravar embedding de consulta no Redis: {e}")
+
+    async def obter(self, pergunta: str) -> List[float]:
+        texto = normalizar_pergunta(pergunta)
+        chave = hash_conteudo(texto)
+
+        vetor = self._itens.get(chave)
+        if vetor is not None:
+            self._itens.move_to_end(chave)
+            metricas.incrementar("embedding_consulta.memoria.hit")
+            return vetor.tolist()
+
+        vetor = await self._ler_redis(chave)
+        if vetor is not None:
+            metricas.incrementar("embedding_consulta.redis.hit")
+            self._guardar_local(chave, vetor)
+            return vetor.tolist()
+
+        metricas.incrementar("embedding_consulta.miss")
+        gerado = await embedding_client.embed(texto)
+        if any(gerado):  # vetor zerado = falha do provedor, não vai para o cache
+            vetor = array("f", gerado)
+            self._guardar_local(chave, vetor)
+            await self._gravar_redis(chave, vetor)
+        return list(gerado)
+
+
+cache_embeddings_consulta = CacheEmbeddingsConsulta(
+    settings.EMBEDDING_CONSULTA_CACHE_MAX, settings.EMBEDDING_CONSULTA_TTL_SEGUNDOS
+)
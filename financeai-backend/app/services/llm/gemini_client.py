@@ -1,28 +1,104 @@
+import asyncio
 import os
+import random
+import time
+
+import httpx
 from google import genai
+from google.genai import errors
+
+from app.config import settings
+from app.core.metricas import metricas
+
+DIMENSOES = 768
+# Espera antes da 2ª tentativa; dobra a cada nova tentativa (sorteada entre 0 e o teto: "full jitter")
+BACKOFF_BASE_SEGUNDOS = 0.5
+
+
+def _retentavel(erro: Exception) -> bool:
+    """Timeout, falha de rede, 429 e 5xx valem nova tentativa; os demais 4xx não mudam ao repetir."""
+    if isinstance(erro, (TimeoutError, httpx.TransportError, OSError, errors.ServerError)):
+        return True
+    return isinstance(erro, errors.ClientError) and erro.code == 429
+
 
 class GeminiEmbeddingClient:
-    def __init__(self):
+    MODELO = "text-embedding-004"
+
+    def __init__(self, concorrencia_max: int, timeout_segundos: float, tentativas: int):
+        self.concorrencia_max = concorrencia_max
+        self.timeout_segundos = timeout_segundos
+        self.tentativas = max(1, tentativas)
+        self._loop = None
+        self._semaforo = None
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             print("AVISO: GEMINI_API_KEY não encontrada no .env")
         else:
             self.client = genai.Client(api_key=self.api_key)
 
-    async def embed(self, text: str, model: str = "text-embedding-004") -> list[float]:
+    def _semaforo_do_loop(self) -> asyncio.Semaphore:
+        # O semáforo fica preso ao event loop em que foi usado; recria se o processo trocar de loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._semaforo = loop, asyncio.Semaphore(self.concorrencia_max)
+        return self._semaforo
+
+    async def _embed_content(self, contents, model: str, operacao: str) -> list[list[float]]:
+        """
+        Chamada pela superfície assíncrona do SDK (client.aio): o event loop segue atendendo
+        enquanto a requisição está na rede. No máximo `concorrencia_max` chamadas simultâneas por
+        processo, timeout por tentativa e novas tentativas com backoff exponencial e jitter.
+        Latências em /metricas: espera pelo semáforo e duração de cada tentativa bem-sucedida.
+        """
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                inicio = time.perf_counter()
+                async with self._semaforo_do_loop():
+                    metricas.observar("embedding.gemini.fila.ms", (time.perf_counter() - inicio) * 1000)
+                    inicio = time.perf_counter()
+                    result = await asyncio.wait_for(
+                        self.client.aio.models.embed_content(model=model, contents=contents),
+                        timeout=self.timeout_segundos,
+                    )
+                metricas.observar(f"embedding.gemini.{operacao}.ms", (time.perf_counter() - inicio) * 1000)
+                return [embedding.values for embedding in result.embeddings]
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    metricas.incrementar("embedding.gemini.timeout")
+                if not _retentavel(e) or tentativa == self.tentativas:
+                    raise
+                espera = random.uniform(0, BACKOFF_BASE_SEGUNDOS * 2 ** (tentativa - 1))
+                metricas.incrementar("embedding.gemini.retentativa")
+                print(f"Embedding falhou (tentativa {tentativa}/{self.tentativas}): {e!r}; nova tentativa em {espera:.2f} s")
+                # Fora do semáforo: quem espera o backoff não ocupa vaga de quem pode chamar agora
+                await asyncio.sleep(espera)
+
+    async def embed(self, text: str, model: str = MODELO) -> list[float]:
         if not self.api_key:
             # Fallback seguro para não travar o worker se não tiver API key
-            return [0.0] * 768
-            
+            return [0.0] * DIMENSOES
+
         try:
             # text-embedding-004 gera vetor 768 por padrão (compatível com nosso banco)
-            result = self.client.models.embed_content(
-                model=model,
-                contents=text,
-            )
-            return result.embeddings[0].values
+            return (await self._embed_content(text, model, "embed"))[0]
+        except Exception as e:
+            metricas.incrementar("embedding.gemini.erro")
+            print(f"Erro ao gerar embedding: {e!r}")
+            return [0.0] * DIMENSOES
+
+    async def embed_lote(self, textos: list[str], model: str = MODELO) -> list[list[float]]:
+        """Vários textos numa única chamada (batchEmbedContents aceita até 100 por requisição)."""
+        if not self.api_key:
+            return [[0.0] * DIMENSOES for _ in textos]
+
+        try:
+            return await self._embed_content(textos, model, "embed_lote")
         except Exception as e:
-            print(f"Erro ao gerar embedding: {e}")
-            return [0.0] * 768
+            metricas.incrementar("embedding.gemini.erro")
+            print(f"Erro ao gerar embeddings em lote ({len(textos)} textos): {e!r}")
+            return [[0.0] * DIMENSOES for _ in textos]
 
-gemini_client = GeminiEmbeddingClient()
+gemini_client = GeminiEmbeddingClient(
+    settings.EMBEDDING_CONCORRENCIA_MAX, settings.EMBEDDING_TIMEOUT_SEGUNDOS, settings.EMBEDDING_TENTATIVAS
+)
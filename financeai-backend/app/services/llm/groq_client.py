@@ -1,44 +1,90 @@
+import json
 import os
+import time
+from typing import AsyncGenerator, Optional
+
 import httpx
-from typing import AsyncGenerator
+
+from app.config import settings
+from app.core.metricas import metricas
 
 class GroqClient:
+    """
+    Streaming de chat completions da Groq sobre um único httpx.AsyncClient por processo.
+    As conexões ficam abertas entre chamadas (keep-alive), então cada mensagem do chat não paga
+    de novo TCP + TLS nas duas chamadas que faz (intenção e resposta).
+    O cliente é aberto e fechado pelo lifespan da aplicação; fora dela (scripts), nasce na primeira chamada.
+    """
+
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.base_url = f"{settings.GROQ_BASE_URL.rstrip('/')}/chat/completions"
+        self._client: Optional[httpx.AsyncClient] = None
         if not self.api_key:
             print("AVISO: GROQ_API_KEY não encontrada no .env")
 
+    def _criar_cliente(self) -> httpx.AsyncClient:
+        http2 = settings.GROQ_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("AVISO: GROQ_HTTP2 ligado, mas o pacote h2 não está instalado (pip install 'httpx[http2]'); usando HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_MAX_CONEXOES,
+                max_keepalive_connections=settings.GROQ_MAX_CONEXOES_OCIOSAS,
+                keepalive_expiry=settings.GROQ_KEEPALIVE_SEGUNDOS,
+            ),
+            # read é o intervalo máximo entre pedaços do stream, não a duração da resposta inteira
+            timeout=httpx.Timeout(settings.GROQ_TIMEOUT_SEGUNDOS, connect=5.0),
+        )
+
+    async def iniciar(self):
+        if self._client is None:
+            self._client = self._criar_cliente()
+
+    async def fechar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def generate_response(self, prompt: str, model: str = "llama-3.3-70b-versatile") -> AsyncGenerator[str, None]:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
+        await self.iniciar()
+
         payload = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.5,
             "stream": True
         }
-        
-        async with httpx.AsyncClient() as client:
-            async with client.stream("POST", self.base_url, json=payload, headers=headers) as response:
-                if response.status_code != 200:
-                    error_msg = await response.aread()
-                    print("ERRO GROQ:", response.status_code, error_msg)
-                    yield f"Desculpe, erro {response.status_code} na API da Groq."
-                    return
-                    
-                async for line in response.aiter_lines():
-                    if line.startswith("data: ") and line != "data: [DONE]":
-                        try:
-                            import json
-                            data = json.loads(line[6:])
-                            content = data["choices"][0]["delta"].get("content", "")
-                            if content:
-                                yield content
-                        except:
-                            continue
+
+        inicio = time.perf_counter()
+        primeiro_token = True
+        async with self._client.stream("POST", self.base_url, json=payload) as response:
+            if response.status_code != 200:
+                error_msg = await response.aread()
+                print("ERRO GROQ:", response.status_code, error_msg)
+                metricas.incrementar("llm.groq.erro")
+                yield f"Desculpe, erro {response.status_code} na API da Groq."
+                return
+
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and line != "data: [DONE]":
+                    try:
+                        data = json.loads(line[6:])
+                        content = data["choices"][0]["delta"].get("content", "")
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    if content:
+                        if primeiro_token:
+                            # Tempo até o primeiro token: inclui conexão (se nova), fila da Groq e prefill
+                            metricas.observar("llm.groq.ttft.ms", (time.perf_counter() - inicio) * 1000)
+                            primeiro_token = False
+                        yield content
+        metricas.observar("llm.groq.resposta.ms", (time.perf_counter() - inicio) * 1000)
 
 groq_client = GroqClient()
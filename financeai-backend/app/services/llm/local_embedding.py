@@ -0,0 +1,68 @@
+import asyncio
+import math
+import re
+import unicodedata
+import zlib
+from typing import List
+
+# Palavras que aparecem em quase todo texto indexado e só aproximariam lançamentos sem relação
+PALAVRAS_VAZIAS = frozenset({
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "em", "no", "na", "nos", "nas",
+    "e", "com", "por", "para", "um", "uma", "r",
+})
+
+
+class LocalEmbeddingClient:
+    """
+    Embeddings sem rede, calculados na CPU: feature hashing de palavras, pares de palavras e
+    n-gramas de caracteres (3 a 5, com marcação de início/fim de palavra) em `dimensoes` posições
+    com sinal, normalizado (norma 1). Determinístico entre processos e máquinas (CRC32, não hash()).
+
+    Captura semelhança lexical ("netflix" ~ "NETFLIX.COM", "mercado" ~ "supermercado"), não sinônimos:
+    serve para instalações sem acesso à API e para benchmarks reprodutíveis.
+    Nunca devolve vetor zerado: texto sem palavras vira um vetor fixo.
+    """
+
+    PESO_PALAVRA = 1.0
+    PESO_PAR = 0.5
+    PESO_NGRAMA = 0.25
+
+    def __init__(self, dimensoes: int = 768):
+        self.dimensoes = dimensoes
+        self.MODELO = f"local-hash-ngram-v1-{dimensoes}"
+
+    def _features(self, texto: str):
+        texto = unicodedata.normalize("NFKD", texto.lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        palavras = [p for p in re.findall(r"\w+", texto) if p not in PALAVRAS_VAZIAS]
+        if not palavras:
+            yield "v:", 1.0
+            return
+        for palavra in palavras:
+            yield f"p:{palavra}", self.PESO_PALAVRA
+            marcada = f"#{palavra}#"
+            for n in (3, 4, 5):
+                for i in range(len(marcada) - n + 1):
+                    yield f"c:{marcada[i:i + n]}", self.PESO_NGRAMA
+        for anterior, seguinte in zip(palavras, palavras[1:]):
+            yield f"b:{anterior} {seguinte}", self.PESO_PAR
+
+    def vetorizar(self, texto: str) -> List[float]:
+        vetor = [0.0] * self.dimensoes
+        for feature, peso in self._features(texto):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # Bit mais alto dá o sinal: colisões tendem a se cancelar em vez de somar
+            vetor[h % self.dimensoes] += peso if h & 0x80000000 else -peso
+        norma = math.sqrt(sum(x * x for x in vetor))
+        if not norma:
+            # Colisões que se anularam por completo (raríssimo): mantém um vetor válido
+            vetor[zlib.crc32(texto.encode("utf-8")) % self.dimensoes] = 1.0
+            return vetor
+        return [x / norma for x in vetor]
+
+    async def embed(self, text: str) -> list[float]:
+        return self.vetorizar(text)
+
+    async def embed_lote(self, textos: list[str]) -> list[list[float]]:
+        """Lote inteiro numa thread: ~1 ms por texto de lançamento, não trava o event loop em lotes de 100."""
+        return await asyncio.to_thread(lambda: [self.vetorizar(t) for t in textos])
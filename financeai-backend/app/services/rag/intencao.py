@@ -0,0 +1,383 @@
+"""
+Interpretação local (por regras) das mensagens do chat: decide se o usuário quer criar um lançamento
+e extrai valor, data, parcelas e tipo no mesmo formato JSON que a extração pela LLM devolve.
+Só responde quando a frase é inequívoca; nos demais casos devolve extracao=None e o chat pergunta à LLM.
+"""
+import re
+import unicodedata
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional
+
+from dateutil.relativedelta import relativedelta
+
+NUMEROS = {
+    "dois": 2, "duas": 2, "tres": 3, "quatro": 4, "cinco": 5, "seis": 6, "sete": 7, "oito": 8, "nove": 9,
+    "dez": 10, "onze": 11, "doze": 12, "treze": 13, "catorze": 14, "quatorze": 14, "quinze": 15,
+    "dezesseis": 16, "dezessete": 17, "dezoito": 18, "dezenove": 19, "vinte": 20, "trinta": 30,
+    "quarenta": 40, "cinquenta": 50, "sessenta": 60, "setenta": 70, "oitenta": 80, "noventa": 90,
+    "cem": 100, "cento": 100, "duzentos": 200, "duzentas": 200, "trezentos": 300, "trezentas": 300,
+    "quatrocentos": 400, "quinhentos": 500, "seiscentos": 600, "setecentos": 700, "oitocentos": 800,
+    "novecentos": 900, "um": 1, "uma": 1,
+}
+MULTIPLICADORES = {"mil": 1_000, "k": 1_000, "milhao": 1_000_000, "milhoes": 1_000_000}
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6, "julho": 7,
+    "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Pedidos de criação: imperativo, infinitivo ("quero registrar") e 3ª pessoa ("pode anotar", "anota aí")
+VERBO_CRIAR = re.compile(
+    r"\b(registr(e|a|ar)|adicion(e|a|ar)|lanc(e|a|ar)|anot(e|a|ar)|cadastr(e|a|ar)|inclu(a|i|ir)"
+    r"|coloc(a|ar|que)|bot(a|e|ar)|cri(e|a|ar)|salv(e|a|ar)|insir(a)|inser(e|ir)|agend(e|a|ar))\b"
+)
+# Começo de pergunta/pedido de informação: nunca cria lançamento
+PERGUNTA = re.compile(
+    r"^(quanto|quantos|quantas|qual|quais|quando|como|onde|por que|porque|o que|quem|devo|posso|"
+    r"sera|vale a pena|me (ajuda|ajude|explica|explique|diz|diga|mostra|mostre|fala)|"
+    r"mostr|list|compar|analis|resum|tenho|estou|dicas?)\b"
+)
+SAUDACAO = re.compile(r"^(oi|ola|bom dia|boa tarde|boa noite|obrigad[oa]|valeu|tchau|e ai)\b")
+# Relato no passado ("gastei 50 no mercado"): pode ser pedido de registro ou só conversa, fica com a LLM
+RELATO = re.compile(r"\b(gastei|paguei|comprei|recebi|ganhei|transferi|depositei)\b")
+
+PISTAS_RECEITA = {
+    "receita", "recebi", "receber", "recebimento", "salario", "ganhei", "ganho", "entrada", "renda",
+    "rendimento", "rendimentos", "freela", "freelance", "venda", "vendi", "reembolso", "dividendos",
+    "bonus", "premio", "cashback",
+}
+PISTAS_DESPESA = {
+    "despesa", "gasto", "gastei", "paguei", "pagar", "pagamento", "conta", "compra", "comprei",
+    "boleto", "fatura", "mensalidade", "assinatura", "aluguel",
+}
+# Palavras do pedido, não do nome do lançamento
+RUIDO_NOME = {
+    "despesa", "receita", "gasto", "lancamento", "novo", "nova", "valor", "reais", "real", "r$", "conto",
+    "contos", "pila", "por", "favor", "pra", "mim", "me", "ai", "quero", "preciso", "pode", "voce",
+    "consegue", "tipo", "referente", "uma", "um", "vista", "partir", "comecando", "vencendo",
+}
+# Referências de tempo que a regra não resolve ("semana passada", "sexta", "3 dias atrás"): se sobrarem
+# depois de extrair a data, a data de hoje estaria errada e a palavra iria parar no nome
+TEMPO_NAO_TRATADO = {
+    "passado", "passada", "anterior", "retrasado", "retrasada", "atras", "ultimo", "ultima", "daqui",
+    "dia", "dias", "semana", "semanas", "mes", "meses", "ano", "anos", "fim", "feriado", "primeiro",
+    "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo",
+}
+# Verbos e sujeito no trecho do nome ("mercado que eu gastei"): o nome é uma oração, não um item
+VERBO_NO_NOME = re.compile(
+    r"(eu|ele|ela|foi|fui|fiz|era|vou|vai|tive|tenho|estava|recebi|vendi|comi|bebi|transferi"
+    r"|\w{2,}ei|\w+ou)"  # "gastei", "paguei", "comprou", "custou"
+)
+BORDA_NOME = {
+    "de", "do", "da", "dos", "das", "no", "na", "nos", "nas", "em", "com", "o", "a", "os", "as", "e",
+    "para", "pro", "pra", "ao", "aos", "à", "que", "vence", "vencimento", "pago", "paga", "hoje",
+}
+
+NUMERO = r"(\d+(?:[.,]\d+)?)"
+
+
+class ResultadoIntencao(NamedTuple):
+    """extracao no formato da LLM quando a regra tem certeza; None quando a mensagem deve ir à LLM."""
+    extracao: Optional[dict]
+    motivo: str
+
+
+def _sem_acento(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def _valor_digitos(texto: str) -> Optional[float]:
+    """
+    "1.234,56" -> 1234.56; "1.500" -> 1500; "2,5" -> 2.5; "12.5" -> 12.5.
+    None quando a escrita não é a brasileira ou não dá para saber: "1,234.56" (americana),
+    "2,500" (milhar ou decimal?), "1.23.4".
+    """
+    if "," in texto:
+        inteiro, _, fracao = texto.rpartition(",")
+        if "," in inteiro or "." in fracao or len(fracao) == 3:
+            return None
+        if "." in inteiro and not re.fullmatch(r"\d{1,3}(\.\d{3})+", inteiro):
+            return None
+        return float(inteiro.replace(".", "") + "." + fracao)
+    partes = texto.split(".")
+    if len(partes) > 1 and all(len(p) == 3 for p in partes[1:]):
+        return float("".join(partes)) if len(partes[0]) <= 3 else None
+    return float(texto) if len(partes) <= 2 else None
+
+
+class _Token:
+    __slots__ = ("norm", "original", "valor", "usado")
+
+    def __init__(self, norm: str, original: str, valor: Optional[float] = None):
+        self.norm, self.original, self.valor, self.usado = norm, original, valor, False
+
+
+def _tokens(texto: str) -> List[_Token]:
+    """Palavras, números e pontuação; números por extenso e com multiplicador viram um único token."""
+    brutos = re.findall(r"r\$|\d+(?:[.,]\d+)*|\w+|[^\w\s]", texto, re.IGNORECASE)
+    normais = [_sem_acento(b) for b in brutos]
+    tokens: List[_Token] = []
+    i = 0
+    while i < len(brutos):
+        total, atual, j = 0.0, None, i
+        while j < len(brutos):
+            norm = normais[j]
+            if (re.fullmatch(r"\d+(?:[.,]\d+)*", norm) and _valor_digitos(norm) is not None
+                    and (j == i or (atual is None and total))):
+                atual = _valor_digitos(norm)
+            elif norm in NUMEROS and not re.fullmatch(r"\d.*", normais[j - 1] if j > i else ""):
+                atual = (atual or 0) + NUMEROS[norm]
+            elif norm in MULTIPLICADORES and j > i and (norm != "k" or atual is not None):
+                total += (atual if atual is not None else 1) * MULTIPLICADORES[norm]
+                atual = None
+            elif norm == "mil" and j == i:
+                total, atual = 1000.0, None
+            elif norm == "e" and j > i and j + 1 < len(brutos) and (
+                normais[j + 1] in NUMEROS or (total and re.fullmatch(r"\d+", normais[j + 1]))
+            ):
+                pass
+            else:
+                break
+            j += 1
+        consumidos = j - i
+        valor = total + (atual or 0)
+        # "um"/"uma" sozinhos são artigo, não número
+        if consumidos == 0 or (consumidos == 1 and normais[i] in ("um", "uma")):
+            tokens.append(_Token(normais[i], brutos[i]))
+            i += 1
+            continue
+        if normais[j - 1] == "e":
+            j -= 1
+        norm = str(int(valor)) if valor == int(valor) else f"{valor:.2f}".rstrip("0")
+        tokens.append(_Token(norm, " ".join(brutos[i:j]), valor))
+        i = j
+    return tokens
+
+
+class _Frase:
+    """Tokens unidos por espaço, para casar regex e marcar como usados os tokens de cada trecho."""
+
+    def __init__(self, tokens: List[_Token]):
+        self.tokens = tokens
+        self.inicios = []
+        partes, pos = [], 0
+        for t in tokens:
+            self.inicios.append(pos)
+            partes.append(t.norm)
+            pos += len(t.norm) + 1
+        self.texto = " ".join(partes)
+
+    def _indice(self, pos: int) -> int:
+        for k in range(len(self.inicios) - 1, -1, -1):
+            if self.inicios[k] <= pos:
+                return k
+        return 0
+
+    def buscar(self, padrao: str):
+        """Primeiro trecho ainda não usado que casa com o padrão: (match, tokens do trecho)."""
+        for m in re.finditer(padrao, self.texto):
+            trecho = self.tokens[self._indice(m.start()):self._indice(max(m.end() - 1, m.start())) + 1]
+            if not any(t.usado for t in trecho):
+                return m, trecho
+        return None, []
+
+    def token_em(self, pos: int) -> _Token:
+        return self.tokens[self._indice(pos)]
+
+    @staticmethod
+    def usar(trecho: List[_Token]):
+        for t in trecho:
+            t.usado = True
+
+
+def _dia_no_mes(ano: int, mes: int, dia: int) -> Optional[date]:
+    """A data, ou None se o dia não existe no mês ("31 de fevereiro", "31/11")."""
+    if not (1 <= ano <= 9999 and 1 <= mes <= 12) or not 1 <= dia <= monthrange(ano, mes)[1]:
+        return None
+    return date(ano, mes, dia)
+
+
+def _extrair_data(frase: _Frase, hoje: date):
+    """Data do lançamento e se a mensagem citou alguma. Datas inválidas devolvem (None, True): incerto."""
+    m, trecho = frase.buscar(r"\b(depois de amanha|anteontem|amanha|hoje|ontem)\b")
+    if m:
+        frase.usar(trecho)
+        deslocamento = {"depois de amanha": 2, "amanha": 1, "hoje": 0, "ontem": -1, "anteontem": -2}[m.group(1)]
+        return hoje + timedelta(days=deslocamento), True
+
+    m, trecho = frase.buscar(rf"\b(?:dia )?{NUMERO} de ({'|'.join(MESES)})(?: de (\d{{4}}))?\b")
+    if m:
+        frase.usar(trecho)
+        ano = int(m.group(3)) if m.group(3) else hoje.year
+        dia = float(m.group(1).replace(",", "."))
+        return (_dia_no_mes(ano, MESES[m.group(2)], int(dia)) if dia == int(dia) else None), True
+
+    proximo = r"(?: (?:do|de|no) (?:mes que vem|proximo mes|mes seguinte))"
+    # "dia 31/11" é dia/mês, tratado abaixo
+    m, trecho = frase.buscar(rf"\b(?:(?:no|para o|pro|todo) )?dia {NUMERO}(?! /)({proximo})?\b")
+    if m:
+        frase.usar(trecho)
+        base = hoje + relativedelta(months=1) if m.group(2) else hoje
+        dia = float(m.group(1).replace(",", "."))
+        return (_dia_no_mes(base.year, base.month, int(dia)) if dia == int(dia) else None), True
+
+    m, trecho = frase.buscar(r"\b(?:(?:(?:no|para o|pro) )?dia )?(\d{1,2}) / (\d{1,2})(?: / (\d{2,4}))?\b")
+    if m:
+        frase.usar(trecho)
+        dia, mes = int(m.group(1)), int(m.group(2))
+        ano = int(m.group(3)) if m.group(3) else hoje.year
+        ano = ano + 2000 if ano < 100 else ano
+        return _dia_no_mes(ano, mes, dia), True
+
+    m, trecho = frase.buscar(r"\b(?:(?:no|para o|pro) )?(mes que vem|proximo mes|mes seguinte)\b")
+    if m:
+        frase.usar(trecho)
+        return hoje + relativedelta(months=1), True
+
+    m, trecho = frase.buscar(r"\b(?:(?:na|para a|pra) )?(semana que vem|proxima semana)\b")
+    if m:
+        frase.usar(trecho)
+        return hoje + timedelta(days=7), True
+
+    return hoje, False
+
+
+def _extrair_parcelas(frase: _Frase):
+    """(parcelas, valor da parcela se dito como "12x de 100")."""
+    m, trecho = frase.buscar(r"\b(?:a vista|sem parcelar)\b")
+    if m:
+        frase.usar(trecho)
+        return 1, None
+    m, trecho = frase.buscar(
+        rf"\b(?:(?:em|parcelad[oa] em|dividid[oa] em) )?{NUMERO} ?(?:x|vezes|parcelas|prestacoes)"
+        rf"(?: (?:de|no valor de) (?:r\$ )?{NUMERO})?\b"
+    )
+    if not m:
+        m, trecho = frase.buscar(rf"\b(?:parcelad[oa]|dividid[oa]) em {NUMERO}\b")
+    if not m:
+        return 1, None
+    frase.usar(trecho)
+    valor_parcela = frase.token_em(m.start(2)).valor if m.lastindex and m.lastindex >= 2 and m.group(2) else None
+    parcelas = float(m.group(1).replace(",", "."))
+    return (int(parcelas) if parcelas == int(parcelas) else 0), valor_parcela
+
+
+def _extrair_valor(frase: _Frase) -> Optional[float]:
+    """O valor citado: o marcado com R$/reais/mil, ou o único número restante. Dois candidatos: incerto."""
+    m, trecho = frase.buscar(rf"(?:r\$ ){NUMERO}|{NUMERO}(?: (?:reais|real|conto|contos|pila))")
+    if m:
+        frase.usar(trecho)
+        marcado = frase.token_em(m.start(1) if m.group(1) else m.start(2)).valor
+    candidatos = [t for t in frase.tokens if t.valor is not None and not t.usado and t.norm not in ("um", "uma")]
+    if m:
+        # "50 reais de mercado e 30 de padaria": são dois lançamentos
+        return None if candidatos else marcado
+    if len(candidatos) != 1:
+        return None
+    candidatos[0].usado = True
+    return candidatos[0].valor
+
+
+def _extrair_nome(frase: _Frase) -> str:
+    """
+    O trecho contínuo de palavras que sobrou, sem as palavras do pedido e preposições nas bordas.
+    Dois trechos, ou um trecho com verbo: incerto ("").
+    """
+    trechos, atual = [], []
+    for t in frase.tokens:
+        if t.usado or t.valor is not None or not re.fullmatch(r"\w+", t.norm) or t.norm in RUIDO_NOME:
+            if atual:
+                trechos.append(atual)
+            atual = []
+        else:
+            atual.append(t)
+    if atual:
+        trechos.append(atual)
+    restantes = []
+    for trecho in trechos:
+        while trecho and trecho[0].norm in BORDA_NOME:
+            trecho = trecho[1:]
+        while trecho and trecho[-1].norm in BORDA_NOME:
+            trecho = trecho[:-1]
+        if trecho:
+            restantes.append(trecho)
+    # "oi, registra 30 de lanche", "coloca na planilha 200 de presente": qual dos dois é o nome?
+    if len(restantes) != 1:
+        return ""
+    # "mercado que eu gastei": sobrou uma oração, não o nome de um item
+    if any(VERBO_NO_NOME.fullmatch(t.norm) for t in restantes[0]):
+        return ""
+    nome = " ".join(t.original for t in restantes[0])
+    # "mercado" -> "Mercado", mas "iFood" fica como foi escrito
+    return nome[0].upper() + nome[1:] if restantes[0][0].original.islower() else nome
+
+
+def interpretar_mensagem(mensagem: str, hoje: date) -> ResultadoIntencao:
+    """
+    Regras para as frases mais comuns do chat:
+    - pergunta, saudação ou mensagem sem valor nem pedido de registro: não cria (certeza);
+    - pedido de registro ("registre", "adiciona", "anota aí"...) com valor, nome, tipo e data
+      inequívocos: cria (certeza), com valor ("2 mil", "R$ 1.234,56", "cinquenta reais"),
+      data ("dia 15", "dia 5 do mês que vem", "amanhã", "15/11") e parcelas ("em 12x", "3 vezes de 100");
+    - o resto (relatos como "gastei 50 no mercado", dois valores, negação, tipo contraditório,
+      valor fora da escrita brasileira, data que a regra não resolve): None.
+    """
+    texto = _sem_acento(mensagem).strip()
+    if not texto:
+        return ResultadoIntencao({"intencao_de_criar": False}, "vazia")
+
+    verbo = VERBO_CRIAR.search(texto)
+    if verbo and re.search(r"\b(nao|nunca|sem)\s+(\w+\s+)?$", texto[:verbo.start()]):
+        return ResultadoIntencao(None, "negacao")
+
+    frase = _Frase(_tokens(mensagem))
+    # "1,234.56", "2,500": número que a regra não sabe ler; quem decide é a LLM
+    valor_ambiguo = any(_valor_digitos(n) is None for n in re.findall(r"\d+(?:[.,]\d+)*", texto))
+    tem_numero = valor_ambiguo or any(t.valor is not None for t in frase.tokens)
+
+    if not verbo:
+        if PERGUNTA.match(texto) or texto.endswith("?") or SAUDACAO.match(texto):
+            return ResultadoIntencao({"intencao_de_criar": False}, "pergunta")
+        if not tem_numero:
+            return ResultadoIntencao({"intencao_de_criar": False}, "sem_valor")
+        return ResultadoIntencao(None, "relato" if RELATO.search(texto) else "sem_verbo")
+
+    # "como registro...", "quando lanço..." perguntam sobre o app, não pedem registro
+    if re.match(r"^(como|quando|onde|por que|porque|qual|quais|quanto)\b", texto):
+        return ResultadoIntencao(None, "pergunta_com_verbo")
+    if valor_ambiguo:
+        return ResultadoIntencao(None, "valor_ambiguo")
+
+    frase.usar(frase.buscar(VERBO_CRIAR.pattern)[1])
+    data, _ = _extrair_data(frase, hoje)
+    parcelas, valor_parcela = _extrair_parcelas(frase)
+    valor = valor_parcela if valor_parcela is not None else _extrair_valor(frase)
+    if data is None or not 1 <= parcelas <= 120:
+        return ResultadoIntencao(None, "data_ou_parcelas")
+    if any(not t.usado and t.norm in TEMPO_NAO_TRATADO for t in frase.tokens):
+        return ResultadoIntencao(None, "data_nao_reconhecida")
+    if not valor or valor <= 0:
+        return ResultadoIntencao(None, "sem_valor_definido")
+    if parcelas > 1 and valor_parcela is None:
+        # "3000 em 12x": total ou parcela? A regra não escolhe
+        return ResultadoIntencao(None, "valor_parcelado")
+
+    palavras = set(re.findall(r"\w+", texto))
+    receita, despesa = palavras & PISTAS_RECEITA, palavras & PISTAS_DESPESA
+    if receita and despesa:
+        return ResultadoIntencao(None, "tipo_ambiguo")
+    tipo = "receita" if receita else "despesa"
+
+    nome = _extrair_nome(frase)
+    if not nome:
+        return ResultadoIntencao(None, "sem_nome")
+
+    return ResultadoIntencao({
+        "intencao_de_criar": True,
+        "nome": nome,
+        "valor": round(valor, 2),
+        "tipo": tipo,
+        "data_inicial": data.isoformat(),
+        "parcelas": parcelas,
+    }, "criar")
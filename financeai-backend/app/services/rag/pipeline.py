@@ -1,11 +1,18 @@
+import asyncio
 import json
+import time
+from contextlib import suppress
 from datetime import datetime
 from fastapi import WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
+from app.config import settings
+from app.core.metricas import metricas
+from app.db.session import AsyncSessionLocal
 from app.services.llm.groq_client import groq_client
-from app.services.llm.gemini_client import gemini_client
+from app.services.llm.embeddings_cache import cache_embeddings_consulta
+from app.services.rag.intencao import interpretar_mensagem
 from app.services.rag.retriever import retriever
 from app.services.rag.prompt_builder import prompt_builder
 from app.models.embedding import FinanceEmbedding
@@ -19,6 +26,8 @@ from sqlalchemy.orm import aliased
 import uuid
 from dateutil.relativedelta import relativedelta
 from app.models.categoria import Categoria
+from app.services.finance.resumos import ajustar_resumos
+from app.core.cache import invalidar_cache_usuario
 
 async def _criar_lancamentos_ia(extracao: dict, user_id: int, db: AsyncSession, websocket: WebSocket) -> str:
     # Ler os dados extraídos pelo json schema
@@ -44,6 +53,7 @@ async def _criar_lancamentos_ia(extracao: dict, user_id: int, db: AsyncSession,
     cat_id = categoria.id if categoria else (9 if tipo == 'receita' else 8)
 
     group_id = str(uuid.uuid4()) if parcelas > 1 else None
+    novos = []
     
     for i in range(parcelas):
         data_parcela = data_inicial + relativedelta(months=i)
@@ -64,8 +74,12 @@ async def _criar_lancamentos_ia(extracao: dict, user_id: int, db: AsyncSession,
             parcela_group_id=group_id
         )
         db.add(lanc)
-        
+        novos.append(lanc)
+
+    await db.flush()
+    await ajustar_resumos(db, user_id, Lancamento.id.in_([l.id for l in novos]))
     await db.commit()
+    await invalidar_cache_usuario(user_id)
     
     # Notificar websocket com o resultado processado pelo backend
     msg_sucesso = f"Compreendido! Acabei de registrar '{nome}' ({tipo}) no valor de R$ {valor:,.2f}"
@@ -134,18 +148,17 @@ async def get_real_user_context(user_id: int, db: AsyncSession) -> dict:
         "detalhes_categoria": gastos_por_categoria
     }
 
-async def interagir_com_chat_ws(
-    pergunta: str,
-    user_id: int,
-    conversa_id: int,
-    websocket: WebSocket,
-    db: AsyncSession
-) -> str:
-    hoje = date.today()
-    # 0. Avaliar Intenção Proativa
-    await websocket.send_json({"type": "status", "content": "Interpretando comando..."})
+async def _extrair_intencao(pergunta: str, hoje: date) -> dict:
+    # Perguntas e pedidos de registro inequívocos são resolvidos por regras, sem a ida à LLM
+    if settings.CHAT_INTENCAO_LOCAL:
+        local = interpretar_mensagem(pergunta, hoje)
+        if local.extracao is not None:
+            metricas.incrementar("chat.intencao.local")
+            return local.extracao
+        metricas.incrementar(f"chat.intencao.llm.{local.motivo}")
+
     prompt_intent = prompt_builder.construir_prompt_extracao(pergunta, hoje.month, hoje.year)
-    
+
     # Simula chamada JSON estruturada via Groq
     extracao_text = ""
     async for token in groq_client.generate_response(prompt_intent + "\n\nResponda APENAS com um JSON válido. Exemplo: {\"intencao_de_criar\": true, \"nome\": \"Conta\", \"valor\": 50, \"tipo\": \"despesa\", \"data_inicial\": \"2023-11-01\", \"parcelas\": 1}. Se não for intenção de criar, responda {\"intencao_de_criar\": false}"):
@@ -160,26 +173,87 @@ async def interagir_com_chat_ws(
             extracao = json.loads(match.group(0))
     except:
         extracao = {}
-    
-    if extracao and extracao.get("intencao_de_criar") is True:
-        await websocket.send_json({"type": "status", "content": "Registrando no banco de dados..."})
-        return await _criar_lancamentos_ia(extracao, user_id, db, websocket)
+    return extracao
 
-    # 1. Obter os embeddings (assíncrono)
-    await websocket.send_json({"type": "status", "content": "Analisando contexto..."})
-    query_vector = await gemini_client.embed(pergunta)
-    
-    # 2. Buscar Vetores Similares na Base (RAG)
-    await websocket.send_json({"type": "status", "content": "Pesquisando lançamentos..."})
-    fontes_recuperadas = await retriever.buscar_lancamentos_similares(
+async def _recuperar_fontes(pergunta: str, user_id: int, db: AsyncSession, modo_busca: Optional[str]):
+    # Embedding assíncrono (perguntas repetidas vêm do cache sem ir à API) e busca vetorial na base
+    query_vector = await cache_embeddings_consulta.obter(pergunta)
+    return await retriever.buscar_lancamentos_similares(
         db=db,
         user_id=user_id,
         query_vector=query_vector,
-        top_k=7
+        top_k=7,
+        modo=modo_busca or settings.RAG_MODO_BUSCA,
+        pergunta=pergunta
     )
-    
-    # 3. Montar Contexto Global do Usuário (Mês Atual)
-    real_metrics = await get_real_user_context(user_id=user_id, db=db)
+
+async def _recuperar_contexto_concorrente(pergunta: str, user_id: int, modo_busca: Optional[str]):
+    """Fontes do RAG e resumo do mês em paralelo, cada um em sua própria sessão do pool."""
+    async def _fontes():
+        async with AsyncSessionLocal() as db:
+            return await _recuperar_fontes(pergunta, user_id, db, modo_busca)
+
+    async def _resumo():
+        async with AsyncSessionLocal() as db:
+            return await get_real_user_context(user_id=user_id, db=db)
+
+    return await asyncio.gather(_fontes(), _resumo())
+
+async def interagir_com_chat_ws(
+    pergunta: str,
+    user_id: int,
+    conversa_id: int,
+    websocket: WebSocket,
+    db: AsyncSession,
+    modo_busca: Optional[str] = None
+) -> str:
+    """
+    Com CHAT_PIPELINE_ESPECULATIVO, embedding, busca e resumo do mês começam junto com a extração
+    de intenção, em sessões próprias, em vez de esperar por ela: a pergunta comum chega à geração
+    sem somar a ida à Groq da intenção. Se a intenção for criar lançamento, o trabalho especulativo
+    é cancelado e a sessão da conexão fica só com a criação.
+    """
+    hoje = date.today()
+    inicio = time.perf_counter()
+    # 0. Avaliar Intenção Proativa
+    await websocket.send_json({"type": "status", "content": "Interpretando comando..."})
+
+    if settings.CHAT_PIPELINE_ESPECULATIVO:
+        contexto = asyncio.create_task(_recuperar_contexto_concorrente(pergunta, user_id, modo_busca))
+        try:
+            extracao = await _extrair_intencao(pergunta, hoje)
+
+            if extracao and extracao.get("intencao_de_criar") is True:
+                # Libera as sessões do trabalho especulativo antes de gravar pela sessão da conexão
+                contexto.cancel()
+                with suppress(asyncio.CancelledError, Exception):
+                    await contexto
+                metricas.incrementar("chat.especulacao.descartada")
+                await websocket.send_json({"type": "status", "content": "Registrando no banco de dados..."})
+                return await _criar_lancamentos_ia(extracao, user_id, db, websocket)
+
+            await websocket.send_json({"type": "status", "content": "Pesquisando lançamentos..."})
+            espera = time.perf_counter()
+            fontes_recuperadas, real_metrics = await contexto
+            # ~0 quando o contexto ficou pronto antes da intenção (a especulação escondeu todo o custo)
+            metricas.observar("chat.contexto.espera.ms", (time.perf_counter() - espera) * 1000)
+            metricas.incrementar("chat.especulacao.aproveitada")
+        finally:
+            # Erro na intenção ou WebSocket fechado no meio: não deixa a especulação rodando solta
+            contexto.cancel()
+    else:
+        extracao = await _extrair_intencao(pergunta, hoje)
+
+        if extracao and extracao.get("intencao_de_criar") is True:
+            await websocket.send_json({"type": "status", "content": "Registrando no banco de dados..."})
+            return await _criar_lancamentos_ia(extracao, user_id, db, websocket)
+
+        # 1-2. Embedding da pergunta e busca de vetores similares na base (RAG)
+        await websocket.send_json({"type": "status", "content": "Pesquisando lançamentos..."})
+        fontes_recuperadas = await _recuperar_fontes(pergunta, user_id, db, modo_busca)
+
+        # 3. Montar Contexto Global do Usuário (Mês Atual)
+        real_metrics = await get_real_user_context(user_id=user_id, db=db)
     
     system_prompt = prompt_builder.construir_contexto_sistema(
         mes_atual=real_metrics["mes_atual"],
@@ -198,7 +272,12 @@ async def interagir_com_chat_ws(
         prompt=f"{system_prompt}\n\nPERGUNTA DO USUÁRIO:\n{pergunta}"
     )
     
+    primeiro_token = True
     async for token in stream_generator:
+        if primeiro_token:
+            # Da mensagem recebida ao primeiro token da resposta: o que o usuário sente como espera
+            metricas.observar("chat.ttft.ms", (time.perf_counter() - inicio) * 1000)
+            primeiro_token = False
         try:
             # Emite cada pedaço de texto gerado para o cliente realtime
             await websocket.send_text(json.dumps({"type": "token", "content": token}))
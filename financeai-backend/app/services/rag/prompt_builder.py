@@ -1,8 +1,8 @@
 from typing import List, Dict
-from app.models.embedding import FinanceEmbedding
+from app.services.rag.retriever import FonteRecuperada
 
 class PromptBuilder:
-    def formatar_fontes_para_contexto(self, fontes: List[FinanceEmbedding]) -> str:
+    def formatar_fontes_para_contexto(self, fontes: List[FonteRecuperada]) -> str:
         if not fontes:
             return "Nenhum histórico ou dado financeiro encontrado."
             
@@ -36,7 +36,7 @@ class PromptBuilder:
         despesa_total: float,
         saldo: float,
         detalhes_categoria: Dict[str, dict],
-        fontes: List[FinanceEmbedding]
+        fontes: List[FonteRecuperada]
     ) -> str:
         fontes_formatadas = self.formatar_fontes_para_contexto(fontes)
         categorias_formatadas = self.formatar_categorias_para_contexto(detalhes_categoria)["texto"]
@@ -1,39 +1,258 @@
+import math
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Dict, Any
+from sqlalchemy import select, func, text, cast, literal_column, or_, true, Text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from typing import List, Dict, Any, NamedTuple, Optional
+from datetime import datetime
+from app.config import settings
+from app.core.metricas import metricas
 from app.models.embedding import FinanceEmbedding
 
+# Limite do pgvector para hnsw.ef_search
+EF_SEARCH_MAX = 1000
+# Margem sobre o ef_search estimado pela fração do usuário (o HNSW não distribui os candidatos por igual)
+FOLGA_EF_SEARCH = 2
+
+# "vetorial": só embeddings; "hibrida": embeddings + busca textual, fundidas por RRF
+MODOS_BUSCA = ("vetorial", "hibrida")
+# Constante do Reciprocal Rank Fusion: score = soma de 1 / (RRF_K + posição) em cada lista
+RRF_K = 60
+# Cada lista da busca híbrida traz top_k * N candidatos para a fusão
+CANDIDATOS_POR_RESULTADO = 4
+
+CONFIG_TEXTO = literal_column("'portuguese'::regconfig")
+
+class FonteRecuperada(NamedTuple):
+    """Lançamento recuperado para o contexto do chat: só o que o prompt usa, sem o vetor."""
+    id: int
+    lancamento_id: Optional[int]
+    conteudo: str
+    created_at: datetime
+    similaridade: Optional[float]  # 1 - distância cosseno
+    score: float  # ordem do resultado: a similaridade (vetorial) ou o RRF (híbrida)
+
+# Colunas de FonteRecuperada lidas de finance_embeddings; embedding e metadata ficam no banco
+COLUNAS_FONTE = (
+    FinanceEmbedding.id, FinanceEmbedding.lancamento_id, FinanceEmbedding.conteudo, FinanceEmbedding.created_at,
+)
+
+def consulta_textual(pergunta: str):
+    """
+    tsquery da pergunta com os termos em OU: "quanto gastei com netflix" vira 'gast' | 'netflix'.
+    Em E (plainto_tsquery puro) quase nenhum lançamento teria todas as palavras da pergunta;
+    o ts_rank_cd se encarrega de pôr primeiro quem casa com mais termos.
+    """
+    termos = cast(func.plainto_tsquery(CONFIG_TEXTO, pergunta), Text)
+    return cast(func.replace(termos, "&", "|"), TSQUERY)
+
 class RetinaRetriever:
+    def __init__(self):
+        # pgvector >= 0.8 continua varrendo o HNSW até preencher o LIMIT após o filtro (hnsw.iterative_scan)
+        self._busca_iterativa: Optional[bool] = None
+
+    async def _suporta_busca_iterativa(self, db: AsyncSession) -> bool:
+        if self._busca_iterativa is None:
+            versao = await db.scalar(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+            numeros = tuple(int(parte) for parte in (versao or "0").split(".")[:2])
+            self._busca_iterativa = numeros >= (0, 8)
+        return self._busca_iterativa
+
+    async def _ef_necessario(self, db: AsyncSession, user_id: int, limite: int) -> Optional[int]:
+        """
+        ef_search para o HNSW (sem varredura iterativa) trazer `limite` vetores do usuário: os candidatos
+        saem da tabela inteira, então é preciso examinar ~limite / (fração da tabela que é do usuário).
+        None quando nem EF_SEARCH_MAX bastaria; aí a busca exata, sobre poucos vetores, é o caminho barato.
+        """
+        do_usuario = (
+            select(func.count()).select_from(FinanceEmbedding)
+            .filter(FinanceEmbedding.user_id == user_id)
+            .scalar_subquery()
+        )
+        # Estimativa do último ANALYZE; regclass respeita o search_path
+        total = literal_column("(SELECT reltuples FROM pg_class WHERE oid = 'finance_embeddings'::regclass)")
+        vetores, estimados = (await db.execute(select(do_usuario, total))).one()
+        if not vetores:
+            return None
+        necessario = math.ceil(limite * max(estimados, vetores) / vetores * FOLGA_EF_SEARCH)
+        return necessario if necessario <= EF_SEARCH_MAX else None
+
+    def _candidatos_vetoriais(self, user_id: int, query_vector: List[float], limite: int, exata: bool):
+        """(id, distancia) dos `limite` vetores do usuário mais próximos da pergunta."""
+        # A distância cosseno do pgvector.
+        # Operador <=> calcula coseno. Valores mais próximos de 0 são mais similares.
+        distancia = FinanceEmbedding.embedding.cosine_distance(query_vector).label("distancia")
+        if not exata:
+            return (
+                select(FinanceEmbedding.id, distancia)
+                .filter(FinanceEmbedding.user_id == user_id)
+                .order_by(distancia)
+                .limit(limite)
+            )
+        # MATERIALIZED calcula a distância de todos os vetores do usuário (pelo btree de user_id);
+        # ordenar pela coluna da CTE impede o planejador de voltar ao HNSW
+        todos = (
+            select(FinanceEmbedding.id, distancia)
+            .filter(FinanceEmbedding.user_id == user_id)
+            .cte("distancias")
+            .prefix_with("MATERIALIZED")
+        )
+        return select(todos.c.id, todos.c.distancia).order_by(todos.c.distancia).limit(limite)
+
+    def _com_total(self, vizinhos, linhas):
+        """
+        Acrescenta a cada linha quantos vizinhos o HNSW devolveu antes do limiar de similaridade.
+        O LEFT JOIN garante ao menos uma linha: mesmo quando o limiar corta tudo, o retriever sabe
+        se o índice preencheu o LIMIT (limiar alto) ou não (filtro por usuário, refazer).
+        """
+        total = select(func.count().label("vizinhos")).select_from(vizinhos).subquery("total")
+        linhas = linhas.subquery("linhas")
+        return (
+            select(total.c.vizinhos, *[coluna for coluna in linhas.c])
+            .select_from(total.outerjoin(linhas, true()))
+            .order_by(linhas.c.score.desc(), linhas.c.id)
+        )
+
+    def _consulta_vetorial(self, user_id: int, query_vector: List[float], top_k: int, limiar: Optional[float], exata: bool):
+        vizinhos = self._candidatos_vetoriais(user_id, query_vector, top_k, exata).cte("vizinhos")
+        similaridade = 1 - vizinhos.c.distancia
+        linhas = (
+            select(*COLUNAS_FONTE, similaridade.label("similaridade"), similaridade.label("score"))
+            .join(vizinhos, vizinhos.c.id == FinanceEmbedding.id)
+        )
+        if limiar is not None:
+            # Pela distância: NaN (vetor zerado) é maior que tudo no PostgreSQL e nunca passa
+            linhas = linhas.filter(vizinhos.c.distancia <= 1 - limiar)
+        return self._com_total(vizinhos, linhas)
+
+    def _consulta_hibrida(
+        self, user_id: int, query_vector: List[float], pergunta: str, top_k: int, limiar: Optional[float], exata: bool
+    ):
+        """Busca vetorial e textual numa única consulta, fundidas por RRF."""
+        limite = top_k * CANDIDATOS_POR_RESULTADO
+        vetorial = self._candidatos_vetoriais(user_id, query_vector, limite, exata).subquery("candidatos_vetoriais")
+        vetorial = select(
+            vetorial.c.id,
+            vetorial.c.distancia,
+            func.row_number().over(order_by=vetorial.c.distancia).label("posicao"),
+        ).cte("vetorial")
+
+        termos = select(consulta_textual(pergunta).label("consulta")).cte("termos")
+        relevancia = func.ts_rank_cd(FinanceEmbedding.conteudo_tsv, termos.c.consulta)
+        textual = (
+            select(
+                FinanceEmbedding.id,
+                # Similaridade também para quem só veio pela busca textual
+                FinanceEmbedding.embedding.cosine_distance(query_vector).label("distancia"),
+                func.row_number().over(order_by=relevancia.desc()).label("posicao"),
+            )
+            .select_from(FinanceEmbedding)
+            .join(termos, FinanceEmbedding.conteudo_tsv.op("@@")(termos.c.consulta))
+            .filter(FinanceEmbedding.user_id == user_id)
+            .order_by(relevancia.desc())
+            .limit(limite)
+            .cte("textual")
+        )
+
+        score = (
+            func.coalesce(1.0 / (RRF_K + vetorial.c.posicao), 0)
+            + func.coalesce(1.0 / (RRF_K + textual.c.posicao), 0)
+        )
+        fusao = (
+            select(
+                func.coalesce(vetorial.c.id, textual.c.id).label("id"),
+                func.coalesce(vetorial.c.distancia, textual.c.distancia).label("distancia"),
+                (textual.c.id.isnot(None)).label("textual"),
+                score.label("score"),
+            )
+            .select_from(vetorial.join(textual, vetorial.c.id == textual.c.id, full=True))
+            .subquery("fusao")
+        )
+        similaridade = 1 - fusao.c.distancia
+        linhas = (
+            select(*COLUNAS_FONTE, similaridade.label("similaridade"), fusao.c.score)
+            .join(fusao, fusao.c.id == FinanceEmbedding.id)
+        )
+        if limiar is not None:
+            # Quem casou pelas palavras da pergunta fica mesmo com similaridade vetorial baixa
+            linhas = linhas.filter(or_(fusao.c.distancia <= 1 - limiar, fusao.c.textual))
+        return self._com_total(vetorial, linhas)
+
     async def buscar_lancamentos_similares(
         self,
         db: AsyncSession,
         user_id: int,
         query_vector: List[float],
         top_k: int = 5,
-        threshold: float = 0.5
-    ) -> List[FinanceEmbedding]:
+        threshold: Optional[float] = 0.5,
+        ef_search: Optional[int] = None,
+        exata: bool = False,
+        modo: str = "vetorial",
+        pergunta: Optional[str] = None,
+    ) -> List[FonteRecuperada]:
         """
         Busca os lançamentos mais relevantes com base no embedding (vetor da pergunta).
-        Utiliza PGVector Cosine Distance (<=>).
+        Utiliza PGVector Cosine Distance (<=>) pelo índice HNSW de finance_embeddings.
+
+        Devolve FonteRecuperada: só as colunas usadas pelo prompt, com a similaridade (1 - distância)
+        calculada no banco; o vetor não volta para o Python. `threshold` é a similaridade mínima,
+        aplicada no SQL (None desliga). Vetores zerados têm similaridade NaN e não passam de nenhum limiar.
+
+        `modo="hibrida"` (exige `pergunta`) soma a busca textual em português sobre `conteudo`,
+        útil quando a pergunta cita um estabelecimento ou categoria ("Netflix", "aluguel").
+        As duas listas saem da mesma consulta e são fundidas por Reciprocal Rank Fusion.
+
+        `ef_search` é o nº de candidatos que o HNSW examina (padrão RAG_HNSW_EF_SEARCH, nunca menos que top_k).
+        O índice é global: o filtro por usuário é aplicado sobre os candidatos, então um usuário com
+        poucos vetores pode receber menos de top_k resultados. Com pgvector >= 0.8 a varredura iterativa
+        resolve isso no próprio índice. Antes disso, o ef_search sobe conforme a fração da tabela que é do
+        usuário; se nem EF_SEARCH_MAX bastaria (ou se ainda faltar resultado), a busca é exata, o que custa
+        pouco justamente porque o usuário tem poucos vetores. `exata=True` pula o índice.
         """
-        
-        # A distância cosseno do pgvector. 
-        # Operador <=> calcula coseno. Valores mais próximos de 0 são mais similares.
-        # threshold (0 a 1). Se limitarmos por relevância (1 - cosine_distance).
-        
-        distance = FinanceEmbedding.embedding.cosine_distance(query_vector)
-
-        stmt = select(FinanceEmbedding).filter(
-            FinanceEmbedding.user_id == user_id
-        ).order_by(
-            distance
-        ).limit(top_k)
-
-        result = await db.execute(stmt)
-        embeddings = result.scalars().all()
-
-        # Filtrar o limite por threshold (score = 1 - distance)
-        # Opcional, mantido simples ordenado e com limite top_k
-        return embeddings
+        if modo not in MODOS_BUSCA:
+            raise ValueError(f"Modo de busca inválido: {modo}")
+        if modo == "hibrida" and not pergunta:
+            raise ValueError("A busca híbrida precisa do texto da pergunta")
+
+        def consulta(exata_: bool):
+            if modo == "hibrida":
+                stmt = self._consulta_hibrida(user_id, query_vector, pergunta, top_k, threshold, exata_)
+            else:
+                stmt = self._consulta_vetorial(user_id, query_vector, top_k, threshold, exata_)
+            return stmt.limit(top_k)
+
+        # O asyncpg reaproveita o prepared statement e, da 6ª execução em diante, o Postgres passa ao
+        # plano genérico, que não sabe usar o HNSW com o vetor como parâmetro (~5x mais lento)
+        parametros = [func.set_config("plan_cache_mode", "force_custom_plan", True)]
+        if not exata:
+            limite = top_k * CANDIDATOS_POR_RESULTADO if modo == "hibrida" else top_k
+            ef_search = min(max(ef_search or settings.RAG_HNSW_EF_SEARCH, limite), EF_SEARCH_MAX)
+            if await self._suporta_busca_iterativa(db):
+                parametros.append(func.set_config("hnsw.iterative_scan", "strict_order", True))
+            else:
+                necessario = await self._ef_necessario(db, user_id, limite)
+                if necessario is None:
+                    exata = True
+                else:
+                    ef_search = max(ef_search, necessario)
+            parametros.append(func.set_config("hnsw.ef_search", str(ef_search), True))
+        # Vale só até o fim da transação corrente (SET LOCAL)
+        await db.execute(select(*parametros))
+
+        if not exata:
+            linhas = (await db.execute(consulta(False))).all()
+            if linhas[0].vizinhos >= top_k:
+                metricas.incrementar(f"rag.busca.{modo}.ann")
+                return _fontes(linhas)
+
+        metricas.incrementar(f"rag.busca.{modo}.exata")
+        return _fontes((await db.execute(consulta(True))).all())
+
+def _fontes(linhas) -> List[FonteRecuperada]:
+    # Sem nenhuma fonte acima do limiar, a consulta devolve só a linha do total (colunas nulas)
+    return [
+        FonteRecuperada(l.id, l.lancamento_id, l.conteudo, l.created_at, l.similaridade, l.score)
+        for l in linhas if l.id is not None
+    ]
 
 retriever = RetinaRetriever()
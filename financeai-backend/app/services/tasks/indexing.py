@@ -1,59 +1,203 @@
 import asyncio
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import redis
+from redis.exceptions import RedisError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.config import settings
+from app.core.metricas import metricas
 from app.db.session import AsyncSessionLocal
 from app.models.lancamento import Lancamento
 from app.models.embedding import FinanceEmbedding
-from app.services.llm.gemini_client import gemini_client
+from app.services.llm.embeddings_cache import embeddings_com_cache, hash_conteudo
 from app.services.tasks.worker import celery_app
 from app.services.finance.indexer import formatar_para_embedding
 
+# Ids aguardando indexação ("user_id:lancamento_id"); o conjunto deduplica edições repetidas do mesmo lançamento
+CHAVE_PENDENTES = "indexacao:pendentes"
+# Existe enquanto há um descarregamento agendado, para não agendar um por escrita
+CHAVE_AGENDADO = "indexacao:agendado"
+# Teto da espera entre tentativas quando um lote falha (a espera dobra a cada falha seguida)
+RETENTATIVA_MAX_SEGUNDOS = 600
+
+# Cliente síncrono: usado pelo worker e, nas rotas, só dentro de asyncio.to_thread (ver enfileirar_indexacao)
+redis_sync = redis.Redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+)
+
+async def indexar_bloco(session: AsyncSession, pares: Iterable[Tuple[int, int]]) -> int:
+    """
+    Gera os embeddings de um bloco de (lancamento_id, user_id) e grava todos num único
+    INSERT ... ON CONFLICT (lancamento_id) DO UPDATE.
+    Lançamentos cujo texto não mudou (mesmo conteudo_hash) são pulados; os demais passam pelo
+    cache endereçado por conteúdo, que só chama a API para textos nunca vistos.
+    Lançamentos que não existem mais (ou trocaram de dono) são ignorados. Devolve quantos foram gravados.
+    """
+    donos = dict(pares)
+    if not donos:
+        return 0
+    result = await session.execute(select(Lancamento).filter(Lancamento.id.in_(list(donos))))
+    lancamentos = [l for l in result.scalars().all() if l.user_id == donos[l.id]]
+    if not lancamentos:
+        return 0
+
+    result = await session.execute(
+        select(FinanceEmbedding.lancamento_id, FinanceEmbedding.conteudo_hash)
+        .filter(FinanceEmbedding.lancamento_id.in_([l.id for l in lancamentos]))
+    )
+    hashes_atuais = dict(result.all())
+
+    alterados = []
+    for lancamento in lancamentos:
+        texto = formatar_para_embedding(lancamento)
+        conteudo_hash = hash_conteudo(texto)
+        if hashes_atuais.get(lancamento.id) != conteudo_hash:
+            alterados.append((lancamento, texto, conteudo_hash))
+    metricas.incrementar("indexacao.inalterados", len(lancamentos) - len(alterados))
+    if not alterados:
+        return 0
+
+    vetores = await embeddings_com_cache(session, [texto for _, texto, _ in alterados])
+
+    stmt = pg_insert(FinanceEmbedding).values([
+        {
+            "user_id": l.user_id, "lancamento_id": l.id,
+            # Vetor zerado (falha do provedor) fica sem hash para ser regerado na próxima indexação
+            "conteudo": texto, "conteudo_hash": conteudo_hash if any(vetor) else None, "embedding": vetor,
+        }
+        for (l, texto, conteudo_hash), vetor in zip(alterados, vetores)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FinanceEmbedding.lancamento_id],
+        set_={
+            "user_id": stmt.excluded.user_id,
+            "conteudo": stmt.excluded.conteudo,
+            "conteudo_hash": stmt.excluded.conteudo_hash,
+            "embedding": stmt.excluded.embedding,
+        },
+    )
+    await session.execute(stmt)
+    await session.commit()
+    return len(alterados)
+
 async def processar_indexacao(lancamento_id: int, user_id: int):
-    """Lógica assíncrona que gerencia o DB e gera o embedding."""
+    """Indexa um único lançamento imediatamente (sem passar pela fila de pendentes)."""
     async with AsyncSessionLocal() as session:
-        # Busca lancamento
-        result = await session.execute(
-            select(Lancamento).filter(Lancamento.id == lancamento_id, Lancamento.user_id == user_id)
-        )
-        lancamento = result.scalars().first()
-        if not lancamento:
-            return
-
-        # Gera texto de contexto
-        texto = formatar_para_embedding(lancamento)
-        
-        # Chama a API do Ollama (Async)
-        vetor = await gemini_client.embed(texto)
-        
-        # Verifica se já existe embedding para atulizar, ou cria novo
-        res_emb = await session.execute(
-            select(FinanceEmbedding).filter(FinanceEmbedding.lancamento_id == lancamento_id)
-        )
-        embedding_obj = res_emb.scalars().first()
-        
-        if embedding_obj:
-            embedding_obj.conteudo = texto
-            embedding_obj.embedding = vetor
-        else:
-            embedding_obj = FinanceEmbedding(
-                user_id=user_id,
-                lancamento_id=lancamento_id,
-                conteudo=texto,
-                embedding=vetor
-            )
-            session.add(embedding_obj)
-            
-        await session.commit()
+        await indexar_bloco(session, [(lancamento_id, user_id)])
 
-@celery_app.task
-def indexar_lancamento(lancamento_id: int, user_id: int):
+async def processar_indexacao_lote(lancamento_ids: List[int], user_id: int, tamanho_lote: int = 100):
+    """Indexa vários lançamentos do mesmo usuário em blocos de `tamanho_lote` (uma chamada de embedding por bloco)."""
+    async with AsyncSessionLocal() as session:
+        for inicio in range(0, len(lancamento_ids), tamanho_lote):
+            bloco = lancamento_ids[inicio:inicio + tamanho_lote]
+            await indexar_bloco(session, [(id_, user_id) for id_ in bloco])
+
+async def enfileirar_indexacao(lancamento_ids: List[int], user_id: int):
+    """
+    Marca lançamentos para (re)indexação. Chamado pelas rotas após o commit.
+    Em vez de uma task por escrita, os ids se acumulam no Redis e um único descarregamento
+    roda após INDEXACAO_JANELA_SEGUNDOS, ou logo, se já houver INDEXACAO_LOTE_MAX pendentes.
+    O pipeline no Redis e a publicação da task são bloqueantes: rodam numa thread para que um
+    Redis lento (até o timeout de 0,5 s) não trave o event loop das outras requisições.
+    """
+    if not lancamento_ids:
+        return
+    await asyncio.to_thread(_enfileirar_indexacao_sync, lancamento_ids, user_id)
+
+def _enfileirar_indexacao_sync(lancamento_ids: List[int], user_id: int):
+    """Versão bloqueante de enfileirar_indexacao, para a thread das rotas e para as tasks do worker."""
+    if not lancamento_ids:
+        return
+    try:
+        pipe = redis_sync.pipeline()
+        pipe.sadd(CHAVE_PENDENTES, *[f"{user_id}:{id_}" for id_ in lancamento_ids])
+        pipe.scard(CHAVE_PENDENTES)
+        # O TTL só protege contra um agendamento perdido (worker morto): a flag some sozinha
+        pipe.set(CHAVE_AGENDADO, 1, nx=True, ex=max(60, int(settings.INDEXACAO_JANELA_SEGUNDOS * 10)))
+        _, pendentes, agendou = pipe.execute()
+    except RedisError as e:
+        metricas.incrementar("indexacao.erro_fila")
+        print(f"Erro ao enfileirar indexação de {len(lancamento_ids)} lançamento(s): {e}")
+        return
+
+    metricas.incrementar("indexacao.enfileirados", len(lancamento_ids))
+    if pendentes >= settings.INDEXACAO_LOTE_MAX:
+        descarregar_indexacao.delay()
+    elif agendou:
+        descarregar_indexacao.apply_async(countdown=settings.INDEXACAO_JANELA_SEGUNDOS)
+
+def _reagendar_descarregamento(tentativa: int):
+    """Agenda a próxima tentativa após uma falha, com espera dobrando até RETENTATIVA_MAX_SEGUNDOS."""
+    espera = min(settings.INDEXACAO_JANELA_SEGUNDOS * 2 ** (tentativa + 1), RETENTATIVA_MAX_SEGUNDOS)
+    # Sem nx: o descarregamento atual já liberou a flag e este agendamento passa a ser o vigente
+    redis_sync.set(CHAVE_AGENDADO, 1, ex=max(60, int(espera * 2)))
+    descarregar_indexacao.apply_async(kwargs={"tentativa": tentativa + 1}, countdown=espera)
+    print(f"Indexação: nova tentativa em {espera:.0f} s (tentativa {tentativa + 1})")
+
+async def processar_pendentes(tamanho_lote: Optional[int] = None, tentativa: int = 0) -> int:
     """
-    Task executada pelo worker para salvar o vetor no banco após CRUD.
+    Esvazia a fila de pendentes em lotes de até `tamanho_lote` itens. Devolve quantos foram indexados.
+    `tentativa` conta as falhas seguidas, para o intervalo até a próxima tentativa.
     """
+    tamanho_lote = tamanho_lote or settings.INDEXACAO_LOTE_MAX
+    # Libera o agendamento antes de ler: o que chegar daqui em diante agenda um novo descarregamento
+    redis_sync.delete(CHAVE_AGENDADO)
+    total = 0
+    async with AsyncSessionLocal() as session:
+        while True:
+            membros = redis_sync.spop(CHAVE_PENDENTES, tamanho_lote)
+            if not membros:
+                break
+            pares = []
+            for membro in membros:
+                user_id, lancamento_id = membro.split(":")
+                pares.append((int(lancamento_id), int(user_id)))
+
+            inicio = time.perf_counter()
+            try:
+                gravados = await indexar_bloco(session, pares)
+            except Exception:
+                # Devolve o lote para a fila e agenda outra tentativa: sem ela, os itens só andariam
+                # na próxima escrita de alguém
+                await session.rollback()
+                redis_sync.sadd(CHAVE_PENDENTES, *membros)
+                _reagendar_descarregamento(tentativa)
+                raise
+            duracao = time.perf_counter() - inicio
+
+            total += gravados
+            metricas.incrementar("indexacao.lotes")
+            metricas.incrementar("indexacao.itens", gravados)
+            metricas.incrementar("indexacao.ms", int(duracao * 1000))
+            print(f"Indexação: {gravados} itens em {duracao:.2f} s ({gravados / max(duracao, 1e-6):.1f} itens/s)")
+    return total
+
+@celery_app.task
+def descarregar_indexacao(tentativa: int = 0):
+    """Task que consome a fila de pendentes em lotes (uma chamada de embedding e um upsert por lote)."""
     loop = asyncio.get_event_loop()
     if loop.is_running():
-        # Se ocorrer de ser disparado em um event loop já em execução
-        asyncio.ensure_future(processar_indexacao(lancamento_id, user_id))
+        asyncio.ensure_future(processar_pendentes(tentativa=tentativa))
     else:
-        loop.run_until_complete(processar_indexacao(lancamento_id, user_id))
+        loop.run_until_complete(processar_pendentes(tentativa=tentativa))
+
+@celery_app.task
+def indexar_lancamento(lancamento_id: int, user_id: int):
+    """
+    Compatibilidade com mensagens já enfileiradas: passa pela fila coalescida.
+    """
+    _enfileirar_indexacao_sync([lancamento_id], user_id)
+
+@celery_app.task
+def indexar_lancamentos(lancamento_ids: List[int], user_id: int):
+    """
+    Compatibilidade com mensagens já enfileiradas: passa pela fila coalescida.
+    """
+    _enfileirar_indexacao_sync(lancamento_ids, user_id)
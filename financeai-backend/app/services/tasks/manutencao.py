@@ -0,0 +1,24 @@
+import asyncio
+
+from app.db.session import AsyncSessionLocal
+from app.services.finance.particionamento import garantir_particoes
+from app.services.tasks.worker import celery_app
+
+async def processar_particoes():
+    async with AsyncSessionLocal() as session:
+        criadas = await garantir_particoes(session)
+        await session.commit()
+    if criadas:
+        print(f"Partições de lancamentos criadas: {', '.join(criadas)}")
+
+@celery_app.task
+def manter_particoes():
+    """
+    Task diária (Celery beat) que garante as partições dos próximos meses, para que novos
+    lançamentos não caiam na partição DEFAULT. Com a tabela plana (padrão), não faz nada.
+    """
+    loop = asyncio.get_event_loop()
+    if loop.is_running():
+        asyncio.ensure_future(processar_particoes())
+    else:
+        loop.run_until_complete(processar_particoes())
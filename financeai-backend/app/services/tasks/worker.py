@@ -1,11 +1,12 @@
 from celery import Celery
+from celery.schedules import crontab
 from app.config import settings
 
 celery_app = Celery(
     "financeai",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.services.tasks.indexing"],
+    include=["app.services.tasks.indexing", "app.services.tasks.manutencao"],
 )
 
 celery_app.conf.update(
@@ -15,4 +16,10 @@ celery_app.conf.update(
     timezone="America/Sao_Paulo",
     enable_utc=True,
     task_track_started=True,
+    beat_schedule={
+        "manter-particoes-lancamentos": {
+            "task": "app.services.tasks.manutencao.manter_particoes",
+            "schedule": crontab(hour=3, minute=0),
+        },
+    },
 )
@@ -0,0 +1,195 @@
+"""
+Benchmark da busca vetorial do chat: HNSW (aproximada) vs busca exata em finance_embeddings.
+
+Cria o schema bench_ann com vetores sintéticos de 768 dimensões (agrupados em torno de --centros
+centros, como textos parecidos) distribuídos de forma desigual entre --usuarios usuários:
+poucos usuários concentram muitos vetores e a maioria tem poucos. Depois, para amostras de perguntas:
+- busca exata (referência de recall, via retriever com exata=True);
+- HNSW puro com vários ef_search: recall@k, preenchimento (resultados / k) e latência;
+- retriever padrão (HNSW com ef_search pela fração do usuário, ou exata), como o chat usa.
+O retriever roda sem alterações trocando apenas o search_path da conexão.
+
+Uso:
+    python bench_ann.py                       # prepara (demorado: gera vetores e constrói o HNSW) e mede
+    python bench_ann.py --reusar              # mede sobre o schema já preparado
+    python bench_ann.py --linhas 300000 --ef 40,100,200,400 --k 7
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.core.metricas import metricas
+from app.db.session import engine
+from app.models.embedding import FinanceEmbedding
+from app.services.rag.retriever import RetinaRetriever
+
+SCHEMA = "bench_ann"
+DIMENSOES = 768
+RUIDO = 0.6
+
+async def _executar(conn, sql: str, **params):
+    inicio = time.perf_counter()
+    await conn.execute(text(sql), params)
+    return time.perf_counter() - inicio
+
+async def preparar(linhas: int, usuarios: int, centros: int):
+    async with engine.connect() as conn:
+        await conn.execute(text("SET maintenance_work_mem = '1GB'"))
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(text(f"CREATE TABLE {SCHEMA}.finance_embeddings (LIKE public.finance_embeddings INCLUDING DEFAULTS)"))
+        await conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.centros AS
+            SELECT c, array_agg(random() - 0.5 ORDER BY i) AS v
+            FROM generate_series(1, :centros) c, generate_series(1, {DIMENSOES}) i
+            GROUP BY c
+        """), {"centros": centros})
+        await conn.commit()
+
+        print(f"Gerando {linhas:,} vetores para {usuarios:,} usuários...")
+        # random()^3 concentra as linhas nos primeiros ids: o usuário 1 fica com ~10% da tabela
+        duracao = await _executar(conn, f"""
+            INSERT INTO {SCHEMA}.finance_embeddings (id, user_id, lancamento_id, conteudo, embedding)
+            SELECT g, s.u, g, 'Lançamento ' || g,
+                   (SELECT array_agg(c.v[i] + (random() - 0.5) * {RUIDO} ORDER BY i)
+                    FROM generate_series(1, {DIMENSOES}) i)::vector
+            FROM (
+                SELECT g, 1 + floor(:usuarios * random() ^ 3)::int AS u, 1 + floor(random() * :centros)::int AS centro
+                FROM generate_series(1, :linhas) g
+            ) s
+            JOIN {SCHEMA}.centros c ON c.c = s.centro
+        """, usuarios=usuarios, centros=centros, linhas=linhas)
+        print(f"  vetores: {duracao:.1f} s")
+        await conn.commit()
+
+        duracao = await _executar(conn, f"CREATE INDEX ON {SCHEMA}.finance_embeddings (user_id)")
+        duracao += await _executar(conn, f"CREATE INDEX ON {SCHEMA}.finance_embeddings (id)")
+        print(f"  btree: {duracao:.1f} s")
+        duracao = await _executar(conn, f"""
+            CREATE INDEX ON {SCHEMA}.finance_embeddings
+            USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+        """)
+        print(f"  hnsw: {duracao:.1f} s")
+        await conn.commit()
+        autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await autocommit.execute(text(f"VACUUM ANALYZE {SCHEMA}.finance_embeddings"))
+
+def _engine_schema():
+    # Conexões próprias (sem pool): o search_path direciona "finance_embeddings" para o schema do benchmark
+    return create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}},
+    )
+
+async def _perguntas(db: AsyncSession, amostras: int, seed: int):
+    """(user_id, vetor) sorteados: metade entre os usuários grandes (>= 1% dos vetores), metade entre os demais."""
+    total = await db.scalar(select(func.count()).select_from(FinanceEmbedding))
+    contagens = (await db.execute(
+        select(FinanceEmbedding.user_id, func.count()).group_by(FinanceEmbedding.user_id)
+    )).all()
+    grandes = [u for u, n in contagens if n >= total * 0.01]
+    pequenos = [u for u, n in contagens if n < total * 0.01]
+    centros = [list(map(float, v)) for v in (await db.execute(text(f"SELECT v FROM {SCHEMA}.centros"))).scalars()]
+
+    aleatorio = random.Random(seed)
+    perguntas = []
+    for grupo, usuarios in (("grandes", grandes), ("pequenos", pequenos)):
+        for _ in range(amostras // 2 if usuarios else 0):
+            centro = aleatorio.choice(centros)
+            vetor = [x + (aleatorio.random() - 0.5) * RUIDO for x in centro]
+            perguntas.append((grupo, aleatorio.choice(usuarios), vetor))
+    return perguntas, len(grandes), len(pequenos)
+
+async def _hnsw_puro(db: AsyncSession, user_id: int, vetor, k: int, ef_search: int):
+    # HNSW com ef_search fixo e sem cair na exata: mostra o preenchimento real do índice
+    await db.execute(select(
+        func.set_config("hnsw.ef_search", str(ef_search), True),
+        func.set_config("plan_cache_mode", "force_custom_plan", True),
+    ))
+    result = await db.execute(
+        select(FinanceEmbedding.id)
+        .filter(FinanceEmbedding.user_id == user_id)
+        .order_by(FinanceEmbedding.embedding.cosine_distance(vetor))
+        .limit(k)
+    )
+    return result.scalars().all()
+
+def _exatas() -> int:
+    return metricas.snapshot()["contadores"].get("rag.busca.vetorial.exata", 0)
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+async def medir(amostras: int, k: int, valores_ef, seed: int):
+    engine_schema = _engine_schema()
+    retriever = RetinaRetriever()
+    # Uma única transação: com NullPool, cada commit abriria uma conexão nova dentro da medição
+    async with AsyncSession(engine_schema) as db:
+        perguntas, n_grandes, n_pequenos = await _perguntas(db, amostras, seed)
+        print(f"{n_grandes} usuário(s) grande(s), {n_pequenos} pequeno(s); {len(perguntas)} perguntas, k={k}\n")
+
+        # Referência: busca exata
+        exatos, tempos_exata = [], {"grandes": [], "pequenos": []}
+        for grupo, user_id, vetor in perguntas:
+            inicio = time.perf_counter()
+            resultado = await retriever.buscar_lancamentos_similares(db, user_id, vetor, top_k=k, threshold=None, exata=True)
+            tempos_exata[grupo].append((time.perf_counter() - inicio) * 1000)
+            exatos.append({e.id for e in resultado})
+
+        linhas = []
+        for grupo in ("grandes", "pequenos"):
+            if tempos_exata[grupo]:
+                linhas.append((grupo, "exata", 1.0, 1.0, *_percentis(tempos_exata[grupo]), ""))
+
+        cenarios = [(f"hnsw ef={ef}", ef, False) for ef in valores_ef]
+        cenarios.append((f"retriever ef={settings.RAG_HNSW_EF_SEARCH}", None, True))
+        for nome, ef, completo in cenarios:
+            por_grupo = {"grandes": ([], [], [], [0]), "pequenos": ([], [], [], [0])}
+            for (grupo, user_id, vetor), exato in zip(perguntas, exatos):
+                recalls, preenchimentos, tempos, exatas = por_grupo[grupo]
+                exatas_antes = _exatas()
+                inicio = time.perf_counter()
+                if completo:
+                    ids = [e.id for e in await retriever.buscar_lancamentos_similares(db, user_id, vetor, top_k=k, threshold=None)]
+                else:
+                    ids = await _hnsw_puro(db, user_id, vetor, k, ef)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                recalls.append(len(exato & set(ids)) / len(exato) if exato else 1.0)
+                preenchimentos.append(len(ids) / min(k, max(len(exato), 1)))
+                if completo and _exatas() > exatas_antes:
+                    exatas[0] += 1
+            for grupo, (recalls, preenchimentos, tempos, exatas) in por_grupo.items():
+                if tempos:
+                    extra = f"{exatas[0] / len(tempos):.0%} pela busca exata" if completo else ""
+                    linhas.append((grupo, nome, statistics.mean(recalls), statistics.mean(preenchimentos), *_percentis(tempos), extra))
+    await engine_schema.dispose()
+
+    print(f"{'usuários':<10}{'busca':<22}{'recall@k':>10}{'preench.':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}  obs.")
+    for grupo, nome, recall, preenchimento, p50, p95, extra in sorted(linhas, key=lambda l: l[0]):
+        print(f"{grupo:<10}{nome:<22}{recall:>10.3f}{preenchimento:>10.2f}{p50:>10.2f}{p95:>10.2f}  {extra}")
+
+async def main(args):
+    if not args.reusar:
+        await preparar(args.linhas, args.usuarios, args.centros)
+    await medir(args.amostras, args.k, [int(ef) for ef in args.ef.split(",")], args.seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall e latência do HNSW vs busca exata em finance_embeddings.")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--usuarios", type=int, default=1_000)
+    parser.add_argument("--centros", type=int, default=64, help="Agrupamentos dos vetores sintéticos")
+    parser.add_argument("--amostras", type=int, default=200, help="Perguntas (metade de usuários grandes)")
+    parser.add_argument("--k", type=int, default=7, help="top_k, como no chat")
+    parser.add_argument("--ef", default="40,100,200,400", help="Valores de ef_search do HNSW puro")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reusar", action="store_true", help="Não recria o schema de benchmark")
+    asyncio.run(main(parser.parse_args()))
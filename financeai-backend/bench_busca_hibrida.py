@@ -0,0 +1,211 @@
+"""
+Avaliação offline da busca do chat: modo "vetorial" vs "hibrida" (vetorial + textual com RRF).
+
+Monta no schema bench_hibrida um histórico sintético de lançamentos (descrições de um catálogo
+de estabelecimentos/categorias, formatados por formatar_para_embedding como na indexação real)
+e roda um conjunto de perguntas rotuladas: para cada uma se sabe quais estabelecimentos são relevantes.
+Reporta precisão@k, recall@k e MRR por tipo de pergunta (cita o nome vs só o assunto) e a
+latência p50/p95 de cada modo. O retriever roda sem alterações trocando o search_path da conexão.
+
+Embeddings:
+- --embeddings api: os do Gemini (precisa de GEMINI_API_KEY);
+- --embeddings local: o backend local (EMBEDDING_BACKEND=local), sem rede e determinístico.
+
+Uso:
+    python bench_busca_hibrida.py --embeddings api
+    python bench_busca_hibrida.py --embeddings local --lancamentos 3000 --k 7
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.db.session import engine
+from app.models.embedding import FinanceEmbedding
+from app.models.lancamento import Lancamento
+from app.services.finance.indexer import formatar_para_embedding
+from app.services.llm.gemini_client import gemini_client
+from app.services.llm.local_embedding import LocalEmbeddingClient
+from app.services.rag.retriever import MODOS_BUSCA, RetinaRetriever
+
+SCHEMA = "bench_hibrida"
+USER_ID = 1
+
+# (estabelecimento, variações da descrição como aparecem em extratos, tipo, faixa de valor)
+CATALOGO = [
+    ("Netflix", ["Netflix", "Assinatura Netflix", "NETFLIX.COM"], "despesa", (39, 59)),
+    ("Spotify", ["Spotify", "Spotify Premium Familia"], "despesa", (21, 35)),
+    ("Disney+", ["Disney+", "Disney Plus assinatura"], "despesa", (27, 44)),
+    ("Aluguel", ["Aluguel apartamento", "Aluguel", "Transferência aluguel proprietário"], "despesa", (1800, 2500)),
+    ("Condomínio", ["Condomínio", "Boleto condomínio Ed. Solar"], "despesa", (450, 700)),
+    ("Enel", ["Conta de luz Enel", "ENEL DISTRIBUICAO SP"], "despesa", (120, 380)),
+    ("Sabesp", ["Conta de água Sabesp", "SABESP"], "despesa", (60, 150)),
+    ("Vivo", ["Internet Vivo Fibra", "VIVO FIXO INTERNET"], "despesa", (99, 130)),
+    ("Supermercado", ["Supermercado Pão de Açúcar", "Carrefour compras do mês", "Mercado Extra"], "despesa", (80, 900)),
+    ("Padaria", ["Padaria do bairro", "Padaria Real pães"], "despesa", (8, 60)),
+    ("iFood", ["iFood", "IFD*IFOOD pedido"], "despesa", (25, 140)),
+    ("Uber", ["Uber", "UBER *TRIP"], "despesa", (12, 70)),
+    ("99", ["99 táxi", "99APP corrida"], "despesa", (10, 55)),
+    ("Combustível", ["Posto Shell gasolina", "Auto Posto Ipiranga"], "despesa", (150, 320)),
+    ("Drogasil", ["Farmácia Drogasil", "DROGASIL 1234"], "despesa", (20, 250)),
+    ("Smart Fit", ["Academia Smart Fit", "SMARTFIT mensalidade"], "despesa", (99, 130)),
+    ("Unimed", ["Plano de saúde Unimed", "UNIMED mensalidade"], "despesa", (450, 900)),
+    ("Escola", ["Escola inglês", "Curso de inglês Wizard"], "despesa", (300, 600)),
+    ("Salário", ["Salário", "Pagamento salário empresa"], "receita", (5000, 9000)),
+    ("Freelance", ["Freelance design", "Projeto freelance logo"], "receita", (800, 3000)),
+    ("CDB", ["Rendimento CDB", "Rendimento aplicação"], "receita", (30, 200)),
+    ("OLX", ["Venda OLX", "Venda bicicleta OLX"], "receita", (50, 800)),
+]
+
+# (pergunta, estabelecimentos relevantes, tipo): "nome" cita o estabelecimento; "assunto" só o tema
+PERGUNTAS = [
+    ("quanto gastei com netflix?", {"Netflix"}, "nome"),
+    ("já paguei o spotify?", {"Spotify"}, "nome"),
+    ("quanto foi o aluguel?", {"Aluguel"}, "nome"),
+    ("valor do condomínio", {"Condomínio"}, "nome"),
+    ("conta da enel", {"Enel"}, "nome"),
+    ("quanto paguei na sabesp", {"Sabesp"}, "nome"),
+    ("gastos com ifood", {"iFood"}, "nome"),
+    ("corridas de uber", {"Uber"}, "nome"),
+    ("compras na drogasil", {"Drogasil"}, "nome"),
+    ("mensalidade da smart fit", {"Smart Fit"}, "nome"),
+    ("quanto pago de unimed", {"Unimed"}, "nome"),
+    ("recebi o freelance?", {"Freelance"}, "nome"),
+    ("quanto gastei com streaming?", {"Netflix", "Spotify", "Disney+"}, "assunto"),
+    ("quanto gastei com moradia?", {"Aluguel", "Condomínio"}, "assunto"),
+    ("contas de consumo da casa", {"Enel", "Sabesp", "Vivo"}, "assunto"),
+    ("gastos com comida", {"Supermercado", "Padaria", "iFood"}, "assunto"),
+    ("quanto gastei com transporte?", {"Uber", "99", "Combustível"}, "assunto"),
+    ("despesas com saúde", {"Drogasil", "Unimed", "Smart Fit"}, "assunto"),
+    ("quanto ganhei de renda extra?", {"Freelance", "OLX", "CDB"}, "assunto"),
+    ("meu salário caiu?", {"Salário"}, "nome"),
+]
+
+async def _embeddings(textos: list, fonte: str) -> list:
+    if fonte == "local":
+        return await LocalEmbeddingClient().embed_lote(textos)
+    vetores = []
+    for inicio in range(0, len(textos), 100):
+        vetores.extend(await gemini_client.embed_lote(textos[inicio:inicio + 100]))
+    if not any(any(v) for v in vetores):
+        raise SystemExit("A API devolveu vetores zerados (GEMINI_API_KEY ausente?). Use --embeddings local.")
+    return vetores
+
+async def preparar(lancamentos: int, fonte: str, seed: int):
+    aleatorio = random.Random(seed)
+    hoje = date.today()
+    textos, estabelecimentos = [], []
+    for i in range(lancamentos):
+        estabelecimento, variacoes, tipo, (minimo, maximo) = aleatorio.choice(CATALOGO)
+        lancamento = Lancamento(
+            id=i + 1, tipo=tipo, descricao=aleatorio.choice(variacoes),
+            valor=Decimal(str(round(aleatorio.uniform(minimo, maximo), 2))),
+            data_vencimento=hoje - timedelta(days=aleatorio.randint(0, 730)),
+            is_pago=aleatorio.random() < 0.8,
+        )
+        textos.append(formatar_para_embedding(lancamento))
+        estabelecimentos.append(estabelecimento)
+
+    print(f"Gerando embeddings ({fonte}) de {lancamentos:,} lançamentos...")
+    vetores = await _embeddings(textos, fonte)
+
+    async with engine.connect() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        # Mesmas colunas (inclusive a tsvector gerada) e mesmos índices (HNSW, GIN) da tabela real
+        await conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.finance_embeddings "
+            "(LIKE public.finance_embeddings INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES)"
+        ))
+        tabela = FinanceEmbedding.__table__.to_metadata(FinanceEmbedding.metadata.__class__(), schema=SCHEMA)
+        linhas = [
+            {"id": i + 1, "user_id": USER_ID, "lancamento_id": i + 1, "conteudo": texto,
+             "embedding": vetor, "metadata": {"estabelecimento": estabelecimento}}
+            for i, (texto, vetor, estabelecimento) in enumerate(zip(textos, vetores, estabelecimentos))
+        ]
+        for inicio in range(0, len(linhas), 500):
+            await conn.execute(pg_insert(tabela), linhas[inicio:inicio + 500])
+        await conn.commit()
+        autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await autocommit.execute(text(f"VACUUM ANALYZE {SCHEMA}.finance_embeddings"))
+
+def _engine_schema():
+    # Conexões próprias (sem pool): o search_path direciona "finance_embeddings" para o schema do benchmark
+    return create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{SCHEMA},public"}},
+    )
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+async def avaliar(k: int, fonte: str):
+    vetores = await _embeddings([p for p, _, _ in PERGUNTAS], fonte)
+    engine_schema = _engine_schema()
+    retriever = RetinaRetriever()
+    resultados = {}
+    # Uma única transação: com NullPool, cada commit abriria uma conexão nova dentro da medição
+    async with AsyncSession(engine_schema) as db:
+        estabelecimento_de = dict((await db.execute(text(
+            "SELECT id, metadata->>'estabelecimento' FROM finance_embeddings"
+        ))).all())
+        for modo in MODOS_BUSCA:
+            await retriever.buscar_lancamentos_similares(
+                db, USER_ID, vetores[0], top_k=k, threshold=None, modo=modo, pergunta=PERGUNTAS[0][0]
+            )
+            por_tipo = {}
+            tempos = []
+            for (pergunta, relevantes, tipo), vetor in zip(PERGUNTAS, vetores):
+                inicio = time.perf_counter()
+                fontes = await retriever.buscar_lancamentos_similares(
+                    db, USER_ID, vetor, top_k=k, threshold=None, modo=modo, pergunta=pergunta
+                )
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                encontradas = [estabelecimento_de[f.id] for f in fontes]
+
+                acertos = [estabelecimento in relevantes for estabelecimento in encontradas]
+                posicao = next((i + 1 for i, acerto in enumerate(acertos) if acerto), None)
+                # recall@k: fração dos estabelecimentos relevantes que apareceu ao menos uma vez
+                vistas = set(encontradas) & relevantes
+                metricas = por_tipo.setdefault(tipo, {"precisao": [], "recall": [], "rr": []})
+                metricas["precisao"].append(sum(acertos) / k)
+                metricas["recall"].append(len(vistas) / len(relevantes))
+                metricas["rr"].append(1 / posicao if posicao else 0.0)
+            resultados[modo] = (por_tipo, _percentis(tempos))
+    await engine_schema.dispose()
+
+    print(f"\n{len(PERGUNTAS)} perguntas rotuladas, k={k}, embeddings={fonte}")
+    print(f"{'modo':<10}{'perguntas':<10}{'precisão@k':>12}{'recall@k':>10}{'MRR':>8}")
+    for modo, (por_tipo, _) in resultados.items():
+        for tipo in ("nome", "assunto"):
+            m = por_tipo[tipo]
+            print(f"{modo:<10}{tipo:<10}{statistics.mean(m['precisao']):>12.3f}"
+                  f"{statistics.mean(m['recall']):>10.3f}{statistics.mean(m['rr']):>8.3f}")
+    print(f"\n{'modo':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for modo, (_, (p50, p95)) in resultados.items():
+        print(f"{modo:<10}{p50:>10.2f}{p95:>10.2f}")
+
+async def main(args):
+    if not args.reusar:
+        await preparar(args.lancamentos, args.embeddings, args.seed)
+    await avaliar(args.k, args.embeddings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qualidade e latência da busca vetorial vs híbrida.")
+    parser.add_argument("--embeddings", choices=["api", "local"], default="api")
+    parser.add_argument("--lancamentos", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=7, help="top_k, como no chat")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reusar", action="store_true", help="Não recria o schema (mesma fonte de embeddings)")
+    asyncio.run(main(parser.parse_args()))
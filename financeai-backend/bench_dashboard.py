@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import select, delete, text
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.models.categoria import Categoria
+from app.models.lancamento import Lancamento
+from app.core.security import get_password_hash
+from app.services.finance.resumos import reconstruir_resumos
+from app.services.finance.dashboard import obter_resumo_consolidado, obter_resumo_sequencial
+
+BENCH_EMAIL = "bench-dashboard@teste.com"
+
+async def preparar_usuario(total: int) -> int:
+    """Cria (ou recria) um usuário com `total` lançamentos espalhados em ~4 anos."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).filter(User.email == BENCH_EMAIL))
+        user = result.scalars().first()
+        if not user:
+            user = User(email=BENCH_EMAIL, nome="Benchmark", hashed_password=get_password_hash("bench123"), is_active=True)
+            db.add(user)
+            await db.flush()
+
+        await db.execute(delete(Lancamento).where(Lancamento.user_id == user.id))
+        result = await db.execute(select(Categoria).filter(Categoria.user_id == user.id))
+        if not result.scalars().first():
+            for nome, tipo in [("Salário", "receita"), ("Moradia", "despesa"), ("Mercado", "despesa"),
+                               ("Transporte", "despesa"), ("Lazer", "despesa"), ("Acordo", "renegociacao")]:
+                db.add(Categoria(nome=nome, tipo=tipo, user_id=user.id))
+            await db.flush()
+
+        # Geração em massa direto no banco (bem mais rápido que ORM para dezenas de milhares de linhas)
+        await db.execute(text("""
+            INSERT INTO lancamentos (user_id, categoria_id, tipo, descricao, valor, data_vencimento, is_pago)
+            SELECT :user_id, c.id, c.tipo, 'Lançamento ' || g, round((random() * 900 + 10)::numeric, 2),
+                   current_date - (random() * 1400)::int + 60, random() < 0.8
+            FROM generate_series(1, :total) g
+            CROSS JOIN LATERAL (
+                SELECT id, tipo FROM categorias WHERE user_id = :user_id ORDER BY random() + g * 0 LIMIT 1
+            ) c
+        """), {"user_id": user.id, "total": total})
+        await reconstruir_resumos(db, user.id)
+        await db.commit()
+        await db.execute(text("ANALYZE lancamentos"))
+        await db.execute(text("ANALYZE resumos_mensais"))
+        return user.id
+
+async def medir(nome: str, funcao, user_id: int, repeticoes: int):
+    hoje = date.today()
+    tempos = []
+    resultado = None
+    async with AsyncSessionLocal() as db:
+        # Aquecimento (planos e conexões)
+        await funcao(db, user_id, hoje.month, hoje.year, hoje)
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = await funcao(db, user_id, hoje.month, hoje.year, hoje)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p95 = tempos[max(0, int(len(tempos) * 0.95) - 1)]
+    print(f"{nome:<12} média {statistics.mean(tempos):7.2f} ms | p50 {statistics.median(tempos):7.2f} ms | p95 {p95:7.2f} ms")
+    return resultado, statistics.median(tempos)
+
+async def main(total: int, repeticoes: int):
+    print(f"Preparando usuário de benchmark com {total} lançamentos...")
+    user_id = await preparar_usuario(total)
+
+    seq, p50_seq = await medir("sequencial", obter_resumo_sequencial, user_id, repeticoes)
+    cons, p50_cons = await medir("consolidado", obter_resumo_consolidado, user_id, repeticoes)
+
+    if seq.model_dump() != cons.model_dump():
+        print("⚠️  Resultados divergentes entre as implementações!")
+        raise SystemExit(1)
+    print(f"✅ Resultados idênticos. Ganho de latência (p50): {p50_seq / p50_cons:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do resumo do Dashboard: consultas sequenciais vs consolidada.")
+    parser.add_argument("--lancamentos", type=int, default=50_000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.lancamentos, args.repeticoes))
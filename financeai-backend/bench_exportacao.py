@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import resource
+import time
+import tracemalloc
+
+from bench_dashboard import preparar_usuario
+from app.services.finance.exportacao import exportar_lancamentos, pyarrow_disponivel
+
+def _rss_mb() -> float:
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def medir(user_id: int, formato: str, total: int):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total_bytes = 0
+    partes = 0
+    async for parte in exportar_lancamentos(user_id, formato):
+        total_bytes += len(parte)
+        partes += 1
+    duracao = time.perf_counter() - inicio
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    extra = ""
+    if formato != "csv":
+        import pyarrow as pa
+        extra = f" | arrow pool máx {pa.default_memory_pool().max_memory() / 1e6:6.1f} MB"
+    print(
+        f"{formato:<8} {total / duracao:>10,.0f} linhas/s | {total_bytes / duracao / 1e6:6.1f} MB/s | "
+        f"{total_bytes / 1e6:7.1f} MB em {partes} partes | pico Python {pico_python / 1e6:6.1f} MB{extra} | "
+        f"RSS máx {_rss_mb():7.1f} MB"
+    )
+
+async def main(total: int, semear: bool):
+    if semear:
+        print(f"Preparando usuário de benchmark com {total} lançamentos...")
+    user_id = await preparar_usuario(total) if semear else None
+    if user_id is None:
+        from sqlalchemy import select
+        from app.db.session import AsyncSessionLocal
+        from app.models.user import User
+        from bench_dashboard import BENCH_EMAIL
+        async with AsyncSessionLocal() as db:
+            user_id = (await db.execute(select(User.id).filter(User.email == BENCH_EMAIL))).scalar_one()
+
+    formatos = ["csv"] + (["parquet", "arrow"] if pyarrow_disponivel() else [])
+    for formato in formatos:
+        await medir(user_id, formato, total)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput e memória da exportação de lançamentos.")
+    parser.add_argument("--lancamentos", type=int, default=500_000)
+    parser.add_argument("--sem-semear", action="store_true", help="Reutiliza o usuário de benchmark já populado")
+    args = parser.parse_args()
+    asyncio.run(main(args.lancamentos, not args.sem_semear))
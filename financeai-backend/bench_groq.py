@@ -0,0 +1,79 @@
+"""
+Benchmark do tempo até o primeiro token (TTFT) do streaming da Groq: cliente novo por chamada
+(como era antes: TCP + TLS a cada chamada) vs o cliente compartilhado de groq_client (conexão reaproveitada).
+
+Faz --chamadas chamadas sequenciais em cada modo, intercaladas para que variações da API afetem os dois
+igualmente, e reporta p50/p95 do TTFT e da resposta completa. Precisa de GROQ_API_KEY;
+--url aponta para outro endpoint compatível com a API da OpenAI (proxy, servidor local).
+
+Uso:
+    python bench_groq.py
+    python bench_groq.py --chamadas 50 --prompt "Responda só: ok"
+    GROQ_HTTP2=true python bench_groq.py     # requer pip install 'httpx[http2]'
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from app.config import settings
+from app.services.llm.groq_client import groq_client
+
+async def _stream_sem_pool(prompt: str, modelo: str):
+    """Réplica do cliente antigo: um httpx.AsyncClient aberto e fechado a cada chamada."""
+    headers = {"Authorization": f"Bearer {groq_client.api_key}", "Content-Type": "application/json"}
+    payload = {"model": modelo, "messages": [{"role": "user", "content": prompt}], "temperature": 0.5, "stream": True}
+    async with httpx.AsyncClient() as client:
+        async with client.stream("POST", groq_client.base_url, json=payload, headers=headers) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and line != "data: [DONE]":
+                    content = json.loads(line[6:])["choices"][0]["delta"].get("content", "")
+                    if content:
+                        yield content
+
+async def _medir(stream):
+    inicio = time.perf_counter()
+    ttft = None
+    async for _ in stream:
+        if ttft is None:
+            ttft = (time.perf_counter() - inicio) * 1000
+    return ttft, (time.perf_counter() - inicio) * 1000
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+async def main(args):
+    if args.url:
+        groq_client.base_url = f"{args.url.rstrip('/')}/chat/completions"
+    await groq_client.iniciar()
+    # Aquecimento: a primeira chamada do cliente compartilhado também abre conexão
+    await _medir(groq_client.generate_response(args.prompt, model=args.modelo))
+
+    tempos = {"cliente por chamada": ([], []), "cliente compartilhado": ([], [])}
+    for _ in range(args.chamadas):
+        for nome, stream in (
+            ("cliente por chamada", _stream_sem_pool(args.prompt, args.modelo)),
+            ("cliente compartilhado", groq_client.generate_response(args.prompt, model=args.modelo)),
+        ):
+            ttft, total = await _medir(stream)
+            tempos[nome][0].append(ttft)
+            tempos[nome][1].append(total)
+    await groq_client.fechar()
+
+    print(f"{args.chamadas} chamadas por modo, {groq_client.base_url}, HTTP/2={settings.GROQ_HTTP2}")
+    print(f"{'modo':<24}{'TTFT p50':>10}{'TTFT p95':>10}{'total p50':>11}{'total p95':>11}  (ms)")
+    for nome, (ttfts, totais) in tempos.items():
+        print(f"{nome:<24}{_percentis(ttfts)[0]:>10.1f}{_percentis(ttfts)[1]:>10.1f}{_percentis(totais)[0]:>11.1f}{_percentis(totais)[1]:>11.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTFT da Groq: cliente novo por chamada vs cliente compartilhado.")
+    parser.add_argument("--chamadas", type=int, default=20)
+    parser.add_argument("--prompt", default="Responda apenas: ok")
+    parser.add_argument("--modelo", default="llama-3.3-70b-versatile")
+    parser.add_argument("--url", default=None, help="Base da API (padrão: GROQ_BASE_URL)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,275 @@
+"""
+Avaliação da interpretação local de intenção (app/services/rag/intencao.py) num corpus rotulado.
+
+Cada mensagem tem o resultado esperado: não criar, ou criar com valor, tipo, data, parcelas e uma
+palavra que o nome deve conter. Para as mensagens em que a regra tem certeza, mede acerto da
+intenção e de cada campo; as demais iriam à LLM (cobertura = parte respondida localmente).
+Também mede a latência da regra por mensagem.
+
+Com --llm, roda também a extração pela LLM (precisa de GROQ_API_KEY) em todas as mensagens e
+compara: só LLM vs regra com a LLM como fallback (acerto e latência).
+
+Uso:
+    python bench_intencao.py
+    python bench_intencao.py --detalhes     # lista cada erro e cada mensagem enviada à LLM
+    python bench_intencao.py --novas        # só as frases escritas depois das regras
+    python bench_intencao.py --adversarial  # só as frases montadas para enganar a regra
+    python bench_intencao.py --llm
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from app.config import settings
+from app.services.rag.intencao import interpretar_mensagem
+from app.services.rag import pipeline
+
+# Data de referência dos rótulos ("amanhã", "dia 5 do mês que vem"...)
+HOJE = date(2026, 10, 18)
+NAO = {"intencao_de_criar": False}
+
+def criar(valor, nome, data="2026-10-18", parcelas=1, tipo="despesa"):
+    return {"intencao_de_criar": True, "valor": valor, "nome": nome, "data_inicial": data, "parcelas": parcelas, "tipo": tipo}
+
+CORPUS = [
+    # Perguntas e conversa
+    ("Quanto gastei este mês?", NAO),
+    ("quanto gastei com mercado em setembro?", NAO),
+    ("Qual foi minha maior despesa?", NAO),
+    ("quais são minhas contas a pagar?", NAO),
+    ("Como posso economizar mais?", NAO),
+    ("Estou gastando muito com delivery?", NAO),
+    ("me mostra os gastos com uber", NAO),
+    ("Vale a pena quitar o financiamento antes?", NAO),
+    ("oi", NAO),
+    ("Bom dia!", NAO),
+    ("obrigado pela ajuda", NAO),
+    ("Me ajuda a montar um orçamento", NAO),
+    ("resumo do mês passado", NAO),
+    ("compare outubro com setembro", NAO),
+    ("Quanto sobrou do salário?", NAO),
+    ("Tenho 2 mil guardados, onde investir?", NAO),
+    ("Devo cancelar a Netflix?", NAO),
+    ("quanto vou pagar de cartão mês que vem?", NAO),
+    ("dicas para gastar menos com comida", NAO),
+    ("qual a média de gastos com luz?", NAO),
+    ("onde eu mais gastei dinheiro?", NAO),
+    ("listar despesas pendentes", NAO),
+    ("analisa meus gastos de lazer", NAO),
+    ("meu saldo está negativo?", NAO),
+    ("preciso reduzir os gastos", NAO),
+    ("Como registro uma despesa parcelada?", NAO),
+    ("quando eu lanço o salário ele entra como receita?", NAO),
+    ("não registra nada ainda, só estou vendo", NAO),
+    ("meus investimentos renderam bem", NAO),
+    ("valeu!", NAO),
+    # Pedidos de registro
+    ("Registre uma despesa de 50 reais no mercado", criar(50, "mercado")),
+    ("registra 120 de conta de luz dia 10", criar(120, "luz", "2026-10-10")),
+    ("Adicione R$ 1.234,56 de aluguel", criar(1234.56, "aluguel")),
+    ("adiciona o aluguel de 2 mil pro dia 5 do mês que vem", criar(2000, "aluguel", "2026-11-05")),
+    ("anota aí 35 de uber", criar(35, "uber")),
+    ("Lança 89,90 da farmácia ontem", criar(89.9, "farmácia", "2026-10-17")),
+    ("lançar gasolina 250 reais hoje", criar(250, "gasolina")),
+    ("Cadastre uma receita de 5 mil de salário dia 5", criar(5000, "salário", "2026-10-05", tipo="receita")),
+    ("registre o salário de 5.000 no dia 30", criar(5000, "salário", "2026-10-30", tipo="receita")),
+    ("adiciona receita de 800 do freela", criar(800, "freela", tipo="receita")),
+    ("registra a venda da bicicleta por 1.500", criar(1500, "bicicleta", tipo="receita")),
+    ("Registre a geladeira em 10x de 350", criar(350, "geladeira", parcelas=10)),
+    ("lança a TV em 12 vezes de 199,90 a partir de 15/11", criar(199.9, "TV", "2026-11-15", parcelas=12)),
+    ("adicione 3 parcelas de 200 do curso", criar(200, "curso", parcelas=3)),
+    ("anote cinquenta reais de padaria", criar(50, "padaria")),
+    ("registre dois mil e quinhentos de aluguel", criar(2500, "aluguel")),
+    ("Adiciona 2k de reserva de emergência mês que vem", criar(2000, "reserva", "2026-11-18")),
+    ("bota 45 reais de pizza amanhã", criar(45, "pizza", "2026-10-19")),
+    # Novembro não tem dia 31: a regra não ajusta para o dia 30, pergunta à LLM
+    ("coloca 300 de academia dia 31 do mês que vem", criar(300, "academia", data=None)),
+    ("cria uma despesa de 60 com cinema", criar(60, "cinema")),
+    ("salva 15 reais de café", criar(15, "café")),
+    ("registrar IPVA de 1.800 dia 20 de janeiro de 2027", criar(1800, "IPVA", "2027-01-20")),
+    ("adicione o IPTU 5 de dezembro 980 reais", criar(980, "IPTU", "2026-12-05")),
+    ("pode registrar 150 de internet pra semana que vem?", criar(150, "internet", "2026-10-25")),
+    ("quero lançar 70 reais de ração", criar(70, "ração")),
+    ("Registre R$50 no iFood", criar(50, "iFood")),
+    ("registra 1,5 mil de reforma", criar(1500, "reforma")),
+    ("anota mil reais de dividendos", criar(1000, "dividendos", tipo="receita")),
+    ("lança à vista 640 do celular", criar(640, "celular")),
+    ("adiciona conta de água 98,50 dia 12", criar(98.5, "água", "2026-10-12")),
+    ("registre cento e vinte reais de gás", criar(120, "gás")),
+    ("anota 22 do estacionamento", criar(22, "estacionamento")),
+    ("agende o boleto da escola de 1.100 para dia 10 do próximo mês", criar(1100, "escola", "2026-11-10")),
+    ("inclua uma receita de 300 de reembolso", criar(300, "reembolso", tipo="receita")),
+    ("Registre 4 mil de salário", criar(4000, "salário", tipo="receita")),
+    # Casos que a regra deve deixar para a LLM (rótulo = o que a LLM deveria responder)
+    ("gastei 50 no mercado", criar(50, "mercado")),
+    ("paguei 120 de luz hoje", criar(120, "luz")),
+    ("recebi 800 do freela", criar(800, "freela", tipo="receita")),
+    ("registre 1200 em 12x no cartão", criar(100, "cartão", parcelas=12)),
+    ("registra 50 e 30 no mercado", criar(80, "mercado")),
+    ("lança o pagamento do freela de 900", criar(900, "freela", tipo="receita")),
+    ("registre uma despesa de 50", criar(50, "Despesa")),
+    ("mercado 87,40", criar(87.4, "mercado")),
+    ("uber 23 ontem", criar(23, "uber", "2026-10-17")),
+]
+
+# Escritas depois das regras, sem ajustá-las: estimativa mais honesta do acerto fora do corpus acima
+CORPUS_NOVAS = [
+    ("registre 50 reais de mercado e 30 de padaria", criar(80, "mercado")),
+    ("lança aí 1.200,00 referente ao aluguel de novembro", criar(1200, "aluguel")),
+    ("adicione uma nova despesa: academia, 110 reais, todo dia 10", criar(110, "academia", "2026-10-10")),
+    ("registra pra mim 39,90 da netflix dia 22", criar(39.9, "netflix", "2026-10-22")),
+    ("coloca na planilha 200 de presente", criar(200, "presente")),
+    ("anota que eu gastei 40 na feira", criar(40, "feira")),
+    ("Quanto é 10% de 300?", NAO),
+    ("lembra de pagar o boleto dia 10", NAO),
+    ("salva aí: 1500 de salário extra", criar(1500, "salário", tipo="receita")),
+    ("cadastrar conta de telefone 59,99 vencendo dia 8", criar(59.99, "telefone", "2026-10-08")),
+    ("Adiciona: mercado, R$ 320,15, ontem", criar(320.15, "mercado", "2026-10-17")),
+    ("registra uma entrada de 250 do pix do João", criar(250, "pix", tipo="receita")),
+    ("lança 3x de 80 do tênis", criar(80, "tênis", parcelas=3)),
+    ("adiciona a parcela do carro, 48 vezes de 1.050, começando dia 10 do mês que vem",
+     criar(1050, "carro", "2026-11-10", parcelas=48)),
+    ("bota ai 12 reais do pão", criar(12, "pão")),
+    ("registre R$ 2.500,00 de bônus", criar(2500, "bônus", tipo="receita")),
+    ("oi, registra 30 de lanche", criar(30, "lanche")),
+    ("registre cem reais de doação", criar(100, "doação")),
+    ("lança quinhentos e cinquenta de conserto do carro", criar(550, "conserto")),
+    ("Me lembra quanto paguei de luz", NAO),
+    ("gasto de 45 com farmácia", criar(45, "farmácia")),
+    ("registre 45", criar(45, "Despesa")),
+    ("adicione 20 reais de uber e 15 de ônibus", criar(35, "uber")),
+    ("registrar 1.000.000 de prêmio", criar(1_000_000, "prêmio", tipo="receita")),
+    ("qual dia vence o cartão?", NAO),
+]
+
+# Frases montadas para enganar a regra: escrita americana de valores, datas inexistentes ou que a
+# regra não resolve, orações no lugar do nome. O rótulo é a leitura certa; data=None quando nenhuma
+# data serve (o chat teria de perguntar), então qualquer criação local conta como erro.
+# As últimas são controles parecidos que a regra deve continuar respondendo.
+CORPUS_ADVERSARIAL = [
+    ("registra 1,234.56 de aluguel", criar(1234.56, "aluguel")),
+    ("lança 2,500 de freela", criar(2500, "freela", tipo="receita")),
+    ("registre 1,250,000 de venda do apê", criar(1_250_000, "venda", tipo="receita")),
+    ("anota 12.34.5 de gasolina", criar(12345, "gasolina", data=None)),
+    ("registra 5 reais de café dia 31 de fevereiro", criar(5, "café", data=None)),
+    ("anota 80 de luz dia 31/11", criar(80, "luz", data=None)),
+    ("registre 45,00 de farmácia dia 29 de fevereiro de 2027", criar(45, "farmácia", data=None)),
+    ("registra 40 reais de pizza semana passada", criar(40, "pizza", "2026-10-11")),
+    ("lança 120 de gasolina mês passado", criar(120, "gasolina", "2026-09-18")),
+    ("registra 35 de cinema sexta passada", criar(35, "cinema", "2026-10-16")),
+    ("adiciona 60 de farmácia no dia anterior", criar(60, "farmácia", "2026-10-17")),
+    ("anota 300 do conserto, semana retrasada", criar(300, "conserto", "2026-10-04")),
+    ("lança 70 de academia na segunda", criar(70, "academia", data=None)),
+    ("registra 18 de pedágio no fim de semana", criar(18, "pedágio", data=None)),
+    ("registra 100 de mesada do ano passado", criar(100, "mesada", data=None)),
+    ("registra 50 reais de mercado que eu gastei ontem?", criar(50, "mercado", "2026-10-17")),
+    ("anota 25 de lanche que comprei hoje", criar(25, "lanche")),
+    ("registra 200 do presente que a Ana pagou", criar(200, "presente")),
+    ("lança 90 do jantar, foi caro", criar(90, "jantar")),
+    # Controles
+    ("registra 3,50 do café de ontem", criar(3.5, "café", "2026-10-17")),
+    ("anota 80 de luz no dia 30/11", criar(80, "luz", "2026-11-30")),
+    ("registre 1.234.567,89 de venda do apartamento", criar(1_234_567.89, "venda", tipo="receita")),
+    ("lança 10.50 de estacionamento", criar(10.5, "estacionamento")),
+    ("registre 29,90 de spotify dia 28 de fevereiro", criar(29.9, "spotify", "2026-02-28")),
+]
+
+def _campos(previsto: dict, esperado: dict) -> dict:
+    if esperado["data_inicial"] is None:
+        return {"data": False}
+    return {
+        "valor": abs(float(previsto.get("valor", 0)) - esperado["valor"]) < 0.005,
+        "tipo": previsto.get("tipo") == esperado["tipo"],
+        "data": previsto.get("data_inicial") == esperado["data_inicial"],
+        "parcelas": int(previsto.get("parcelas", 1)) == esperado["parcelas"],
+        "nome": esperado["nome"].lower() in str(previsto.get("nome", "")).lower(),
+    }
+
+def _acertou(previsto: dict, esperado: dict) -> bool:
+    if bool(previsto.get("intencao_de_criar")) != esperado["intencao_de_criar"]:
+        return False
+    return not esperado["intencao_de_criar"] or all(_campos(previsto, esperado).values())
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+def avaliar_regras(corpus, repeticoes: int, detalhes: bool):
+    locais, tempos = [], []
+    for mensagem, esperado in corpus:
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            resultado = interpretar_mensagem(mensagem, HOJE)
+        tempos.append((time.perf_counter() - inicio) / repeticoes * 1_000_000)
+        locais.append(resultado)
+
+    respondidas = [(m, e, r) for (m, e), r in zip(corpus, locais) if r.extracao is not None]
+    intencao_ok = [bool(r.extracao["intencao_de_criar"]) == e["intencao_de_criar"] for _, e, r in respondidas]
+    falsos_criar = sum(1 for _, e, r in respondidas if r.extracao["intencao_de_criar"] and not e["intencao_de_criar"])
+    criacoes = [(m, e, r) for m, e, r in respondidas if e["intencao_de_criar"] and r.extracao["intencao_de_criar"]]
+    por_campo = {campo: 0 for campo in ("valor", "tipo", "data", "parcelas", "nome")}
+    for _, e, r in criacoes:
+        for campo, ok in _campos(r.extracao, e).items():
+            por_campo[campo] += ok
+
+    n_criar = sum(1 for _, e in corpus if e["intencao_de_criar"])
+    print(f"{len(corpus)} mensagens ({n_criar} pedidos de registro), referência {HOJE:%d/%m/%Y}\n")
+    print(f"Respondidas localmente: {len(respondidas)}/{len(corpus)} ({len(respondidas) / len(corpus):.0%}); "
+          f"{len(corpus) - len(respondidas)} iriam à LLM")
+    print(f"Intenção correta entre as locais: {sum(intencao_ok)}/{len(respondidas)}; criações indevidas: {falsos_criar}")
+    print(f"Extração completa correta: {sum(1 for m, e, r in criacoes if all(_campos(r.extracao, e).values()))}/{len(criacoes)} criações locais")
+    print("Por campo: " + ", ".join(f"{campo} {n}/{len(criacoes)}" for campo, n in por_campo.items()))
+    p50, p95 = _percentis(tempos)
+    print(f"Latência da regra: p50 {p50:.0f} µs, p95 {p95:.0f} µs, máx {max(tempos):.0f} µs")
+
+    if detalhes:
+        print("\nErros da regra:")
+        for m, e, r in respondidas:
+            if not _acertou(r.extracao, e):
+                print(f"  {m!r}\n    esperado {e}\n    regra    {r.extracao}")
+        print("\nEnviadas à LLM:")
+        for (m, _), r in zip(corpus, locais):
+            if r.extracao is None:
+                print(f"  [{r.motivo}] {m}")
+    return locais
+
+async def avaliar_llm(corpus, locais):
+    """Só LLM vs regra + LLM: mesma função do chat, com e sem a regra."""
+    settings.CHAT_INTENCAO_LOCAL = False
+    resultados, tempos = [], []
+    for mensagem, _ in corpus:
+        inicio = time.perf_counter()
+        resultados.append(await pipeline._extrair_intencao(mensagem, HOJE))
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    so_llm = sum(_acertou(r, e) for r, (_, e) in zip(resultados, corpus))
+    hibrido = [l.extracao if l.extracao is not None else r for l, r in zip(locais, resultados)]
+    tempos_hibrido = [0.0 if l.extracao is not None else t for l, t in zip(locais, tempos)]
+    print(f"\n{'modo':<16}{'acerto':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'média (ms)':>12}")
+    for nome, acertos, ts in (
+        ("só LLM", so_llm, tempos),
+        ("regra + LLM", sum(_acertou(r, e) for r, (_, e) in zip(hibrido, corpus)), tempos_hibrido),
+    ):
+        p50, p95 = _percentis(ts)
+        print(f"{nome:<16}{acertos / len(corpus):>10.0%}{p50:>10.0f}{p95:>10.0f}{statistics.mean(ts):>12.0f}")
+
+async def main(args):
+    if args.todas:
+        corpus = CORPUS + CORPUS_NOVAS + CORPUS_ADVERSARIAL
+    else:
+        corpus = CORPUS_NOVAS if args.novas else CORPUS_ADVERSARIAL if args.adversarial else CORPUS
+    locais = avaliar_regras(corpus, args.repeticoes, args.detalhes)
+    if args.llm:
+        await avaliar_llm(corpus, locais)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Acerto e latência da interpretação local de intenção do chat.")
+    parser.add_argument("--repeticoes", type=int, default=200, help="Execuções por mensagem na medição de latência")
+    parser.add_argument("--detalhes", action="store_true", help="Lista erros e mensagens enviadas à LLM")
+    parser.add_argument("--novas", action="store_true", help="Só as frases escritas depois das regras")
+    parser.add_argument("--adversarial", action="store_true", help="Só as frases montadas para enganar a regra")
+    parser.add_argument("--todas", action="store_true", help="Os três conjuntos juntos")
+    parser.add_argument("--llm", action="store_true", help="Compara com a extração pela LLM (precisa de GROQ_API_KEY)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+Teste de carga: rajadas de login vs latência de uma rota não relacionada (/dashboard/resumo).
+
+Mede a latência do dashboard em três cenários, no mesmo processo e event loop da API:
+- sem logins concorrentes (referência);
+- com rajadas de login e bcrypt síncrono no handler (comportamento anterior);
+- com rajadas de login e bcrypt no pool dedicado (app.core.security).
+
+Uso:
+    python bench_login.py
+    python bench_login.py --rajada 32 --amostras 200 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+import httpx
+from sqlalchemy import select
+
+from app.api.v1 import auth as rotas_auth
+from app.config import settings
+from app.core import security
+from app.core.metricas import metricas
+from app.db.session import AsyncSessionLocal
+from app.main import app
+from app.models.user import User
+from bench_dashboard import BENCH_EMAIL, preparar_usuario
+
+SENHA = "bench123"
+
+async def _verificar_no_event_loop(plain_password: str, hashed_password: str) -> bool:
+    # Como era antes: bcrypt direto no handler async
+    return security.verify_password(plain_password, hashed_password)
+
+async def _rajadas(client: httpx.AsyncClient, tamanho: int, parar: asyncio.Event, contagem: list):
+    dados = {"username": BENCH_EMAIL, "password": SENHA}
+    while not parar.is_set():
+        respostas = await asyncio.gather(*[client.post("/api/v1/auth/login", data=dados) for _ in range(tamanho)])
+        assert all(r.status_code == 200 for r in respostas)
+        contagem[0] += len(respostas)
+
+async def _medir(client: httpx.AsyncClient, headers: dict, amostras: int, rajada: int) -> dict:
+    hoje = date.today()
+    rota = f"/api/v1/dashboard/resumo?mes={hoje.month}&ano={hoje.year}"
+    parar = asyncio.Event()
+    contagem = [0]
+    carga = asyncio.create_task(_rajadas(client, rajada, parar, contagem)) if rajada else None
+    await asyncio.sleep(0.2)  # deixa a primeira rajada entrar na fila
+
+    tempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(amostras):
+        inicio = time.perf_counter()
+        resposta = await client.get(rota, headers=headers)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        assert resposta.status_code == 200
+        await asyncio.sleep(0.01)
+    duracao = time.perf_counter() - inicio_total
+
+    parar.set()
+    if carga:
+        await carga
+    tempos.sort()
+    return {
+        "p50": statistics.median(tempos),
+        "p95": tempos[max(0, int(len(tempos) * 0.95) - 1)],
+        "max": tempos[-1],
+        "logins_s": contagem[0] / duracao,
+    }
+
+async def main(args):
+    settings.BCRYPT_ROUNDS = args.rounds
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).filter(User.email == BENCH_EMAIL))).scalars().first()
+        if user:
+            user.hashed_password = security.get_password_hash(SENHA)
+            await db.commit()
+            user_id = user.id
+    if not user:
+        user_id = await preparar_usuario(args.lancamentos)
+
+    # O dashboard precisa chegar ao banco em toda chamada
+    settings.CACHE_RESPOSTAS_ATIVO = False
+    headers = {"Authorization": f"Bearer {security.create_access_token(BENCH_EMAIL, user_id=user_id)}"}
+    transporte = httpx.ASGITransport(app=app)
+    resultados = {}
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as client:
+        await client.get("/api/v1/dashboard/resumo", headers=headers)  # aquecimento
+        resultados["sem logins"] = await _medir(client, headers, args.amostras, 0)
+
+        original = rotas_auth.verificar_senha
+        rotas_auth.verificar_senha = _verificar_no_event_loop
+        resultados["bcrypt no event loop"] = await _medir(client, headers, args.amostras, args.rajada)
+        rotas_auth.verificar_senha = original
+
+        resultados["bcrypt no pool"] = await _medir(client, headers, args.amostras, args.rajada)
+
+    print(f"\nbcrypt rounds={args.rounds}, pool de {settings.BCRYPT_THREADS} threads, rajadas de {args.rajada} logins")
+    print(f"{'cenário':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'máx (ms)':>10}{'logins/s':>10}")
+    for nome, r in resultados.items():
+        print(f"{nome:<24}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['max']:>10.1f}{r['logins_s']:>10.1f}")
+    print(f"\nauth.bcrypt.executados = {metricas.snapshot()['contadores'].get('auth.bcrypt.executados', 0)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência do dashboard sob rajadas de login.")
+    parser.add_argument("--rajada", type=int, default=16, help="Logins concorrentes por rajada")
+    parser.add_argument("--amostras", type=int, default=100, help="Chamadas ao dashboard por cenário")
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS, help="Custo do bcrypt")
+    parser.add_argument("--lancamentos", type=int, default=5_000, help="Só se o usuário de benchmark não existir")
+    asyncio.run(main(parser.parse_args()))
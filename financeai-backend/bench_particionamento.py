@@ -0,0 +1,216 @@
+"""
+Benchmark das consultas do dashboard com lancamentos plana vs particionada por vencimento.
+
+Cria dois schemas com o mesmo conjunto sintético (padrão: 10 milhões de linhas) e os mesmos índices:
+- bench_plana.lancamentos: tabela comum;
+- bench_particionada.lancamentos: RANGE mensal em data_vencimento (ou de --meses-por-particao meses),
+  + HASH(user_id) com --hash N.
+As consultas reais da aplicação rodam em cada um trocando apenas o search_path da conexão.
+
+Uso:
+    python bench_particionamento.py                      # prepara (demorado) e mede
+    python bench_particionamento.py --reusar             # mede sobre os schemas já preparados
+    python bench_particionamento.py --linhas 2000000 --hash 4
+    python bench_particionamento.py --meses-por-particao 12
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.db.session import engine
+from app.models.lancamento import Lancamento
+from app.services.finance.dashboard import obter_resumo_consolidado, obter_resumo_sequencial
+from app.services.finance.particionamento import inicio_faixa
+
+SCHEMAS = ["bench_plana", "bench_particionada"]
+ANOS = 5
+
+INDICES = [
+    "CREATE INDEX ON {t} (id)",
+    "CREATE INDEX ON {t} (categoria_id)",
+    "CREATE INDEX ON {t} (data_vencimento)",
+    "CREATE INDEX ON {t} (parcela_group_id)",
+    "CREATE INDEX ON {t} (user_id, updated_at)",
+    "CREATE INDEX ON {t} (user_id, data_vencimento, id)",
+    "CREATE INDEX ON {t} (user_id, data_vencimento) WHERE tipo = 'despesa' AND is_pago = false",
+]
+
+async def _executar(conn, sql: str, **params):
+    inicio = time.perf_counter()
+    await conn.execute(text(sql), params)
+    return time.perf_counter() - inicio
+
+async def preparar(linhas: int, usuarios: int, subparticoes: int, meses_por_particao: int):
+    hoje = date.today().replace(day=1)
+    inicio = hoje - relativedelta(years=ANOS - 1)
+    fim = hoje + relativedelta(months=12)
+    async with engine.connect() as conn:
+        await conn.execute(text("SET maintenance_work_mem = '512MB'"))
+        categorias = (await conn.execute(text(
+            "SELECT array_agg(id) FILTER (WHERE tipo = 'receita'), array_agg(id) FILTER (WHERE tipo = 'despesa') FROM categorias"
+        ))).one()
+        if not categorias[0] or not categorias[1]:
+            raise SystemExit("É preciso ao menos uma categoria de receita e uma de despesa (rode bench_dashboard.py antes).")
+
+        for schema in SCHEMAS:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        await conn.execute(text("CREATE TABLE bench_plana.lancamentos (LIKE public.lancamentos INCLUDING DEFAULTS)"))
+        await conn.execute(text(
+            "CREATE TABLE bench_particionada.lancamentos (LIKE public.lancamentos INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (data_vencimento)"
+        ))
+        mes = inicio_faixa(inicio, meses_por_particao)
+        while mes < fim:
+            nome = f"bench_particionada.lancamentos_p{mes:%Y_%m}"
+            sufixo = " PARTITION BY HASH (user_id)" if subparticoes else ""
+            await conn.execute(text(
+                f"CREATE TABLE {nome} PARTITION OF bench_particionada.lancamentos "
+                f"FOR VALUES FROM ('{mes}') TO ('{mes + relativedelta(months=meses_por_particao)}'){sufixo}"
+            ))
+            for resto in range(subparticoes):
+                await conn.execute(text(
+                    f"CREATE TABLE {nome}_h{resto} PARTITION OF {nome} FOR VALUES WITH (MODULUS {subparticoes}, REMAINDER {resto})"
+                ))
+            mes += relativedelta(months=meses_por_particao)
+        await conn.execute(text("CREATE TABLE bench_particionada.lancamentos_default PARTITION OF bench_particionada.lancamentos DEFAULT"))
+        await conn.commit()
+
+        print(f"Gerando {linhas:,} lançamentos para {usuarios:,} usuários...")
+        dias = (fim - inicio).days
+        duracao = await _executar(conn, """
+            INSERT INTO bench_plana.lancamentos
+                (id, user_id, categoria_id, tipo, descricao, valor, data_vencimento, is_pago, created_at, updated_at)
+            SELECT g, u,
+                   CASE WHEN r THEN receitas[1 + g % cardinality(receitas)] ELSE despesas[1 + g % cardinality(despesas)] END,
+                   CASE WHEN r THEN 'receita' ELSE 'despesa' END, 'Lançamento ' || g,
+                   round((random() * 900 + 10)::numeric, 2), CAST(:inicio AS date) + (random() * :dias)::int,
+                   random() < 0.8, now(), now()
+            FROM (
+                SELECT g, 1 + (random() * (:usuarios - 1))::int AS u, random() < 0.3 AS r
+                FROM generate_series(1, :linhas) g
+            ) s,
+            LATERAL (SELECT CAST(:receitas AS int[]) AS receitas, CAST(:despesas AS int[]) AS despesas) c
+        """, receitas=categorias[0], despesas=categorias[1], inicio=inicio, dias=dias, usuarios=usuarios, linhas=linhas)
+        print(f"  tabela plana: {duracao:.1f} s")
+        duracao = await _executar(conn, "INSERT INTO bench_particionada.lancamentos SELECT * FROM bench_plana.lancamentos")
+        print(f"  tabela particionada: {duracao:.1f} s")
+        await conn.commit()
+
+        for schema in SCHEMAS:
+            tabela = f"{schema}.lancamentos"
+            duracao = 0.0
+            for indice in INDICES:
+                duracao += await _executar(conn, indice.format(t=tabela))
+            await conn.commit()
+            print(f"  índices em {schema}: {duracao:.1f} s")
+        # VACUUM não roda dentro de transação
+        autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for schema in SCHEMAS:
+            await autocommit.execute(text(f"VACUUM ANALYZE {schema}.lancamentos"))
+
+def _engine_schema(schema: str):
+    # Conexões próprias (sem pool): o search_path direciona "lancamentos" para o schema do benchmark
+    return create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{schema},public"}},
+    )
+
+async def _fluxo_do_mes(db: AsyncSession, user_id: int, mes: int, ano: int, hoje: date):
+    inicio = date(ano, mes, 1)
+    dia = func.extract("day", Lancamento.data_vencimento)
+    result = await db.execute(
+        select(dia, Lancamento.tipo, func.sum(Lancamento.valor))
+        .where(
+            Lancamento.user_id == user_id,
+            Lancamento.data_vencimento >= inicio,
+            Lancamento.data_vencimento < inicio + relativedelta(months=1),
+        )
+        .group_by(dia, Lancamento.tipo)
+    )
+    return result.all()
+
+async def _primeira_pagina(db: AsyncSession, user_id: int, mes: int, ano: int, hoje: date):
+    result = await db.execute(
+        select(Lancamento)
+        .filter(Lancamento.user_id == user_id)
+        .order_by(Lancamento.data_vencimento.desc(), Lancamento.id.desc())
+        .limit(100)
+    )
+    return result.scalars().all()
+
+CONSULTAS = [
+    ("dashboard consolidado", obter_resumo_consolidado),
+    ("dashboard sequencial", obter_resumo_sequencial),
+    ("fluxo do mês", _fluxo_do_mes),
+    ("listagem 1ª página", _primeira_pagina),
+]
+
+async def _particoes_tocadas(engine_schema, user_id: int, hoje: date) -> int:
+    inicio = hoje.replace(day=1)
+    async with engine_schema.connect() as conn:
+        plano = (await conn.execute(text(
+            "EXPLAIN (FORMAT JSON) SELECT sum(valor) FROM lancamentos "
+            f"WHERE user_id = {user_id} AND data_vencimento >= '{inicio}' AND data_vencimento < '{inicio + relativedelta(months=1)}'"
+        ))).scalar()
+    plano = json.loads(plano) if isinstance(plano, str) else plano
+    tabelas = set()
+    def percorrer(no):
+        if "Relation Name" in no:
+            tabelas.add(no["Relation Name"])
+        for filho in no.get("Plans", []):
+            percorrer(filho)
+    percorrer(plano[0]["Plan"])
+    return len(tabelas)
+
+async def medir(usuarios: int, amostras: int):
+    hoje = date.today()
+    ids = random.Random(42).sample(range(1, usuarios + 1), amostras)
+    resultados = {}
+    for schema in SCHEMAS:
+        engine_schema = _engine_schema(schema)
+        async with AsyncSession(engine_schema) as db:
+            for nome, funcao in CONSULTAS:
+                await funcao(db, ids[0], hoje.month, hoje.year, hoje)  # aquecimento
+                tempos = []
+                for user_id in ids:
+                    inicio = time.perf_counter()
+                    await funcao(db, user_id, hoje.month, hoje.year, hoje)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                tempos.sort()
+                resultados[(schema, nome)] = (statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)])
+        tocadas = await _particoes_tocadas(engine_schema, ids[0], hoje)
+        await engine_schema.dispose()
+        print(f"{schema}: consulta de um mês lê {tocadas} tabela(s)/partição(ões)")
+
+    print(f"\n{'consulta':<24}{'plana p50/p95 (ms)':>22}{'particionada p50/p95 (ms)':>30}{'ganho p50':>12}")
+    for nome, _ in CONSULTAS:
+        p50_a, p95_a = resultados[("bench_plana", nome)]
+        p50_b, p95_b = resultados[("bench_particionada", nome)]
+        print(f"{nome:<24}{p50_a:>12.2f} / {p95_a:<8.2f}{p50_b:>19.2f} / {p95_b:<9.2f}{p50_a / p50_b:>10.2f}x")
+
+async def main(args):
+    if not args.reusar:
+        await preparar(args.linhas, args.usuarios, args.hash, args.meses_por_particao)
+    await medir(args.usuarios, args.amostras)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard sobre lancamentos plana vs particionada.")
+    parser.add_argument("--linhas", type=int, default=10_000_000)
+    parser.add_argument("--usuarios", type=int, default=2_000)
+    parser.add_argument("--hash", type=int, default=0, help="Subpartições HASH(user_id) por mês (0 = só RANGE)")
+    parser.add_argument("--meses-por-particao", type=int, default=1, help="Largura da faixa RANGE (12 = anual)")
+    parser.add_argument("--amostras", type=int, default=50, help="Usuários sorteados por consulta")
+    parser.add_argument("--reusar", action="store_true", help="Não recria os schemas de benchmark")
+    asyncio.run(main(parser.parse_args()))
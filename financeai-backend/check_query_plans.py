@@ -0,0 +1,140 @@
+"""
+Regressão de planos de consulta.
+
+Popula (ou reutiliza) o usuário de benchmark, chama as rotas quentes da API capturando o SQL que
+elas realmente executam e roda EXPLAIN (ANALYZE, BUFFERS) em cada SELECT com os mesmos parâmetros.
+Falha (exit 1) se algum plano fizer Seq Scan seletivo numa tabela com mais de --limiar-linhas linhas,
+isto é, um Seq Scan que devolve menos de --seletividade da tabela (o filtro deveria usar índice).
+Com lancamentos particionada, o EXPLAIN mostra as partições: cada uma conta pela tabela raiz,
+somando linhas do plano e tamanho de todas as partições.
+Ler quase toda a tabela sequencialmente (ex.: exportar o histórico de um usuário dominante no
+conjunto semeado) é o plano correto e não conta como regressão.
+
+Uso:
+    python check_query_plans.py                 # semeia 50 mil lançamentos e verifica
+    python check_query_plans.py --sem-semear    # reutiliza o usuário de benchmark já populado
+"""
+import argparse
+import asyncio
+import json
+from datetime import date
+
+import httpx
+from sqlalchemy import event, select, text
+
+from app.config import settings
+from app.core.security import create_access_token
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.models.user import User
+from app.services.finance.exportacao import SQL_EXPORTACAO
+from bench_dashboard import BENCH_EMAIL, preparar_usuario
+
+capturadas = []
+rota_atual = None
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _capturar(conn, cursor, statement, parameters, context, executemany):
+    if rota_atual and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        capturadas.append((rota_atual, statement, parameters))
+
+def _rotas(hoje: date):
+    return [
+        ("dashboard", f"/api/v1/dashboard/resumo?mes={hoje.month}&ano={hoje.year}"),
+        ("relatorio mensal", f"/api/v1/relatorios/resumo?periodo=mensal&mes={hoje.month}&ano={hoje.year}"),
+        ("relatorio anual", f"/api/v1/relatorios/resumo?periodo=anual&mes={hoje.month}&ano={hoje.year}"),
+        ("listagem paginada", "/api/v1/lancamentos/?limit=100"),
+        ("conversas", "/api/v1/chat/conversas"),
+    ]
+
+def _nos_seq_scan(plano: dict):
+    if plano.get("Node Type") == "Seq Scan":
+        yield plano["Relation Name"], plano["Actual Rows"] * plano["Actual Loops"]
+    for filho in plano.get("Plans", []):
+        yield from _nos_seq_scan(filho)
+
+async def _tamanho_tabelas():
+    """Tabela raiz de cada relação (a própria, se não for partição) e linhas por raiz (soma das partições)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text("""
+            SELECT c.relname, coalesce(pg_partition_root(c.oid)::regclass::text, c.relname), greatest(c.reltuples, 0)::bigint
+            FROM pg_class c
+            WHERE c.relkind IN ('r', 'p') AND c.relnamespace = 'public'::regnamespace
+        """))
+        raizes, tamanhos = {}, {}
+        for nome, raiz, linhas in result.all():
+            raizes[nome] = raiz
+            tamanhos[raiz] = tamanhos.get(raiz, 0) + linhas
+        return raizes, tamanhos
+
+async def _explicar(sql: str, parametros) -> dict:
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        plano = await raw.driver_connection.fetchval(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, *(parametros or ())
+        )
+        # O dialeto do SQLAlchemy registra codec de json no asyncpg; sem ele vem como texto
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return plano[0]
+
+async def main(total: int, semear: bool, limiar: int, seletividade: float):
+    global rota_atual
+    if semear:
+        print(f"Preparando usuário de benchmark com {total} lançamentos...")
+        await preparar_usuario(total)
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(select(User.id).filter(User.email == BENCH_EMAIL))).scalar_one()
+        await db.execute(text("ANALYZE"))
+
+    # Sem cache de respostas: a consulta precisa chegar ao banco
+    settings.CACHE_RESPOSTAS_ATIVO = False
+    headers = {"Authorization": f"Bearer {create_access_token(BENCH_EMAIL)}"}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://check") as client:
+        for nome, rota in _rotas(date.today()):
+            rota_atual = nome
+            resposta = await client.get(rota, headers=headers)
+            if resposta.status_code != 200:
+                print(f"❌ {nome}: HTTP {resposta.status_code} em {rota}")
+                raise SystemExit(1)
+    rota_atual = None
+
+    # A exportação usa asyncpg direto (fora do SQLAlchemy), então entra explicitamente
+    capturadas.append(("exportação", SQL_EXPORTACAO, (user_id,)))
+
+    raizes, tamanhos = await _tamanho_tabelas()
+    regressoes = []
+    for rota, sql, parametros in capturadas:
+        resultado = await _explicar(sql, parametros)
+        plano = resultado["Plan"]
+        buffers = plano.get("Shared Hit Blocks", 0) + plano.get("Shared Read Blocks", 0)
+        resumo_sql = " ".join(sql.split())[:90]
+        lidas = {}
+        for relacao, linhas in _nos_seq_scan(plano):
+            raiz = raizes.get(relacao, relacao)
+            lidas[raiz] = lidas.get(raiz, 0) + linhas
+        seq_scans = [
+            tabela for tabela, linhas in lidas.items()
+            if tamanhos.get(tabela, 0) > limiar and linhas < tamanhos[tabela] * seletividade
+        ]
+        marcador = "❌" if seq_scans else "✅"
+        print(f"{marcador} {rota:<18} {resultado['Execution Time']:8.2f} ms | {buffers:6d} buffers | {resumo_sql}")
+        if seq_scans:
+            regressoes.append((rota, seq_scans, sql))
+
+    if regressoes:
+        print("\nSeq Scan seletivo em tabelas grandes:")
+        for rota, tabelas, sql in regressoes:
+            print(f"- {rota}: {', '.join(sorted(set(tabelas)))}\n  {' '.join(sql.split())}")
+        raise SystemExit(1)
+    print(f"\n✅ {len(capturadas)} consultas verificadas, nenhum Seq Scan seletivo em tabelas com mais de {limiar} linhas.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica os planos das consultas quentes com EXPLAIN ANALYZE.")
+    parser.add_argument("--lancamentos", type=int, default=50_000)
+    parser.add_argument("--sem-semear", action="store_true", help="Reutiliza o usuário de benchmark já populado")
+    parser.add_argument("--limiar-linhas", type=int, default=10_000, help="Tabelas menores podem usar Seq Scan")
+    parser.add_argument("--seletividade", type=float, default=0.2, help="Fração da tabela abaixo da qual Seq Scan é regressão")
+    args = parser.parse_args()
+    asyncio.run(main(args.lancamentos, not args.sem_semear, args.limiar_linhas, args.seletividade))
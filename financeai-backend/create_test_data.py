@@ -5,7 +5,9 @@ from app.db.session import AsyncSessionLocal
 from app.models.user import User
 from app.models.categoria import Categoria
 from app.models.lancamento import Lancamento, TipoLancamento
+from app.core.cache import invalidar_cache_usuario
 from app.core.security import get_password_hash
+from app.services.finance.resumos import ajustar_resumos
 from sqlalchemy.future import select
 
 async def create_test_data():
@@ -112,7 +114,11 @@ async def create_test_data():
             novos_lancamentos.append(lancamento)
             
         session.add_all(novos_lancamentos)
+        await session.flush()
+        # Mesma transação das linhas: dashboard, relatórios e ETag leem o rollup
+        await ajustar_resumos(session, user.id, Lancamento.id.in_([l.id for l in novos_lancamentos]))
         await session.commit()
+        await invalidar_cache_usuario(user.id)
         
         print(f"Cerca de {len(novos_lancamentos)} lançamentos de teste foram criados para o usuário.")
         print(f"\n✅ DADOS DE TESTE CRIADOS COM SUCESSO!")
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+from datetime import date
+
+from app.core.cache import invalidar_cache_usuario
+from app.db.session import AsyncSessionLocal
+from app.services.finance.particionamento import (
+    tabela_particionada, listar_particoes, garantir_particoes, desanexar_particoes,
+    particionar_tabela, desparticionar_tabela,
+)
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        particionada = await tabela_particionada(db)
+
+        if args.particionar or args.desparticionar:
+            if args.particionar == particionada:
+                print(f"lancamentos já está {'particionada' if particionada else 'plana'}; nada a fazer.")
+                return
+            if args.particionar:
+                # Copia a tabela inteira numa transação: rode numa janela de manutenção
+                linhas = await particionar_tabela(db, args.subparticoes_hash, args.meses_por_particao)
+                print(f"lancamentos particionada ({linhas} linhas copiadas).")
+            else:
+                await desparticionar_tabela(db)
+                print("lancamentos voltou a ser uma tabela plana.")
+            await db.commit()
+            return
+
+        if not particionada:
+            print("⚠️  lancamentos não está particionada (veja --particionar).")
+            raise SystemExit(1)
+
+        if not args.listar:
+            criadas = await garantir_particoes(db, args.meses_a_frente)
+            desanexadas, usuarios = await desanexar_particoes(db, args.desanexar_antes) if args.desanexar_antes else ([], set())
+            await db.commit()
+            # Os resumos das faixas arquivadas saíram: dashboard e relatórios em cache ficaram velhos
+            for user_id in usuarios:
+                await invalidar_cache_usuario(user_id)
+            print(f"Partições criadas: {', '.join(criadas) or 'nenhuma'}")
+            if args.desanexar_antes:
+                print(f"Partições desanexadas: {', '.join(desanexadas) or 'nenhuma'} ({len(usuarios)} usuário(s) afetado(s))")
+
+        particoes = await listar_particoes(db)
+        if particoes:
+            print(f"{len(particoes)} partições de {particoes[-1].meses} mês(es): {particoes[0].inicio} até {particoes[-1].fim} (exclusivo)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cria partições futuras de lancamentos e arquiva as antigas.")
+    parser.add_argument("--meses-a-frente", type=int, default=None, help="Padrão: PARTICOES_MESES_A_FRENTE")
+    parser.add_argument("--desanexar-antes", type=date.fromisoformat, default=None,
+                        help="Arquiva (DETACH) partições inteiramente anteriores a esta data (AAAA-MM-DD); "
+                             "os lançamentos delas saem de resumos e embeddings")
+    parser.add_argument("--listar", action="store_true", help="Só lista as partições existentes")
+    parser.add_argument("--particionar", action="store_true", help="Converte a tabela plana em particionada")
+    parser.add_argument("--desparticionar", action="store_true", help="Volta a tabela particionada a plana")
+    parser.add_argument("--meses-por-particao", type=int, default=12, help="Com --particionar: largura das faixas (divisor de 12)")
+    parser.add_argument("--subparticoes-hash", type=int, default=0, help="Com --particionar: subpartições HASH(user_id) por faixa")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+
+from app.db.session import AsyncSessionLocal
+from app.services.finance.resumos import reconstruir_resumos, verificar_resumos
+
+async def main(user_id: int | None, apenas_verificar: bool):
+    async with AsyncSessionLocal() as db:
+        if not apenas_verificar:
+            await reconstruir_resumos(db, user_id)
+            await db.commit()
+            print("Rollup de resumos_mensais reconstruído.")
+
+        divergencias = await verificar_resumos(db, user_id)
+        if not divergencias:
+            print("✅ resumos_mensais consistente com lancamentos.")
+            return
+
+        print(f"⚠️  {len(divergencias)} chave(s) divergente(s):")
+        for d in divergencias:
+            print(
+                f"UID: {d.user_id}, Competência: {d.competencia}, Tipo: {d.tipo}, Categoria: {d.categoria_id}, "
+                f"Esperado: {d.total_esperado} ({d.quantidade_esperada}), Rollup: {d.total_rollup} ({d.quantidade_rollup})"
+            )
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula a tabela resumos_mensais a partir de lancamentos.")
+    parser.add_argument("--user-id", type=int, default=None, help="Reconstrói apenas um usuário")
+    parser.add_argument("--verificar", action="store_true", help="Apenas compara o rollup com os lançamentos, sem reescrever")
+    args = parser.parse_args()
+    asyncio.run(main(args.user_id, args.verificar))
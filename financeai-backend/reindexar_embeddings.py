@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.lancamento import Lancamento
+from app.services.llm.embedding_client import embedding_client
+from app.services.tasks.indexing import processar_indexacao_lote
+
+async def main(user_id: int | None, tamanho_lote: int):
+    """
+    Regera os embeddings com o backend atual (EMBEDDING_BACKEND). O conteudo_hash inclui o modelo,
+    então só lançamentos indexados por outro modelo, com vetor zerado ou sem embedding são regerados.
+    """
+    async with AsyncSessionLocal() as db:
+        consulta = select(Lancamento.user_id, Lancamento.id).order_by(Lancamento.user_id, Lancamento.id)
+        if user_id is not None:
+            consulta = consulta.filter(Lancamento.user_id == user_id)
+        por_usuario: dict[int, list[int]] = {}
+        for uid, lancamento_id in (await db.execute(consulta)).all():
+            por_usuario.setdefault(uid, []).append(lancamento_id)
+
+    total = sum(len(ids) for ids in por_usuario.values())
+    print(f"Backend {settings.EMBEDDING_BACKEND} ({embedding_client.MODELO}): {total} lançamento(s) de {len(por_usuario)} usuário(s)")
+    inicio = time.perf_counter()
+    for uid, ids in por_usuario.items():
+        await processar_indexacao_lote(ids, uid, tamanho_lote)
+        print(f"UID: {uid}, Lançamentos: {len(ids)}")
+    print(f"✅ Reindexação concluída em {time.perf_counter() - inicio:.1f} s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regera finance_embeddings com o backend de embeddings configurado.")
+    parser.add_argument("--user-id", type=int, default=None, help="Reindexa apenas um usuário")
+    parser.add_argument("--tamanho-lote", type=int, default=settings.INDEXACAO_LOTE_MAX, help="Textos por chamada de embedding")
+    args = parser.parse_args()
+    asyncio.run(main(args.user_id, args.tamanho_lote))
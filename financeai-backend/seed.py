@@ -5,7 +5,10 @@ from app.db.session import AsyncSessionLocal
 from app.models.user import User
 from app.models.categoria import Categoria
 from app.models.lancamento import Lancamento
+from app.models.embedding import FinanceEmbedding
+from app.core.cache import invalidar_cache_usuario
 from app.core.security import get_password_hash, create_access_token
+from app.services.finance.resumos import ajustar_resumos
 
 async def seed():
     async with AsyncSessionLocal() as db:
@@ -43,10 +46,18 @@ async def seed():
                 db.add(cat)
         
         # Excluir explicitamente as despesas contendo 'Carro' como solicitado pelo usuário
-        await db.execute(delete(Lancamento).where(Lancamento.descricao.ilike("%Carro%")))
+        condicao = Lancamento.descricao.ilike("%Carro%")
+        usuarios = (await db.execute(select(Lancamento.user_id).where(condicao).distinct())).scalars().all()
+        # Como nas rotas: o rollup sai antes das linhas, e os embeddings junto para não ficarem órfãos no RAG
+        for user_id in usuarios:
+            await ajustar_resumos(db, user_id, condicao, sinal=-1)
+        await db.execute(delete(FinanceEmbedding).where(FinanceEmbedding.lancamento_id.in_(select(Lancamento.id).where(condicao))))
+        await db.execute(delete(Lancamento).where(condicao))
         
         try:
             await db.commit()
+            for user_id in usuarios:
+                await invalidar_cache_usuario(user_id)
             print("Database seeded with user and categories!")
         except Exception as e:
             print("Seed failed:", e)